@@ -6,11 +6,21 @@ A comprehensive Streamlit dashboard with enhanced interactivity and modern desig
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import os
-from datetime import datetime
+import sys
+import time
+import uuid
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from dashboard_snapshot import SnapshotStore
+from prefix_index import PrefixSumIndex
+import hll
+from quantile_sketch import ALPHA, QuantileSketch
+from threshold_curves import threshold_curves, optimize, at_threshold
+from serving_metrics import ServingMetrics, current_rss_bytes
+from profiling import begin, stage, write_report
 
 # ============================================================================
 # PAGE CONFIG & STYLING
@@ -85,11 +95,23 @@ THEMES = {
 # Initialize session state
 if 'theme' not in st.session_state:
     st.session_state.theme = "Midnight Purple"
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+rerun_started = time.perf_counter()
+rss_at_start = current_rss_bytes()
+# OLIST_PROFILE=1 writes one profile report per rerun to output/profiles/
+begin("app")
+stage("theme CSS")
 
 theme = THEMES[st.session_state.theme]
 
-# Dynamic CSS based on theme
-st.markdown(f"""
+# Built once per theme and server process, not on every rerun
+@st.cache_data
+def theme_css(theme_name):
+    """Stylesheet for one of THEMES"""
+    theme = THEMES[theme_name]
+    return f"""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
     
@@ -403,75 +425,27 @@ st.markdown(f"""
         background: linear-gradient(90deg, {theme['primary']} 0%, {theme['secondary']} 100%);
     }}
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(theme_css(st.session_state.theme), unsafe_allow_html=True)
 
 # ============================================================================
 # DATA LOADING
 # ============================================================================
-@st.cache_data
-def load_data():
-    """Load all required datasets"""
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(base_dir, "output")
-    raw_dir = os.path.join(base_dir, "data", "raw")
-    
-    data = {}
-    
-    try:
-        data['monthly_revenue'] = pd.read_csv(os.path.join(output_dir, "monthly_revenue.csv"))
-        data['monthly_revenue']['month'] = pd.to_datetime(data['monthly_revenue']['month'])
-    except:
-        data['monthly_revenue'] = None
-        
-    try:
-        data['retention_metrics'] = pd.read_csv(os.path.join(output_dir, "retention_metrics.csv"))
-    except:
-        data['retention_metrics'] = None
-        
-    try:
-        data['churn_features'] = pd.read_csv(os.path.join(output_dir, "churn_features_v2.csv"))
-    except:
-        data['churn_features'] = None
-        
-    try:
-        data['ab_test'] = pd.read_csv(os.path.join(output_dir, "ab_test_second_purchase_results.csv"))
-    except:
-        data['ab_test'] = None
-        
-    try:
-        data['statistical_tests'] = pd.read_csv(os.path.join(output_dir, "churn_statistical_tests.csv"))
-    except:
-        data['statistical_tests'] = None
-        
-    try:
-        data['logistic_coef'] = pd.read_csv(os.path.join(output_dir, "logistic_regression_coefficients_v2.csv"))
-    except:
-        data['logistic_coef'] = None
-    
-    try:
-        data['orders'] = pd.read_csv(os.path.join(raw_dir, "olist_orders_dataset.csv"))
-        data['orders']['order_purchase_timestamp'] = pd.to_datetime(data['orders']['order_purchase_timestamp'])
-    except:
-        data['orders'] = None
-        
-    try:
-        data['order_items'] = pd.read_csv(os.path.join(raw_dir, "olist_order_items_dataset.csv"))
-    except:
-        data['order_items'] = None
-        
-    try:
-        data['products'] = pd.read_csv(os.path.join(raw_dir, "olist_products_dataset.csv"))
-    except:
-        data['products'] = None
-        
-    try:
-        data['category_translation'] = pd.read_csv(os.path.join(raw_dir, "product_category_name_translation.csv"))
-    except:
-        data['category_translation'] = None
-    
-    return data
+# One read-only store per server process, shared by every session
+@st.cache_resource
+def get_snapshot_store():
+    """Precomputed snapshot bundle; refreshed in place when a source CSV changes"""
+    return SnapshotStore()
 
-data = load_data()
+@st.cache_resource
+def get_serving_metrics():
+    """Process-wide session latency and memory counters"""
+    return ServingMetrics()
+
+stage("load snapshot")
+data = get_snapshot_store().get()
+metrics = get_serving_metrics()
 
 # ============================================================================
 # SIDEBAR
@@ -498,7 +472,7 @@ with st.sidebar:
     page = st.radio(
         "Navigate to:",
         ["🏠 Overview", "📈 Revenue Analysis", "🔄 Retention & Churn", 
-         "🧪 A/B Testing", "🔬 Statistical Analysis", "📋 Data Explorer"],
+         "🏷️ Categories", "🏪 Sellers", "🗺️ Geography", "🧪 A/B Testing", "🔬 Statistical Analysis", "📋 Data Explorer", "🧮 SQL Query"],
         label_visibility="collapsed"
     )
     
@@ -506,17 +480,14 @@ with st.sidebar:
     
     # Quick Stats
     st.markdown("### 📌 Quick Stats")
-    if data['retention_metrics'] is not None:
-        total_customers = int(data['retention_metrics']['total_customers'].iloc[0])
-        st.metric("Total Customers", f"{total_customers:,}")
+    if 'total_customers' in data.scalars:
+        st.metric("Total Customers", f"{data.scalars['total_customers']:,}")
     
-    if data['monthly_revenue'] is not None:
-        total_revenue = data['monthly_revenue']['revenue'].sum()
-        st.metric("Total Revenue", f"R${total_revenue:,.0f}")
+    if 'total_revenue' in data.scalars:
+        st.metric("Total Revenue", f"R${data.scalars['total_revenue']:,.0f}")
     
-    if data['retention_metrics'] is not None:
-        repeat_rate = data['retention_metrics']['repeat_purchase_rate'].iloc[0] * 100
-        st.metric("Repeat Rate", f"{repeat_rate:.1f}%")
+    if 'repeat_rate' in data.scalars:
+        st.metric("Repeat Rate", f"{data.scalars['repeat_rate'] * 100:.1f}%")
     
     st.markdown("---")
     st.markdown(f"""
@@ -555,6 +526,8 @@ def create_kpi_card(title, value, subtitle="", icon=""):
     </div>
     """
 
+stage(f"page: {page}")
+
 # ============================================================================
 # PAGE: OVERVIEW
 # ============================================================================
@@ -568,24 +541,23 @@ if page == "🏠 Overview":
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        if data['retention_metrics'] is not None:
-            total_customers = int(data['retention_metrics']['total_customers'].iloc[0])
+        if 'total_customers' in data.scalars:
+            total_customers = data.scalars['total_customers']
             st.markdown(create_kpi_card("Total Customers", f"{total_customers:,}", "Unique buyers", "👥"), unsafe_allow_html=True)
     
     with col2:
-        if data['monthly_revenue'] is not None:
-            total_revenue = data['monthly_revenue']['revenue'].sum()
+        if 'total_revenue' in data.scalars:
+            total_revenue = data.scalars['total_revenue']
             st.markdown(create_kpi_card("Total Revenue", f"R${total_revenue/1e6:.1f}M", "2016-2018", "💰"), unsafe_allow_html=True)
     
     with col3:
-        if data['retention_metrics'] is not None:
-            repeat_rate = data['retention_metrics']['repeat_purchase_rate'].iloc[0] * 100
+        if 'repeat_rate' in data.scalars:
+            repeat_rate = data.scalars['repeat_rate'] * 100
             st.markdown(create_kpi_card("Repeat Rate", f"{repeat_rate:.1f}%", "Return customers", "🔄"), unsafe_allow_html=True)
     
     with col4:
-        if data['ab_test'] is not None:
-            lift = ((data['ab_test'][data['ab_test']['group'] == 'treatment']['conversion_rate'].values[0] / 
-                    data['ab_test'][data['ab_test']['group'] == 'control']['conversion_rate'].values[0]) - 1) * 100
+        if 'ab' in data.scalars:
+            lift = data.scalars['ab']['lift'] * 100
             st.markdown(create_kpi_card("A/B Test Lift", f"+{lift:.0f}%", "Significant result", "🧪"), unsafe_allow_html=True)
     
     st.markdown("<br>", unsafe_allow_html=True)
@@ -669,19 +641,34 @@ elif page == "📈 Revenue Analysis":
     
     if data['monthly_revenue'] is not None:
         df_rev = data['monthly_revenue'].copy()
+        # Running totals per day: every range total below is two lookups, not a rescan
+        index = None
+        if data['daily_revenue_index'] is not None and len(data['daily_revenue_index']):
+            index = PrefixSumIndex.from_frame(data['daily_revenue_index'])
         
         # Interactive Date Range Filter
         st.markdown("---")
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            st.markdown("### 📅 Filter by Date Range")
-        with col2:
-            date_filter = st.selectbox("Quick Select:", ["All Time", "2017 Only", "2018 Only"], label_visibility="collapsed")
+        st.markdown("### 📅 Filter by Date Range")
+        if index is not None:
+            start, end = st.slider(
+                "Date range:",
+                min_value=index.first_day,
+                max_value=index.last_day,
+                value=(index.first_day, index.last_day),
+                format="YYYY-MM-DD",
+                label_visibility="collapsed"
+            )
+        else:
+            st.info("Daily revenue not available. Run scripts/run_analysis.py to enable the date-range filter.")
+            start = df_rev['month'].min().date()
+            end = (df_rev['month'].max() + pd.offsets.MonthEnd(0)).date()
+        reaches_latest = index is None or end == index.last_day
         
-        if date_filter == "2017 Only":
-            df_rev = df_rev[df_rev['month'].dt.year == 2017]
-        elif date_filter == "2018 Only":
-            df_rev = df_rev[df_rev['month'].dt.year == 2018]
+        # Months overlapping the range, for the trend chart
+        df_rev = df_rev[
+            (df_rev['month'] >= pd.Timestamp(start).to_period('M').to_timestamp())
+            & (df_rev['month'] <= pd.Timestamp(end))
+        ]
         
         # Monthly Revenue Trend with animation
         st.markdown("### Monthly Revenue Trend")
@@ -715,30 +702,138 @@ elif page == "📈 Revenue Analysis":
                 hovertemplate="<b>%{x|%B %Y}</b><br>Revenue: R$%{y:,.0f}<extra></extra>"
             ))
         
+        # Forecast band from the best backtested model
+        forecast = data['revenue_forecast']
+        show_forecast = forecast is not None and reaches_latest and st.checkbox("Show forecast", value=True)
+        if show_forecast:
+            best = forecast[(forecast['series'] == 'total') & forecast['is_best']]
+            anchor = df_rev.iloc[[-1]]
+            band_x = pd.concat([anchor['month'], best['period']])
+            fig.add_trace(go.Scatter(
+                x=pd.concat([band_x, band_x[::-1]]),
+                y=pd.concat([anchor['revenue'], best['upper'], best['lower'][::-1], anchor['revenue']]),
+                fill='toself',
+                fillcolor=f"rgba{tuple(int(theme['accent'].lstrip('#')[i:i+2], 16) for i in (0, 2, 4)) + (0.2,)}",
+                line=dict(width=0),
+                hoverinfo='skip',
+                name='80% band'
+            ))
+            fig.add_trace(go.Scatter(
+                x=band_x, y=pd.concat([anchor['revenue'], best['forecast']]),
+                mode='lines+markers',
+                line=dict(color=theme['accent'], width=3, dash='dash'),
+                name=f"Forecast ({best['model'].iloc[0].replace('_', ' ')})",
+                hovertemplate="<b>%{x|%B %Y}</b><br>Forecast: R$%{y:,.0f}<extra></extra>"
+            ))
+        
         fig.update_layout(**create_plotly_layout("", 450))
         st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
         
+        if show_forecast and data['forecast_metrics'] is not None:
+            with st.expander("📐 Forecast backtest accuracy"):
+                fm = data['forecast_metrics']
+                st.dataframe(fm[fm['series'] == 'total'].drop(columns=['series']).style.format({
+                    'mae': 'R${:,.0f}', 'rmse': 'R${:,.0f}', 'mape': '{:.1%}'
+                }), use_container_width=True)
+        
         # Revenue Statistics
         col1, col2, col3, col4 = st.columns(4)
         
-        with col1:
-            st.metric("💵 Total Revenue", f"R${df_rev['revenue'].sum():,.0f}")
-        with col2:
-            st.metric("📊 Average Monthly", f"R${df_rev['revenue'].mean():,.0f}")
-        with col3:
-            st.metric("📈 Peak Month", f"R${df_rev['revenue'].max():,.0f}")
-        with col4:
-            if len(df_rev) > 1:
-                growth = ((df_rev['revenue'].iloc[-1] / df_rev['revenue'].iloc[1]) - 1) * 100
-                st.metric("🚀 Overall Growth", f"+{growth:.0f}%")
+        if index is not None:
+            totals = index.totals(start, end)
+            previous = index.previous_period(start, end)
+            days = index.day_count(start, end)
+            
+            def change(measure):
+                """Change against the previous window of the same length"""
+                if previous[measure] <= 0:
+                    return None
+                return f"{(totals[measure] / previous[measure] - 1) * 100:+.1f}%"
+            
+            with col1:
+                st.metric("💵 Revenue", f"R${totals['revenue']:,.0f}", change('revenue'))
+            with col2:
+                st.metric("📊 Average Daily", f"R${totals['revenue'] / days:,.0f}")
+            with col3:
+                st.metric("📦 Orders", f"{int(totals['orders']):,}", change('orders'))
+            with col4:
+                st.metric("🆕 New Customers", f"{int(totals['new_customers']):,}", change('new_customers'))
+            st.caption(f"{days:,} days selected; changes compare with the {days:,} days before {start:%Y-%m-%d}.")
+            
+            # Distinct customers do not add across days: merge the daily HyperLogLog sketches instead
+            sketches = data['customer_sketches']
+            if sketches is not None:
+                daily_sketches = sketches[
+                    (sketches['grain'] == 'day')
+                    & (sketches['period'] >= pd.Timestamp(start))
+                    & (sketches['period'] <= pd.Timestamp(end))
+                ]
+                active = hll.estimate(hll.merge(hll.from_bytes(daily_sketches['registers'])))
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric(
+                        "👥 Active Customers", f"≈{active:,.0f}",
+                        help=f"Distinct customers with a delivered order in the range, from merged daily sketches "
+                             f"(±{hll.RELATIVE_ERROR:.1%} standard error)"
+                    )
+                with col2:
+                    st.metric("💳 Revenue per Active Customer", f"R${totals['revenue'] / max(active, 1):,.2f}")
+        else:
+            with col1:
+                st.metric("💵 Total Revenue", f"R${df_rev['revenue'].sum():,.0f}")
+            with col2:
+                st.metric("📊 Average Monthly", f"R${df_rev['revenue'].mean():,.0f}")
+            with col3:
+                st.metric("📈 Peak Month", f"R${df_rev['revenue'].max():,.0f}")
+            with col4:
+                if len(df_rev) > 1:
+                    growth = ((df_rev['revenue'].iloc[-1] / df_rev['revenue'].iloc[1]) - 1) * 100
+                    st.metric("🚀 Overall Growth", f"+{growth:.0f}%")
         
         st.markdown("---")
         
+        # Active customers by state, merged from monthly per-state sketches
+        sketches = data['customer_sketches']
+        if index is not None and sketches is not None:
+            st.markdown("### Active Customers by State")
+            monthly_sketches = sketches[
+                (sketches['grain'] == 'month')
+                & (sketches['period'] >= pd.Timestamp(start).to_period('M').to_timestamp())
+                & (sketches['period'] <= pd.Timestamp(end))
+            ]
+            by_state = pd.DataFrame([
+                {'state': state, 'customers': hll.estimate(hll.merge(hll.from_bytes(group['registers'])))}
+                for state, group in monthly_sketches.groupby('customer_state')
+            ])
+            if not by_state.empty:
+                by_state = by_state.nlargest(10, 'customers').sort_values('customers')
+                fig = go.Figure(go.Bar(
+                    x=by_state['customers'], y=by_state['state'], orientation='h',
+                    marker=dict(color=theme['chart_colors'][1], line=dict(width=0)),
+                    hovertemplate="<b>%{y}</b><br>≈%{x:,.0f} customers<extra></extra>"
+                ))
+                fig.update_layout(**create_plotly_layout("", 380))
+                st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+                st.caption(
+                    f"Top 10 states over the whole months the range touches; "
+                    f"HyperLogLog estimates, ±{hll.RELATIVE_ERROR:.1%} standard error."
+                )
+            st.markdown("---")
+        
         # Year-over-Year Comparison
         st.markdown("### Year-over-Year Comparison")
         
-        df_rev['year'] = df_rev['month'].dt.year
-        yearly_data = df_rev.groupby('year')['revenue'].sum().reset_index()
+        yearly_data = data['yearly_revenue']
+        if index is not None:
+            # Each year clipped to the selected range
+            years = range(start.year, end.year + 1)
+            yearly_data = pd.DataFrame({
+                'year': list(years),
+                'revenue': [
+                    index.total('revenue', max(start, date(y, 1, 1)), min(end, date(y, 12, 31)))
+                    for y in years
+                ]
+            })
         
         fig = go.Figure(data=[
             go.Bar(
@@ -766,7 +861,7 @@ elif page == "🔄 Retention & Churn":
     st.markdown("# 🔄 Retention & Churn Analysis")
     st.markdown("### Deep dive into customer behavior and churn patterns")
     
-    tabs = st.tabs(["📊 Retention Overview", "📉 Order Frequency", "🔍 Churn Features", "🤖 Model Performance"])
+    tabs = st.tabs(["📊 Retention Overview", "📉 Order Frequency", "🔍 Churn Features", "🤖 Model Performance", "🛒 Cross-sell", "⏳ Time to 2nd Purchase"])
     
     with tabs[0]:
         st.markdown("### Customer Retention Breakdown")
@@ -822,16 +917,14 @@ elif page == "🔄 Retention & Churn":
     with tabs[1]:
         st.markdown("### Order Frequency Distribution")
         
-        if data['churn_features'] is not None:
-            churn = data['churn_features']
+        if 'order_frequency' in data:
+            freq = data['order_frequency']
             
             # Interactive slider for filtering
-            max_orders = int(churn['total_orders'].max())
+            max_orders = data.scalars['max_orders']
             order_range = st.slider("Filter by order count:", 1, min(max_orders, 20), (1, min(10, max_orders)))
             
-            filtered_churn = churn[(churn['total_orders'] >= order_range[0]) & (churn['total_orders'] <= order_range[1])]
-            order_dist = filtered_churn['total_orders'].value_counts().sort_index().reset_index()
-            order_dist.columns = ['orders', 'customers']
+            order_dist = freq[(freq['orders'] >= order_range[0]) & (freq['orders'] <= order_range[1])]
             
             fig = go.Figure()
             fig.add_trace(go.Bar(
@@ -847,13 +940,10 @@ elif page == "🔄 Retention & Churn":
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                pct_one = (churn['total_orders'] == 1).sum() / len(churn) * 100
-                st.metric("1 Order Only", f"{pct_one:.1f}%")
+                st.metric("1 Order Only", f"{data.scalars['pct_one_order']:.1f}%")
             with col2:
-                avg_orders = churn['total_orders'].mean()
-                st.metric("Avg Orders/Customer", f"{avg_orders:.2f}")
+                st.metric("Avg Orders/Customer", f"{data.scalars['avg_orders']:.2f}")
             with col3:
-                max_orders = churn['total_orders'].max()
                 st.metric("Max Orders", f"{max_orders}")
     
     with tabs[2]:
@@ -867,17 +957,38 @@ elif page == "🔄 Retention & Churn":
             selected_features = st.multiselect("Select features to compare:", available_features, default=available_features)
             
             if selected_features:
+                # plotly's subplot and express modules load only on the pages that draw them
+                from plotly.subplots import make_subplots
+
                 fig = make_subplots(rows=1, cols=len(selected_features), subplot_titles=selected_features)
                 
+                sketches = data['churn_sketches']
                 for i, feat in enumerate(selected_features, 1):
-                    churned = churn[churn['is_churned'] == 1][feat]
-                    active = churn[churn['is_churned'] == 0][feat]
-                    
-                    fig.add_trace(go.Box(y=churned, name='Churned', marker_color=theme['danger'], showlegend=(i==1)), row=1, col=i)
-                    fig.add_trace(go.Box(y=active, name='Active', marker_color=theme['success'], showlegend=(i==1)), row=1, col=i)
+                    for status, label, color in [('churned', 'Churned', theme['danger']), ('active', 'Active', theme['success'])]:
+                        if sketches is not None:
+                            # Quartiles and whiskers from the segment's quantile sketch, not the full column
+                            row = sketches[
+                                (sketches['dimension'] == 'churn_status')
+                                & (sketches['segment'] == status)
+                                & (sketches['feature'] == feat)
+                            ]
+                            if row.empty:
+                                continue
+                            box = QuantileSketch.from_record(row.iloc[0]).box()
+                            trace = go.Box(
+                                q1=[box['q1']], median=[box['median']], q3=[box['q3']],
+                                lowerfence=[box['lowerfence']], upperfence=[box['upperfence']],
+                                x=[label], name=label, marker_color=color, showlegend=(i==1)
+                            )
+                        else:
+                            values = churn[churn['is_churned'] == (1 if status == 'churned' else 0)][feat]
+                            trace = go.Box(y=values, name=label, marker_color=color, showlegend=(i==1))
+                        fig.add_trace(trace, row=1, col=i)
                 
                 fig.update_layout(**create_plotly_layout("", 400))
                 st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+                if sketches is not None:
+                    st.caption(f"Box plots drawn from per-segment quantile sketches (±{ALPHA:.0%} relative error on each quartile).")
             
             if data['statistical_tests'] is not None:
                 st.markdown("#### Statistical Test Results")
@@ -916,6 +1027,310 @@ elif page == "🔄 Retention & Churn":
             ⚠️ **Model Insight:** Without data leakage, the model shows weak predictive power. 
             This suggests that **controlled experimentation** may be more effective than predictive modeling.
             """)
+        
+        if data['model_comparison'] is not None:
+            st.markdown("### Gradient Boosting vs Logistic Baseline")
+            comparison = data['model_comparison'].set_index('model')
+            labels = {'logistic_regression': 'Logistic Regression', 'gradient_boosting': 'Gradient Boosting'}
+            
+            cols = st.columns(len(comparison))
+            baseline_auc = comparison['roc_auc'].get('logistic_regression')
+            for col, (name, row) in zip(cols, comparison.iterrows()):
+                with col:
+                    delta = None if name == 'logistic_regression' or baseline_auc is None else f"{row['roc_auc'] - baseline_auc:+.3f} AUC"
+                    st.metric(f"{labels.get(name, name)} ROC-AUC", f"{row['roc_auc']:.3f}", delta)
+            
+            st.dataframe(
+                comparison.rename(index=labels)[['features', 'iterations', 'train_seconds', 'predict_rows_per_second', 'roc_auc']]
+                .style.format({'train_seconds': '{:.2f}s', 'predict_rows_per_second': '{:,.0f}', 'roc_auc': '{:.3f}'}),
+                use_container_width=True
+            )
+            st.caption(f"Same stratified 70/30 split, {int(comparison['test_rows'].iloc[0]):,} held-out customers. "
+                       "Gradient boosting adds delivery, review and freight features plus state and main category as "
+                       "native categoricals, and stops early on a validation split. Compare targeting profit per model on "
+                       "the Statistical Analysis page.")
+    
+    with tabs[4]:
+        st.markdown("### Frequently Bought Together")
+        st.markdown("Second-purchase offers built from co-purchase lift: how much likelier the partner is in orders that contain the item.")
+        
+        level = st.radio("Level:", ["Category", "Product"], horizontal=True)
+        pairs = data['co_purchase_category'] if level == "Category" else data['co_purchase_product']
+        if pairs is not None and not pairs.empty:
+            if level == "Product":
+                # Hex ids are unreadable on their own; show category and a short id
+                pairs = pairs.assign(**{
+                    f'{side}_label': pairs[f'{side}_category'].fillna('unknown') + " · " + pairs[f'{side}_name'].str[:8]
+                    for side in ('item', 'partner')
+                })
+            else:
+                pairs = pairs.assign(item_label=pairs['item_name'], partner_label=pairs['partner_name'])
+            
+            by_support = pairs.drop_duplicates('item_label').sort_values('item_support', ascending=False)
+            item = st.selectbox("Item:", by_support['item_label'].tolist())
+            top = pairs[pairs['item_label'] == item].sort_values('rank')
+            
+            col1, col2 = st.columns([3, 2])
+            with col1:
+                fig = go.Figure(go.Bar(
+                    x=top['lift'][::-1], y=top['partner_label'][::-1], orientation='h',
+                    marker=dict(color=theme['chart_colors'][2], line=dict(width=0)),
+                    customdata=top[['co_orders', 'confidence']][::-1],
+                    hovertemplate="<b>%{y}</b><br>Lift: %{x:.1f}x<br>Orders together: %{customdata[0]:,}"
+                                  "<br>Confidence: %{customdata[1]:.1%}<extra></extra>"
+                ))
+                fig.update_layout(**create_plotly_layout("Lift", 400))
+                st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+            with col2:
+                st.dataframe(
+                    top[['partner_label', 'co_orders', 'confidence', 'lift']].rename(columns={'partner_label': 'partner'})
+                    .style.format({'co_orders': '{:,}', 'confidence': '{:.1%}', 'lift': '{:.1f}x'}),
+                    use_container_width=True, hide_index=True
+                )
+            st.caption(f"Item appears in {int(top['item_support'].iloc[0]):,} delivered orders. "
+                       "Pairs shared by fewer orders than the run's --min-orders are left out.")
+        else:
+            st.info("Co-purchase results not available. Run scripts/run_market_basket.py first.")
+    
+    with tabs[5]:
+        st.markdown("### Time to Second Purchase")
+        st.markdown("Kaplan-Meier estimate of the share of customers who have bought again N days after their first order. "
+                    "Customers whose window is still open are censored rather than counted as lost.")
+        
+        curves = data['survival_curves']
+        summary = data['survival_summary']
+        if curves is not None and summary is not None:
+            dimensions = {"Overall": "overall", "First category": "first_category", "State": "customer_state", "Payment type": "payment_type"}
+            dimension = dimensions[st.radio("Stratify by:", list(dimensions), horizontal=True)]
+            dim_summary = summary[summary['dimension'] == dimension].sort_values('customers', ascending=False)
+            strata = dim_summary['stratum'].tolist()
+            if dimension == "overall":
+                selected = strata
+            else:
+                selected = st.multiselect("Strata:", strata, default=strata[:5])
+            
+            fig = go.Figure()
+            for i, stratum in enumerate(selected):
+                curve = curves[(curves['dimension'] == dimension) & (curves['stratum'] == stratum)]
+                color = theme['chart_colors'][i % len(theme['chart_colors'])]
+                if len(selected) == 1:
+                    # 95% band only when a single curve is shown
+                    fig.add_trace(go.Scatter(
+                        x=pd.concat([curve['day'], curve['day'][::-1]]),
+                        y=pd.concat([1 - curve['ci_lower'], (1 - curve['ci_upper'])[::-1]]) * 100,
+                        fill='toself', line=dict(width=0, shape='hv'), hoverinfo='skip', showlegend=False,
+                        fillcolor=f"rgba{tuple(int(color.lstrip('#')[j:j+2], 16) for j in (0, 2, 4)) + (0.15,)}",
+                    ))
+                fig.add_trace(go.Scatter(
+                    x=curve['day'], y=(1 - curve['survival']) * 100,
+                    mode='lines', line=dict(color=color, width=3, shape='hv'), name=str(stratum),
+                    customdata=curve['at_risk'],
+                    hovertemplate=f"<b>{stratum}</b><br>Day %{{x}}: %{{y:.2f}}% bought again"
+                                  "<br>Still waiting: %{customdata:,}<extra></extra>"
+                ))
+            fig.update_layout(**create_plotly_layout("Cumulative Second-Purchase Rate", 420))
+            fig.update_xaxes(title="Days since first purchase")
+            fig.update_yaxes(title="Bought again (%)")
+            st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+            
+            shown = dim_summary[dim_summary['stratum'].isin(selected)]
+            horizon_cols = [c for c in shown.columns if c.startswith('repeat_by_day_')]
+            st.dataframe(
+                shown[['stratum', 'customers', 'repeaters'] + horizon_cols]
+                .style.format({'customers': '{:,}', 'repeaters': '{:,}', **{c: '{:.2%}' for c in horizon_cols}}),
+                use_container_width=True, hide_index=True
+            )
+            
+            hazard = data['survival_hazard']
+            if hazard is not None:
+                rate_col = next(c for c in hazard.columns if c.startswith('hazard_per_'))
+                width = rate_col[len('hazard_per_'):-1]
+                fig = go.Figure()
+                for i, stratum in enumerate(selected):
+                    rates = hazard[(hazard['dimension'] == dimension) & (hazard['stratum'] == stratum)]
+                    fig.add_trace(go.Scatter(
+                        x=rates['period_start_day'], y=rates[rate_col] * 100, mode='lines+markers', name=str(stratum),
+                        line=dict(color=theme['chart_colors'][i % len(theme['chart_colors'])], width=2),
+                        hovertemplate=f"<b>{stratum}</b><br>From day %{{x}}: %{{y:.3f}}% per {width} days<extra></extra>"
+                    ))
+                fig.update_layout(**create_plotly_layout(f"Second-Purchase Hazard (per {width} days still waiting)", 350))
+                fig.update_xaxes(title="Days since first purchase")
+                fig.update_yaxes(title="Hazard (%)")
+                st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+            
+            st.info("💡 **Insight:** The hazard shows when customers who will return actually do; "
+                    "a post-purchase incentive is best timed before it falls off.")
+        else:
+            st.info("Survival results not available. Run scripts/run_survival_analysis.py first.")
+
+# ============================================================================
+# PAGE: CATEGORIES
+# ============================================================================
+elif page == "🏷️ Categories":
+    st.markdown("# 🏷️ Product Category Analytics")
+    st.markdown("### Revenue, units, freight and orders by category and month")
+    
+    if data['category_facts'] is not None:
+        facts = data['category_facts']
+        months = sorted(set(facts['month'].dt.to_pydatetime()))
+        
+        st.markdown("---")
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            month_range = st.select_slider(
+                "Month range:", options=months, value=(months[0], months[-1]),
+                format_func=lambda m: m.strftime('%b %Y')
+            )
+        with col2:
+            metric = st.selectbox("Metric:", ['revenue', 'units', 'freight', 'orders'])
+        with col3:
+            top_n = st.number_input("Top N", min_value=3, max_value=50, value=15)
+        
+        sliced = facts[(facts['month'] >= month_range[0]) & (facts['month'] <= month_range[1])]
+        totals = sliced.groupby('category', sort=False)[['revenue', 'units', 'freight', 'orders']].sum()
+        top = totals.nlargest(int(top_n), metric).reset_index()
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("💵 Revenue", f"R${totals['revenue'].sum():,.0f}")
+        with col2:
+            st.metric("📦 Units", f"{totals['units'].sum():,.0f}")
+        with col3:
+            st.metric("🚚 Freight Share", f"{totals['freight'].sum() / max(totals['revenue'].sum(), 1) * 100:.1f}%")
+        with col4:
+            st.metric("🏷️ Categories", f"{(totals['units'] > 0).sum()}")
+        
+        st.markdown(f"### Top {int(top_n)} Categories by {metric.title()}")
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=top[metric][::-1],
+            y=top['category'][::-1],
+            orientation='h',
+            marker=dict(color=theme['chart_colors'][0]),
+            hovertemplate="<b>%{y}</b><br>%{x:,.0f}<extra></extra>"
+        ))
+        fig.update_layout(**create_plotly_layout("", max(400, 28 * len(top))))
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+        
+        st.markdown("### Monthly Trend")
+        selected = st.multiselect("Categories:", totals.index.tolist(), default=top['category'].head(3).tolist())
+        trend = sliced[sliced['category'].isin(selected)]
+        fig = go.Figure()
+        for i, (cat, grp) in enumerate(trend.groupby('category')):
+            fig.add_trace(go.Scatter(
+                x=grp['month'], y=grp[metric],
+                mode='lines+markers', name=cat,
+                line=dict(color=theme['chart_colors'][i % len(theme['chart_colors'])], width=3)
+            ))
+        fig.update_layout(**create_plotly_layout("", 400))
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    else:
+        st.error("Category data not available. Please run scripts/run_category_analytics.py first.")
+
+# ============================================================================
+# PAGE: SELLERS
+# ============================================================================
+elif page == "🏪 Sellers":
+    st.markdown("# 🏪 Seller Performance")
+    st.markdown("### Scorecards and leaderboard across the marketplace")
+    
+    if data['seller_scorecards'] is not None:
+        sellers = data['seller_scorecards']
+        
+        st.markdown("---")
+        metrics_labels = {
+            'gmv': 'GMV',
+            'total_orders': 'Orders',
+            'avg_review_score': 'Avg Review Score',
+            'avg_delivery_delay_days': 'Avg Delivery Delay (days)',
+            'cancellation_rate': 'Cancellation Rate'
+        }
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        with col1:
+            rank_by = st.selectbox("Rank by:", list(metrics_labels.keys()), format_func=metrics_labels.get)
+        with col2:
+            states = ["All"] + sorted(sellers['seller_state'].dropna().unique().tolist())
+            state = st.selectbox("State:", states)
+        with col3:
+            min_orders = st.number_input("Min orders", min_value=1, value=10)
+        with col4:
+            top_k = st.number_input("Top K", min_value=5, max_value=100, value=20)
+        
+        pool = sellers[sellers['total_orders'] >= min_orders]
+        if state != "All":
+            pool = pool[pool['seller_state'] == state]
+        
+        # Lower is better for delay and cancellations
+        if rank_by in ('avg_delivery_delay_days', 'cancellation_rate'):
+            board = pool.nsmallest(int(top_k), rank_by)
+        else:
+            board = pool.nlargest(int(top_k), rank_by)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("🏪 Sellers", f"{len(pool):,}")
+        with col2:
+            st.metric("💵 GMV", f"R${pool['gmv'].sum():,.0f}")
+        with col3:
+            st.metric("⭐ Avg Review", f"{pool['avg_review_score'].mean():.2f}")
+        with col4:
+            st.metric("🚚 Avg Delay", f"{pool['avg_delivery_delay_days'].mean():.1f} days")
+        
+        st.markdown(f"### 🏆 Top {int(top_k)} by {metrics_labels[rank_by]}")
+        st.dataframe(board.reset_index(drop=True).style.format({
+            'gmv': 'R${:,.0f}',
+            'avg_delivery_delay_days': '{:.1f}',
+            'avg_review_score': '{:.2f}',
+            'cancellation_rate': '{:.1%}'
+        }), use_container_width=True, height=500)
+    else:
+        st.error("Seller scorecards not available. Please run scripts/run_seller_scorecards.py first.")
+
+# ============================================================================
+# PAGE: GEOGRAPHY
+# ============================================================================
+elif page == "🗺️ Geography":
+    import plotly.express as px
+
+    st.markdown("# 🗺️ Geography")
+    st.markdown("### Where customers and revenue are concentrated")
+    
+    if data['geo_states'] is not None and data['geo_cities'] is not None:
+        states = data['geo_states']
+        cities = data['geo_cities']
+        
+        st.markdown("---")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            measure = st.radio("Measure:", ['revenue', 'customers', 'orders'], horizontal=True)
+        with col2:
+            top_n = st.number_input("Cities on map", min_value=50, max_value=2000, value=300, step=50)
+        
+        mapped = cities.dropna(subset=['lat', 'lng']).nlargest(int(top_n), measure)
+        fig = px.scatter_geo(
+            mapped, lat='lat', lon='lng', size=measure, color='customer_state',
+            hover_name='customer_city', hover_data={measure: ':,.0f', 'lat': False, 'lng': False},
+            color_discrete_sequence=theme['chart_colors'], size_max=40
+        )
+        fig.update_geos(
+            scope='south america', fitbounds='locations', bgcolor='rgba(0,0,0,0)',
+            showcountries=True, countrycolor='rgba(255,255,255,0.2)', landcolor='rgba(255,255,255,0.04)'
+        )
+        fig.update_layout(**create_plotly_layout("", 550))
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+        
+        st.markdown(f"### {measure.title()} by State")
+        ranked = states.sort_values(measure, ascending=False)
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=ranked['customer_state'], y=ranked[measure],
+            marker=dict(color=theme['chart_colors'][0]),
+            hovertemplate="<b>%{x}</b><br>%{y:,.0f}<extra></extra>"
+        ))
+        fig.update_layout(**create_plotly_layout("", 400))
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    else:
+        st.error("Geographic summaries not available. Please run scripts/run_geo_analysis.py first.")
 
 # ============================================================================
 # PAGE: A/B TESTING
@@ -924,14 +1339,14 @@ elif page == "🧪 A/B Testing":
     st.markdown("# 🧪 A/B Testing & Experimentation")
     st.markdown("### Evaluate the effectiveness of retention interventions")
     
-    if data['ab_test'] is not None:
-        ab = data['ab_test']
+    if 'ab' in data.scalars:
+        ab = data.scalars['ab']
         
         st.markdown("---")
         
-        control_rate = ab[ab['group'] == 'control']['conversion_rate'].values[0] * 100
-        treatment_rate = ab[ab['group'] == 'treatment']['conversion_rate'].values[0] * 100
-        lift = ((treatment_rate / control_rate) - 1) * 100
+        control_rate = ab['control_rate'] * 100
+        treatment_rate = ab['treatment_rate'] * 100
+        lift = ab['lift'] * 100
         
         col1, col2, col3 = st.columns(3)
         
@@ -966,10 +1381,10 @@ elif page == "🧪 A/B Testing":
         with col2:
             st.markdown("### Sample Size & Conversions")
             
-            control_users = ab[ab['group'] == 'control']['users'].values[0]
-            control_conv = ab[ab['group'] == 'control']['conversions'].values[0]
-            treatment_users = ab[ab['group'] == 'treatment']['users'].values[0]
-            treatment_conv = ab[ab['group'] == 'treatment']['conversions'].values[0]
+            control_users = ab['control_users']
+            control_conv = ab['control_conversions']
+            treatment_users = ab['treatment_users']
+            treatment_conv = ab['treatment_conversions']
             
             fig = go.Figure()
             fig.add_trace(go.Funnel(
@@ -1000,8 +1415,8 @@ elif page == "🧪 A/B Testing":
         col1, col2 = st.columns(2)
         
         with col1:
-            z_score = ab['z_score'].iloc[0]
-            p_value = ab['p_value'].iloc[0]
+            z_score = ab['z_score']
+            p_value = ab['p_value']
             
             st.markdown(f"""
             | Metric | Value |
@@ -1086,6 +1501,120 @@ elif page == "🔬 Statistical Analysis":
         
         st.markdown("---")
         
+        # Quartiles by segment, read from the quantile sketches written with the churn features
+        sketches = data['churn_sketches']
+        if sketches is not None:
+            st.markdown("### Distribution by Segment")
+            dimensions = {
+                'churn_status': 'Churn status', 'order_bucket': 'Order bucket',
+                'revenue_bucket': 'Revenue bucket', 'first_order_month': 'First order month'
+            }
+            col1, col2 = st.columns(2)
+            with col1:
+                dimension = st.selectbox("Segment by:", list(dimensions), format_func=dimensions.get)
+            with col2:
+                feature = st.selectbox("Feature:", sorted(sketches['feature'].unique()))
+            rows = sketches[(sketches['dimension'] == dimension) & (sketches['feature'] == feature)]
+            summary = pd.DataFrame([
+                {'segment': r['segment'], **QuantileSketch.from_record(r).box()}
+                for r in rows.to_dict('records')
+            ])
+            if not summary.empty:
+                st.dataframe(
+                    summary[['segment', 'count', 'lowerfence', 'q1', 'median', 'q3', 'upperfence']].style.format({
+                        'count': '{:,.0f}', 'lowerfence': '{:,.2f}', 'q1': '{:,.2f}',
+                        'median': '{:,.2f}', 'q3': '{:,.2f}', 'upperfence': '{:,.2f}'
+                    }),
+                    use_container_width=True, hide_index=True
+                )
+                st.caption(f"Quantiles within ±{ALPHA:.0%} relative error; sketches from separate runs merge exactly.")
+            st.markdown("---")
+        
+        # Every threshold's outcome from one sort of the held-out scores, recomputed as the inputs change
+        test_scores = data['churn_test_scores']
+        if test_scores is not None:
+            st.markdown("### 🎯 Retention Campaign Targeting")
+            st.markdown("Which customers to send a retention offer: every threshold on the model's churn score, "
+                        "evaluated on held-out customers and scaled to the whole customer base.")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                offer_cost = st.number_input("Offer cost (R$):", min_value=0.0, value=10.0, step=1.0)
+            with col2:
+                save_rate = st.slider("Churners kept by the offer:", 0.0, 1.0, 0.10, 0.01, format="%.2f")
+            with col3:
+                clv_mode = st.selectbox("Value of a kept customer:", ["Their revenue so far", "Fixed CLV"])
+                if clv_mode == "Fixed CLV":
+                    clv_value = st.number_input("CLV (R$):", min_value=0.0, value=150.0, step=10.0)
+            with col4:
+                budget = st.number_input("Budget (R$, 0 = unlimited):", min_value=0.0, value=0.0, step=1000.0)
+            
+            models = test_scores['model'].unique().tolist()
+            model = st.radio("Model:", models, horizontal=True) if len(models) > 1 else models[0]
+            scored = test_scores[test_scores['model'] == model]
+            population = len(data['churn_features']) if data['churn_features'] is not None else len(scored)
+            clv = scored['total_revenue'].fillna(0).to_numpy() if clv_mode == "Their revenue so far" else clv_value
+            
+            curves = threshold_curves(scored['churn_score'], scored['is_churned'], offer_cost, clv, save_rate,
+                                      scale=population / len(scored))
+            best = optimize(curves, budget or None)
+            default = at_threshold(curves, 0.5)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Best Threshold", "contact nobody" if best['contacted'] == 0 else f"{best['threshold']:.3f}")
+            with col2:
+                st.metric("Customers Contacted", f"{best['contacted']:,.0f}", f"{best['share_contacted']:.1%} of base", delta_color="off")
+            with col3:
+                st.metric("Expected Profit", f"R${best['profit']:,.0f}", f"R${best['profit'] - default['profit']:,.0f} vs 0.5 threshold")
+            with col4:
+                st.metric("Precision / Recall", f"{best['precision']:.1%} / {best['recall']:.1%}" if best['contacted'] else "-")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(
+                    x=curves['share_contacted'] * 100, y=curves['profit'], mode='lines',
+                    line=dict(color=theme['primary'], width=3), name='Profit',
+                    customdata=curves[['threshold', 'cost']],
+                    hovertemplate="Top %{x:.1f}% (score ≥ %{customdata[0]:.3f})<br>Profit: R$%{y:,.0f}"
+                                  "<br>Spend: R$%{customdata[1]:,.0f}<extra></extra>"
+                ))
+                for row, label, color in [(best, 'Best', theme['success']), (default, '0.5 threshold', theme['danger'])]:
+                    fig.add_trace(go.Scatter(
+                        x=[row['share_contacted'] * 100], y=[row['profit']], mode='markers', name=label,
+                        marker=dict(size=14, color=color, line=dict(width=2, color='white'))
+                    ))
+                if budget:
+                    over = curves[curves['cost'] > budget]
+                    if not over.empty:
+                        fig.add_vrect(x0=over['share_contacted'].iloc[0] * 100, x1=100, fillcolor=theme['danger'],
+                                      opacity=0.08, line_width=0, annotation_text="over budget")
+                fig.update_layout(**create_plotly_layout("Expected Profit by Share Contacted", 380))
+                fig.update_xaxes(title="Customers contacted (%)")
+                fig.update_yaxes(title="Profit (R$)")
+                st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+            with col2:
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(
+                    x=curves['share_contacted'] * 100, y=curves['recall'] * 100, mode='lines',
+                    line=dict(color=theme['secondary'], width=3), name='Model',
+                    customdata=curves['lift'],
+                    hovertemplate="Top %{x:.1f}%: %{y:.1f}% of churners<br>Lift: %{customdata:.2f}x<extra></extra>"
+                ))
+                fig.add_trace(go.Scatter(
+                    x=[0, 100], y=[0, 100], mode='lines', name='Random',
+                    line=dict(color=theme['muted'], width=2, dash='dash'), hoverinfo='skip'
+                ))
+                fig.update_layout(**create_plotly_layout("Cumulative Gain", 380))
+                fig.update_xaxes(title="Customers contacted (%)")
+                fig.update_yaxes(title="Churners reached (%)")
+                st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+            
+            st.caption(f"{len(scored):,} held-out customers, {len(curves) - 1:,} distinct thresholds, scaled ×{population / len(scored):.2f}. "
+                       "Profit = kept share × value of churners reached − offer cost × customers contacted.")
+            st.markdown("---")
+        
         st.markdown("### 📝 Summary of Findings")
         
         st.warning("""
@@ -1107,12 +1636,14 @@ elif page == "📋 Data Explorer":
     st.markdown("---")
     
     dataset_options = {
-        "Monthly Revenue": data['monthly_revenue'],
-        "Retention Metrics": data['retention_metrics'],
-        "Churn Features": data['churn_features'],
-        "A/B Test Results": data['ab_test'],
-        "Statistical Tests": data['statistical_tests'],
-        "Model Coefficients": data['logistic_coef']
+        "Monthly Revenue": 'monthly_revenue',
+        "Retention Metrics": 'retention_metrics',
+        "Churn Features": 'churn_features',
+        "A/B Test Results": 'ab_test',
+        "Statistical Tests": 'statistical_tests',
+        "Model Coefficients": 'logistic_coef',
+        "Category Facts": 'category_facts',
+        "Seller Scorecards": 'seller_scorecards'
     }
     
     col1, col2 = st.columns([2, 1])
@@ -1121,7 +1652,8 @@ elif page == "📋 Data Explorer":
     with col2:
         show_stats = st.checkbox("Show Statistics", value=True)
     
-    df = dataset_options[selected_dataset]
+    dataset_key = dataset_options[selected_dataset]
+    df = data[dataset_key]
     
     if df is not None:
         col1, col2, col3 = st.columns(3)
@@ -1147,9 +1679,9 @@ elif page == "📋 Data Explorer":
         st.markdown("### 📄 Data Preview")
         st.dataframe(display_df.head(100), use_container_width=True, height=400)
         
-        if show_stats and len(df.select_dtypes(include=['number']).columns) > 0:
+        if show_stats and f"describe__{dataset_key}" in data:
             st.markdown("### 📊 Quick Statistics")
-            st.dataframe(df.describe(), use_container_width=True)
+            st.dataframe(data[f"describe__{dataset_key}"].set_index('stat'), use_container_width=True)
         
         # Download option
         st.markdown("### 📥 Download Data")
@@ -1163,6 +1695,71 @@ elif page == "📋 Data Explorer":
     else:
         st.error(f"{selected_dataset} data not available.")
 
+# ============================================================================
+# PAGE: SQL QUERY
+# ============================================================================
+elif page == "🧮 SQL Query":
+    from query_engine import QueryEngine, QueryError, load_saved_queries
+
+    @st.cache_resource
+    def get_query_engine():
+        """Shared DuckDB engine and result cache"""
+        return QueryEngine()
+
+    engine = get_query_engine()
+
+    st.markdown("# 🧮 SQL Query")
+    st.markdown("### Run read-only SQL against the warehouse")
+    
+    st.markdown("---")
+    
+    saved_queries = load_saved_queries()
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        saved = st.selectbox("Saved query:", ["(none)"] + list(saved_queries.keys()))
+    with col2:
+        row_limit = st.number_input("Row limit", min_value=100, max_value=1_000_000, value=10_000, step=1000)
+    with col3:
+        timeout = st.number_input("Timeout (s)", min_value=1, max_value=600, value=30)
+    
+    default_sql = saved_queries.get(saved, "SELECT * FROM churn_features LIMIT 100;")
+    sql = st.text_area("SQL", value=default_sql, height=220)
+    st.caption(f"Tables: {', '.join(sorted(engine.sources)) or 'none - run the pipeline first'}")
+    st.caption("Read-only: one SELECT per run, and queries can only read the tables above "
+               "(files under data/processed/ and the listed output files); other paths are refused.")
+    
+    if st.button("▶️ Run Query"):
+        st.session_state.sql_query = sql
+    
+    if st.session_state.get('sql_query'):
+        try:
+            result = engine.run(st.session_state.sql_query, row_limit=int(row_limit), timeout=float(timeout))
+        except QueryError as e:
+            st.error(str(e))
+        else:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Rows", f"{result.num_rows:,}{'+' if result.truncated else ''}")
+            with col2:
+                st.metric("Query Time", "cached" if result.cached else f"{result.elapsed * 1000:,.0f} ms")
+            with col3:
+                st.metric("Data Version", engine.data_version()[:8])
+            
+            if result.truncated:
+                st.warning(f"Result truncated at the {int(row_limit):,}-row limit.")
+            
+            page_size = 100
+            pages = max(1, -(-result.num_rows // page_size))
+            page_number = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+            st.dataframe(result.page(page_number - 1, page_size), use_container_width=True, height=400)
+            
+            st.download_button(
+                label="⬇️ Download result as CSV",
+                data=result.table.to_pandas().to_csv(index=False),
+                file_name="query_result.csv",
+                mime="text/csv"
+            )
+
 # ============================================================================
 # FOOTER
 # ============================================================================
@@ -1173,3 +1770,25 @@ st.markdown(f"""
     <p>Data Source: <a href='https://www.kaggle.com/olistbr/brazilian-ecommerce' target='_blank'>Olist Brazilian E-Commerce Dataset</a></p>
 </div>
 """, unsafe_allow_html=True)
+
+# ============================================================================
+# SERVING METRICS
+# ============================================================================
+metrics.record(st.session_state.session_id, time.perf_counter() - rerun_started, rss_at_start)
+write_report()
+
+with st.sidebar.expander("🖥️ Server Metrics"):
+    server = metrics.summary()
+    session = metrics.session_summary(st.session_state.session_id)
+    st.markdown(f"""
+    | Counter | Value |
+    |---------|-------|
+    | Active sessions | {server['sessions_active']} / {server['sessions_total']} |
+    | Reruns (all sessions) | {server['reruns']:,} |
+    | Rerun p50 / p95 | {server['p50_ms']:.0f} / {server['p95_ms']:.0f} ms |
+    | This session p50 / p95 | {session['p50_ms']:.0f} / {session['p95_ms']:.0f} ms |
+    | This session RSS growth | {session['rss_delta_bytes'] / 2**20:+.1f} MB |
+    | Process RSS (peak) | {server['rss_bytes'] / 2**20:.0f} MB ({server['peak_rss_bytes'] / 2**20:.0f} MB) |
+    | Shared snapshot (mapped) | {data.mapped_bytes / 2**20:.1f} MB |
+    | Shared frames (heap) | {data.frame_bytes / 2**20:.1f} MB |
+    """)
@@ -0,0 +1,110 @@
+"""
+Benchmark: revenue queries on month-partitioned vs single-file orders/payments.
+
+Copies the processed orders and payments into one flat parquet file each
+(same rows, same year/month columns, no directory layout), then runs the
+same revenue query over both layouts for one month, one year and the full
+history. Partition filters on the partitioned layout let DuckDB skip every
+other month's files; the flat layout has to rely on row-group statistics.
+
+    python scripts/bench_partitions.py --repeat 7 --scale 4
+
+`--scale` stacks that many copies of the rows (keys shifted per copy) so the
+difference is visible beyond the sample dataset's size.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import time
+
+from warehouse import BASE_DIR, PARTITIONED_TABLES, connect, table_scan
+
+
+FILTERS = {
+    "one month (2017-11)": "o.year = 2017 AND o.month = 11",
+    "one year (2017)": "o.year = 2017",
+    "full history": "TRUE",
+}
+
+
+def revenue_sql(orders, payments, where):
+    return f"""
+        SELECT
+            DATE_TRUNC('month', o.order_purchase_timestamp) AS month,
+            ROUND(SUM(p.payment_value), 2) AS revenue
+        FROM {orders} o
+        JOIN {payments} p
+            ON o.order_id = p.order_id
+            AND o.year = p.year
+            AND o.month = p.month
+        WHERE o.order_status = 'delivered'
+            AND {where}
+        GROUP BY 1
+        ORDER BY 1
+    """
+
+
+def build_layouts(con, work_dir, scale):
+    """Write flat and partitioned copies of orders and payments; return their scans."""
+    offset = con.execute(f"SELECT MAX(order_id) + 1 FROM {table_scan('orders')};").fetchone()[0]
+    scans = {"flat": {}, "partitioned": {}}
+    for table in PARTITIONED_TABLES:
+        rows = f"""
+            SELECT * REPLACE (order_id::BIGINT + r.k * {offset} AS order_id)
+            FROM {table_scan(table)}, range({scale}) r(k)
+        """
+        if table == "orders":
+            rows += " ORDER BY order_purchase_timestamp"
+
+        flat_path = os.path.join(work_dir, "flat", f"{table}.parquet")
+        os.makedirs(os.path.dirname(flat_path), exist_ok=True)
+        con.execute(f"COPY ({rows}) TO '{flat_path}' (FORMAT PARQUET);")
+        scans["flat"][table] = f"read_parquet('{flat_path}')"
+
+        part_dir = os.path.join(work_dir, "partitioned", table)
+        # COPY creates the partition directories but not their parents
+        os.makedirs(os.path.dirname(part_dir), exist_ok=True)
+        con.execute(f"COPY ({rows}) TO '{part_dir}' (FORMAT PARQUET, PARTITION_BY (year, month));")
+        scans["partitioned"][table] = f"read_parquet('{part_dir}/**/*.parquet', hive_partitioning = true)"
+    return scans
+
+
+def time_query(con, sql, repeat):
+    con.execute(sql).fetchall()  # warm the OS cache and parquet metadata
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = con.execute(sql).fetchall()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioned vs flat revenue queries")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--scale", type=int, default=1, help="copies of the order history")
+    parser.add_argument("--work-dir", default=os.path.join(BASE_DIR, "data", "bench_partitions"))
+    args = parser.parse_args()
+
+    shutil.rmtree(args.work_dir, ignore_errors=True)
+    con = connect(ordered=False)
+    scans = build_layouts(con, args.work_dir, args.scale)
+
+    print(f"{'query':<22}{'flat ms':>10}{'partitioned ms':>16}{'speedup':>10}")
+    for label, where in FILTERS.items():
+        flat, flat_rows = time_query(con, revenue_sql(scans["flat"]["orders"], scans["flat"]["payments"], where), args.repeat)
+        part, part_rows = time_query(
+            con, revenue_sql(scans["partitioned"]["orders"], scans["partitioned"]["payments"], where), args.repeat
+        )
+        if flat_rows != part_rows:
+            raise SystemExit(f"Layouts disagree for {label}")
+        print(f"{label:<22}{flat * 1000:>10.1f}{part * 1000:>16.1f}{flat / part:>9.1f}x")
+
+    con.close()
+    shutil.rmtree(args.work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+End-to-end check and latency benchmark of serve_profiles.py on localhost.
+
+Starts the service in-process on a free localhost port against the published
+profile store, then over one keep-alive connection:
+
+- fetches `--singles` random customers one at a time and `--batches` batches
+  of `--batch-size`, comparing every profile with a direct store lookup
+- checks that an unknown id gets a 404 and a malformed batch a 400
+- with --check-reload, publishes a new store version and waits for the
+  service to switch to it without dropping the connection
+
+It prints client-side latency percentiles (which include the loopback round
+trip) next to the service's own histograms from /metrics, and exits non-zero
+on any mismatch.
+
+    python scripts/bench_profile_service.py [--singles 2000] [--batches 50] [--batch-size 500] [--check-reload]
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import random
+import sys
+import time
+
+from profile_store import STORE_DIR, publish
+from serve_profiles import ProfileServer
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def percentiles_ms(seconds):
+    ordered = sorted(seconds)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return f"p50 {pick(0.5):.3f} ms, p99 {pick(0.99):.3f} ms, max {ordered[-1] * 1000:.3f} ms"
+
+
+def check(condition, message):
+    if not condition:
+        print(f"CHECK FAILED: {message}")
+        sys.exit(1)
+
+
+def expected(store, customer_id):
+    # what the profile looks like after a JSON round trip
+    return json.loads(json.dumps(store.get(customer_id)))
+
+
+async def run(args):
+    app = ProfileServer(args.store_dir, reload_interval=args.reload_interval)
+    server = await app.start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    store = app.store
+    print(f"Service on 127.0.0.1:{port}, store {store.version} ({len(store):,} customers)")
+    check(len(store) > 0, "the published store is empty")
+
+    rng = random.Random(args.seed)
+    ids = [store.ids[rng.randrange(len(store))].decode() for _ in range(args.singles)]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    latencies = []
+    for customer_id in ids:
+        started = time.perf_counter()
+        status, profile = await request(reader, writer, "GET", f"/customers/{customer_id}")
+        latencies.append(time.perf_counter() - started)
+        check(status == 200 and profile == expected(store, customer_id), f"profile of {customer_id}")
+    print(f"\n{args.singles:,} single lookups: {percentiles_ms(latencies)}")
+
+    latencies = []
+    for _ in range(args.batches):
+        batch = [store.ids[rng.randrange(len(store))].decode() for _ in range(args.batch_size)] + ["not-a-customer"]
+        started = time.perf_counter()
+        status, result = await request(reader, writer, "POST", "/customers", {"ids": batch})
+        latencies.append(time.perf_counter() - started)
+        check(status == 200 and result["missing"] == ["not-a-customer"], "batch missing ids")
+        check(result["profiles"] == [expected(store, i) for i in batch[:-1]], "batch profiles")
+    if latencies:
+        print(f"{args.batches:,} batches of {args.batch_size:,}: {percentiles_ms(latencies)} "
+              f"({args.batch_size / (sorted(latencies)[len(latencies) // 2] or 1e-9):,.0f} profiles/s at p50)")
+
+    status, _ = await request(reader, writer, "GET", "/customers/not-a-customer")
+    check(status == 404, "unknown id should be 404")
+    status, _ = await request(reader, writer, "POST", "/customers", {"customers": []})
+    check(status == 400, "malformed batch should be 400")
+
+    if args.check_reload:
+        loop = asyncio.get_running_loop()
+        version = await loop.run_in_executor(None, functools.partial(publish, store_dir=args.store_dir))
+        deadline = time.monotonic() + max(10 * args.reload_interval, 5)
+        while True:
+            status, health = await request(reader, writer, "GET", "/health")
+            if health["version"] == version:
+                break
+            check(time.monotonic() < deadline, f"service did not switch to {version}")
+            await asyncio.sleep(args.reload_interval / 4)
+        print(f"\nReloaded to {version} on the open connection (reloads: {health['reloads']})")
+
+    status, metrics = await request(reader, writer, "GET", "/metrics")
+    print("\nService-side latency (request parsed -> response queued):")
+    for endpoint, summary in metrics["latency"].items():
+        print(f"  {endpoint:<8} {summary['count']:>7,} requests, mean {summary['mean_ms']:.3f} ms, "
+              f"p50 <= {summary['p50_ms']:.3f} ms, p99 <= {summary['p99_ms']:.3f} ms")
+
+    writer.close()
+    await writer.wait_closed()
+    await app.stop(server)
+    print("\nAll checks passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the profile service on localhost")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--singles", type=int, default=2000)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--reload-interval", type=float, default=0.2)
+    parser.add_argument("--check-reload", action="store_true",
+                        help="publish a new store version and wait for the service to pick it up")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Customer-level churn feature queries.
+
+Shared by run_churn_feature_extraction_v2.py (every customer) and
+run_watcher.py (only customers touched by newly ingested orders). Each query
+takes a `where` predicate on `c.customer_unique_id` that restricts which
+customers are computed; the default computes all of them.
+
+`customer_attributes_query` adds categorical attributes (state, main
+category) for models that can use them; they are joined on by the model
+scripts rather than stored in the incrementally maintained feature table.
+
+`sketch_segments` defines the groups whose feature distributions are kept as
+mergeable quantile sketches (see quantile_sketch.py) next to the feature
+table, so medians and box plots never need the full columns.
+"""
+
+
+def base_features_query(dataset_end_date, where="TRUE"):
+    """Order counts, revenue, first/last order and the 90-day churn flag."""
+    return f"""
+WITH customer_orders AS (
+    SELECT
+        c.customer_unique_id,
+        COUNT(DISTINCT o.order_id) AS total_orders,
+        MIN(o.order_purchase_timestamp)::DATE AS first_order_date,
+        MAX(o.order_purchase_timestamp)::DATE AS last_order_date
+    FROM orders o
+    JOIN customers c
+        ON o.customer_id = c.customer_id
+    WHERE o.order_status = 'delivered'
+        AND {where}
+    GROUP BY c.customer_unique_id
+),
+
+customer_revenue AS (
+    SELECT
+        c.customer_unique_id,
+        SUM(p.payment_value) AS total_revenue,
+        AVG(p.payment_value) AS avg_order_value
+    FROM orders o
+    JOIN customers c
+        ON o.customer_id = c.customer_id
+    JOIN payments p
+        ON o.order_id = p.order_id
+    WHERE o.order_status = 'delivered'
+        AND {where}
+    GROUP BY c.customer_unique_id
+)
+
+SELECT
+    co.customer_unique_id,
+    co.total_orders,
+    cr.total_revenue,
+    cr.avg_order_value,
+    co.first_order_date,
+    co.last_order_date,
+    DATE '{dataset_end_date}' - co.last_order_date AS days_since_last_order,
+    CASE
+        WHEN DATE '{dataset_end_date}' - co.last_order_date > 90 THEN 1
+        ELSE 0
+    END AS is_churned
+FROM customer_orders co
+LEFT JOIN customer_revenue cr
+    ON co.customer_unique_id = cr.customer_unique_id
+"""
+
+
+def delivery_review_query(where="TRUE"):
+    """
+    Delivery, review and freight features in one columnar pass: reviews and
+    items are pre-reduced to one row per order, then grouped by customer.
+    """
+    return f"""
+WITH order_reviews AS (
+    SELECT
+        order_id,
+        AVG(review_score) AS review_score
+    FROM reviews
+    GROUP BY order_id
+),
+
+order_freight AS (
+    SELECT
+        order_id,
+        SUM(price) AS item_value,
+        SUM(freight_value) AS freight_value
+    FROM order_items
+    GROUP BY order_id
+)
+
+SELECT
+    c.customer_unique_id,
+    AVG(DATE_DIFF('day', o.order_estimated_delivery_date, o.order_delivered_customer_date))
+        AS avg_delivery_delay_days,
+    AVG((o.order_delivered_customer_date > o.order_estimated_delivery_date)::INT)
+        AS late_delivery_rate,
+    AVG(r.review_score) AS avg_review_score,
+    MIN(r.review_score) AS min_review_score,
+    SUM(f.freight_value) / NULLIF(SUM(f.item_value + f.freight_value), 0) AS freight_share
+FROM orders o
+JOIN customers c
+    ON o.customer_id = c.customer_id
+LEFT JOIN order_reviews r
+    ON o.order_id = r.order_id
+LEFT JOIN order_freight f
+    ON o.order_id = f.order_id
+WHERE o.order_status = 'delivered'
+    AND {where}
+GROUP BY c.customer_unique_id
+"""
+
+
+def customer_attributes_query(where="TRUE"):
+    """
+    State of the customer's first delivered order and the category they bought
+    most items of. Needs the products, category_translation and dict_category
+    views besides orders/customers/order_items.
+    """
+    return f"""
+WITH customer_states AS (
+    SELECT
+        c.customer_unique_id,
+        ARG_MIN(c.customer_state, o.order_purchase_timestamp) AS customer_state
+    FROM orders o
+    JOIN customers c
+        ON o.customer_id = c.customer_id
+    WHERE o.order_status = 'delivered'
+        AND {where}
+    GROUP BY c.customer_unique_id
+),
+
+customer_categories AS (
+    SELECT
+        c.customer_unique_id,
+        p.product_category_name,
+        COUNT(*) AS items
+    FROM orders o
+    JOIN customers c
+        ON o.customer_id = c.customer_id
+    JOIN order_items i
+        ON o.order_id = i.order_id
+    JOIN products p
+        ON i.product_id = p.product_id
+    WHERE o.order_status = 'delivered'
+        AND p.product_category_name IS NOT NULL
+        AND {where}
+    GROUP BY c.customer_unique_id, p.product_category_name
+),
+
+main_categories AS (
+    SELECT
+        customer_unique_id,
+        ARG_MAX(product_category_name, items) AS product_category_name
+    FROM customer_categories
+    GROUP BY customer_unique_id
+)
+
+SELECT
+    s.customer_unique_id,
+    s.customer_state,
+    COALESCE(t.product_category_name_english, d.id) AS main_category
+FROM customer_states s
+LEFT JOIN main_categories m
+    ON s.customer_unique_id = m.customer_unique_id
+LEFT JOIN dict_category d
+    ON m.product_category_name = d.key
+LEFT JOIN category_translation t
+    ON m.product_category_name = t.product_category_name
+"""
+
+
+# joins run on integer keys; hex ids are restored only for the output file
+FEATURES_QUERY = """
+    SELECT
+        b.*,
+        d.* EXCLUDE (customer_unique_id)
+    FROM base_features b
+    LEFT JOIN delivery_features d
+        ON b.customer_unique_id = d.customer_unique_id
+"""
+
+
+def dataset_end_date(con):
+    return con.execute("""
+    SELECT MAX(order_purchase_timestamp)::DATE FROM orders;
+    """).fetchone()[0]
+
+
+# feature distributions summarized per segment
+SKETCH_FEATURES = ["total_orders", "total_revenue", "avg_order_value", "days_since_last_order"]
+
+
+def sketch_segments(df):
+    """Segment label per customer for each sketch dimension."""
+    import numpy as np
+    import pandas as pd
+
+    def buckets(values, edges, labels):
+        return pd.cut(values, edges, labels=labels).astype(object).fillna("unknown")
+
+    return {
+        "all": pd.Series("all", index=df.index),
+        "churn_status": df["is_churned"].map({1: "churned", 0: "active"}),
+        # same buckets as sql/churn_statistical_analysis.sql
+        "order_bucket": buckets(
+            df["total_orders"], [0, 1, 3, 6, np.inf],
+            ["1 order", "2-3 orders", "4-6 orders", "7+ orders"],
+        ),
+        "revenue_bucket": buckets(
+            df["total_revenue"], [-np.inf, 50, 100, 200, 500, np.inf],
+            ["<50", "50-100", "100-200", "200-500", "500+"],
+        ),
+        "first_order_month": pd.to_datetime(df["first_order_date"]).dt.strftime("%Y-%m"),
+    }
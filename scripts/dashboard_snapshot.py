@@ -0,0 +1,394 @@
+"""
+Precomputed snapshot bundle for the Streamlit dashboard.
+
+The bundle is a single file holding every page-ready table as an Arrow IPC
+segment, followed by a JSON index and a fixed-size footer:
+
+    [ipc segment]...[ipc segment][json index][index length: u64][MAGIC]
+
+`load_snapshot` memory-maps the file and opens each segment as a zero-copy
+Arrow table, so a dashboard cold start costs a handful of stat calls plus an
+mmap instead of re-reading and re-aggregating the output CSVs. The index
+records SNAPSHOT_VERSION and the size/mtime of every source CSV; when either
+no longer matches, the bundle is rebuilt automatically. Rebuilds are
+per source: tables derived from unchanged CSVs are copied from the old bundle.
+
+Run directly to (re)build the bundle:
+
+    python scripts/dashboard_snapshot.py
+"""
+
+import json
+import os
+import struct
+import threading
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+SNAPSHOT_PATH = os.path.join(OUTPUT_DIR, "dashboard_snapshot.arrow")
+
+# bump whenever the set of tables or their layout changes
+SNAPSHOT_VERSION = 13
+MAGIC = b"OLSNAP01"
+FOOTER = struct.Struct("<Q8s")
+ALIGNMENT = 64
+
+# snapshot key -> output file (CSV or parquet) it is derived from
+SOURCES = {
+    "monthly_revenue": "monthly_revenue.csv",
+    "daily_revenue": "daily_revenue.csv",
+    "customer_sketches": "customer_sketches.parquet",
+    "retention_metrics": "retention_metrics.csv",
+    "churn_features": "churn_features_v2.csv",
+    "churn_sketches": "churn_sketches.parquet",
+    "ab_test": "ab_test_second_purchase_results.csv",
+    "statistical_tests": "churn_statistical_tests.csv",
+    "logistic_coef": "logistic_regression_coefficients_v2.csv",
+    "churn_test_scores": "churn_test_scores.csv",
+    "model_comparison": "model_comparison.csv",
+    "category_facts": "category_monthly_facts.csv",
+    "category_dim": "category_dim.csv",
+    "seller_scorecards": "seller_scorecards.csv",
+    "co_purchase_category": "co_purchase_category.csv",
+    "co_purchase_product": "co_purchase_product.csv",
+    "survival_curves": "survival_curves.csv",
+    "survival_hazard": "survival_hazard.csv",
+    "survival_summary": "survival_summary.csv",
+    "geo_states": "geo_state_summary.csv",
+    "geo_cities": "geo_city_summary.csv",
+    "revenue_forecast": "revenue_forecast.csv",
+    "forecast_metrics": "forecast_metrics.csv",
+}
+
+# snapshot key -> lookup sources its derived tables also read
+DEPENDS = {
+    "category_facts": ["category_dim"],
+}
+LOOKUPS = {"category_dim"}
+
+
+def source_stamp():
+    """Version stamp of the inputs: (size, mtime_ns) of every source CSV."""
+    stamp = {"version": SNAPSHOT_VERSION}
+    for key, file_name in SOURCES.items():
+        try:
+            st = os.stat(os.path.join(OUTPUT_DIR, file_name))
+            stamp[key] = [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            stamp[key] = None
+    return stamp
+
+
+# ----------------------------------------------------------------------------
+# Build
+# ----------------------------------------------------------------------------
+def _describe(df):
+    # numeric only: pandas 2 also describes datetimes, mixing Timestamps into
+    # object columns that Arrow cannot convert
+    desc = df.describe(include="number")
+    desc.index.name = "stat"
+    return desc.reset_index()
+
+
+def _derive(key, frames):
+    """Tables and scalars derived from source `key`."""
+    import pandas as pd
+
+    df = frames[key]
+    tables = {}
+    scalars = {}
+
+    if key == "monthly_revenue":
+        df["month"] = pd.to_datetime(df["month"])
+        yearly = df.groupby(df["month"].dt.year)["revenue"].sum()
+        tables["yearly_revenue"] = yearly.rename_axis("year").reset_index()
+        scalars["total_revenue"] = float(df["revenue"].sum())
+
+    elif key == "daily_revenue":
+        from prefix_index import PrefixSumIndex
+
+        df["day"] = pd.to_datetime(df["day"])
+        # running totals, so the Revenue page answers any date range in O(1)
+        index = PrefixSumIndex.from_daily(df, ["revenue", "orders", "new_customers"])
+        tables["daily_revenue_index"] = index.to_frame()
+
+    elif key == "revenue_forecast":
+        df["period"] = pd.to_datetime(df["period"])
+
+    elif key == "category_facts":
+        df["month"] = pd.to_datetime(df["month"])
+        if "category_dim" in frames:
+            names = frames["category_dim"].set_index("category_code")["category"]
+            df["category"] = df["category_code"].map(names)
+        else:
+            df["category"] = df["category_code"].astype("string")
+        df["category"] = df["category"].fillna("unknown")
+
+    elif key == "retention_metrics":
+        scalars["total_customers"] = int(df["total_customers"].iloc[0])
+        scalars["repeat_customers"] = int(df["repeat_customers"].iloc[0])
+        scalars["repeat_rate"] = float(df["repeat_purchase_rate"].iloc[0])
+
+    elif key == "churn_features":
+        order_dist = df["total_orders"].value_counts().sort_index().reset_index()
+        order_dist.columns = ["orders", "customers"]
+        tables["order_frequency"] = order_dist
+        scalars["pct_one_order"] = float((df["total_orders"] == 1).mean() * 100)
+        scalars["avg_orders"] = float(df["total_orders"].mean())
+        scalars["max_orders"] = int(df["total_orders"].max())
+
+    elif key == "ab_test":
+        control = df[df["group"] == "control"].iloc[0]
+        treatment = df[df["group"] == "treatment"].iloc[0]
+        scalars["ab"] = {
+            "control_rate": float(control["conversion_rate"]),
+            "treatment_rate": float(treatment["conversion_rate"]),
+            "control_users": int(control["users"]),
+            "control_conversions": int(control["conversions"]),
+            "treatment_users": int(treatment["users"]),
+            "treatment_conversions": int(treatment["conversions"]),
+            "lift": float(treatment["conversion_rate"] / control["conversion_rate"] - 1),
+            "z_score": float(df["z_score"].iloc[0]),
+            "p_value": float(df["p_value"].iloc[0]),
+        }
+
+    tables[key] = df
+    if len(df.select_dtypes(include=["number"]).columns) > 0:
+        tables[f"describe__{key}"] = _describe(df)
+    return tables, scalars
+
+
+def snapshot_keys():
+    return [key for key in SOURCES if key not in LOOKUPS]
+
+
+def changed_keys(old_stamp, new_stamp):
+    """Snapshot keys whose source, or a lookup it reads, differs between stamps."""
+    if old_stamp.get("version") != new_stamp.get("version"):
+        return snapshot_keys()
+    return [
+        key for key in snapshot_keys()
+        if any(old_stamp.get(k) != new_stamp.get(k) for k in [key] + DEPENDS.get(key, []))
+    ]
+
+
+def compute_aggregates(keys=None):
+    """
+    Read the output CSVs for `keys` (default: all) once and derive every
+    table the pages display.
+
+    Returns (tables, scalars, groups); groups maps each key to the names of
+    the tables and scalars derived from it, so a later rebuild can recompute
+    only the keys whose CSVs changed.
+    """
+    import pandas as pd
+
+    keys = snapshot_keys() if keys is None else keys
+    frames = {}
+    for key in set(keys).union(*(DEPENDS.get(k, []) for k in keys)):
+        path = os.path.join(OUTPUT_DIR, SOURCES[key])
+        if os.path.exists(path):
+            frames[key] = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+    tables = {}
+    scalars = {}
+    groups = {}
+    for key in keys:
+        derived_tables, derived_scalars = _derive(key, frames) if key in frames else ({}, {})
+        tables.update(derived_tables)
+        scalars.update(derived_scalars)
+        groups[key] = {"tables": list(derived_tables), "scalars": list(derived_scalars)}
+
+    return tables, scalars, groups
+
+
+def build_snapshot(path=SNAPSHOT_PATH, previous=None):
+    """
+    Write the bundle atomically and return its index.
+
+    With a `previous` Snapshot, only keys whose sources changed since it was
+    built are recomputed; every other table is copied over as Arrow data
+    without touching its CSV.
+    """
+    import pyarrow as pa
+
+    stamp = source_stamp()
+    keys = None if previous is None else changed_keys(previous.stamp, stamp)
+    tables, scalars, groups = compute_aggregates(keys)
+
+    if previous is not None:
+        for key in snapshot_keys():
+            if key in groups or key not in previous.groups:
+                continue
+            group = previous.groups[key]
+            groups[key] = group
+            tables.update({name: previous.table(name) for name in group["tables"]})
+            scalars.update({name: previous.scalars[name] for name in group["scalars"]})
+
+    index = {"stamp": stamp, "scalars": scalars, "groups": groups, "tables": {}}
+    # unique per writer: the watcher and a dashboard may rebuild concurrently
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            for name, df in tables.items():
+                table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+                # keep every segment 64-byte aligned so mmap reads stay zero-copy
+                f.write(b"\0" * (-f.tell() % ALIGNMENT))
+                offset = f.tell()
+                with pa.ipc.new_file(f, table.schema) as writer:
+                    writer.write_table(table)
+                index["tables"][name] = [offset, f.tell() - offset]
+
+            payload = json.dumps(index).encode()
+            f.write(payload)
+            f.write(FOOTER.pack(len(payload), MAGIC))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return index
+
+
+# ----------------------------------------------------------------------------
+# Load
+# ----------------------------------------------------------------------------
+class Snapshot:
+    """
+    Read-only view over a memory-mapped bundle.
+
+    `table(name)` returns the zero-copy Arrow table; indexing (`snap[name]`)
+    returns a pandas DataFrame converted on first access, or None when the
+    source CSV was missing at build time.
+
+    One instance is shared by every dashboard session, so conversions happen
+    once per process. Frames are built with `split_blocks=True`, which lets
+    numeric columns without nulls stay read-only views onto the mapped file;
+    callers must copy before mutating.
+    """
+
+    def __init__(self, path):
+        import pyarrow as pa
+
+        self._pa = pa
+        self._source = pa.memory_map(path, "r")
+        buf = self._source.read_buffer()
+
+        index_len, magic = FOOTER.unpack(buf.slice(buf.size - FOOTER.size).to_pybytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a dashboard snapshot")
+        start = buf.size - FOOTER.size - index_len
+        index = json.loads(buf.slice(start, index_len).to_pybytes())
+
+        self.stamp = index["stamp"]
+        self.scalars = index["scalars"]
+        self.groups = index["groups"]
+        self._buf = buf
+        self._segments = index["tables"]
+        self._tables = {}
+        self._frames = {}
+        self._frame_bytes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def mapped_bytes(self):
+        return self._buf.size
+
+    @property
+    def frame_bytes(self):
+        """Heap memory held by the pandas frames converted so far (measured once per frame)."""
+        return sum(list(self._frame_bytes.values()))
+
+    def adopt(self, previous):
+        """
+        Reuse frames already converted by `previous` for every key whose
+        sources did not change, so a refresh only pays for what changed.
+        """
+        if previous is None:
+            return
+        unchanged = set(snapshot_keys()) - set(changed_keys(previous.stamp, self.stamp))
+        with self._lock:
+            for key in unchanged:
+                for name in self.groups.get(key, {}).get("tables", []):
+                    if name in previous._frames and name not in self._frames:
+                        self._frames[name] = previous._frames[name]
+                        self._frame_bytes[name] = previous._frame_bytes.get(name, 0)
+
+    def __contains__(self, name):
+        return name in self._segments
+
+    def table(self, name):
+        if name not in self._tables:
+            with self._lock:
+                if name not in self._tables:
+                    offset, length = self._segments[name]
+                    reader = self._pa.ipc.open_file(self._buf.slice(offset, length))
+                    self._tables[name] = reader.read_all()
+        return self._tables[name]
+
+    def __getitem__(self, name):
+        if name not in self._segments:
+            return None
+        if name not in self._frames:
+            table = self.table(name)
+            with self._lock:
+                if name not in self._frames:
+                    df = table.to_pandas(split_blocks=True)
+                    self._frame_bytes[name] = int(df.memory_usage(deep=True).sum())
+                    self._frames[name] = df
+        return self._frames[name]
+
+
+def load_snapshot(path=SNAPSHOT_PATH, previous=None):
+    """
+    Open the bundle, rebuilding it first if missing or stale.
+
+    A stale bundle is rebuilt incrementally from its own contents; with a
+    `previous` Snapshot, frames it already converted carry over.
+    """
+    stamp = source_stamp()
+    current = None
+    try:
+        current = Snapshot(path)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if current is None or current.stamp != stamp:
+        base = current if current is not None and current.stamp.get("version") == SNAPSHOT_VERSION else None
+        build_snapshot(path, previous=base)
+        current = Snapshot(path)
+
+    current.adopt(previous)
+    return current
+
+
+class SnapshotStore:
+    """
+    Process-wide holder of the current Snapshot.
+
+    `get()` costs one stat per source CSV; when a stamp changes (e.g. the
+    watcher refreshed monthly_revenue.csv) the new bundle is opened and only
+    the affected tables are converted again.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self._snap = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        stamp = source_stamp()
+        if self._snap is None or self._snap.stamp != stamp:
+            with self._lock:
+                if self._snap is None or self._snap.stamp != stamp:
+                    self._snap = load_snapshot(self.path, previous=self._snap)
+        return self._snap
+
+
+if __name__ == "__main__":
+    index = build_snapshot()
+    print(f"Snapshot v{SNAPSHOT_VERSION} written to {SNAPSHOT_PATH}")
+    for name, (offset, length) in index["tables"].items():
+        print(f"  {name:<36} {length / 1024:8.1f} KB")
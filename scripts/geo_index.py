@@ -0,0 +1,97 @@
+"""
+Zip-prefix centroid index built from the Olist geolocation table.
+
+The raw geolocation table has about a million rows, most of them repeated
+coordinates for the same `zip_code_prefix`. `build_centroids` collapses it to
+one centroid per prefix with sort-based NumPy reductions, and ZipIndex keeps
+the result as three compact parallel arrays (sorted int32 prefixes, float32
+lat/lng) so customer and seller lookups are a single `searchsorted`.
+"""
+
+import numpy as np
+
+
+# Bounding box of Brazil; the raw table contains a few points far outside it
+LAT_RANGE = (-34.0, 5.5)
+LNG_RANGE = (-74.0, -34.0)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def build_centroids(zips, lat, lng):
+    """
+    Mean coordinate per zip prefix, counting each distinct point once.
+
+    Returns (zips, lat, lng) sorted by zip prefix.
+    """
+    zips = np.asarray(zips, dtype=np.int32)
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+
+    valid = (
+        (lat >= LAT_RANGE[0]) & (lat <= LAT_RANGE[1])
+        & (lng >= LNG_RANGE[0]) & (lng <= LNG_RANGE[1])
+    )
+    zips, lat, lng = zips[valid], lat[valid], lng[valid]
+
+    # drop exact duplicate (zip, lat, lng) rows so busy prefixes are not skewed
+    order = np.lexsort((lng, lat, zips))
+    zips, lat, lng = zips[order], lat[order], lng[order]
+    distinct = np.ones(len(zips), dtype=bool)
+    distinct[1:] = (zips[1:] != zips[:-1]) | (lat[1:] != lat[:-1]) | (lng[1:] != lng[:-1])
+    zips, lat, lng = zips[distinct], lat[distinct], lng[distinct]
+
+    starts = np.flatnonzero(np.r_[True, zips[1:] != zips[:-1]])
+    counts = np.diff(np.r_[starts, len(zips)])
+
+    return (
+        zips[starts],
+        (np.add.reduceat(lat, starts) / counts).astype(np.float32),
+        (np.add.reduceat(lng, starts) / counts).astype(np.float32),
+    )
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lng1, lat2, lng2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class ZipIndex:
+    def __init__(self, zips, lat, lng):
+        self.zips = np.asarray(zips, dtype=np.int32)
+        self.lat = np.asarray(lat, dtype=np.float32)
+        self.lng = np.asarray(lng, dtype=np.float32)
+
+    @classmethod
+    def from_geolocation(cls, zips, lat, lng):
+        return cls(*build_centroids(zips, lat, lng))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f["zips"], f["lat"], f["lng"])
+
+    def save(self, path):
+        np.savez(path, zips=self.zips, lat=self.lat, lng=self.lng)
+
+    def __len__(self):
+        return len(self.zips)
+
+    def lookup(self, zips):
+        """(lat, lng) for each prefix in `zips`; NaN where the prefix is unknown."""
+        zips = np.asarray(zips, dtype=np.int32)
+        pos = np.searchsorted(self.zips, zips)
+        pos = np.minimum(pos, len(self.zips) - 1)
+        found = self.zips[pos] == zips
+        lat = np.where(found, self.lat[pos], np.nan)
+        lng = np.where(found, self.lng[pos], np.nan)
+        return lat, lng
+
+    def distance_km(self, zips_a, zips_b):
+        lat_a, lng_a = self.lookup(zips_a)
+        lat_b, lng_b = self.lookup(zips_b)
+        return haversine_km(lat_a, lng_a, lat_b, lng_b)
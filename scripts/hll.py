@@ -0,0 +1,78 @@
+"""
+HyperLogLog sketches for distinct customer counts, in NumPy.
+
+A sketch is a vector of M = 2**P one-byte registers. Each customer id is
+hashed to 64 bits (DuckDB's `hash()`); the top P bits pick a register and the
+register keeps the largest "first set bit" position seen in the remaining
+bits. Two sketches merge by element-wise max, so a sketch per day (or per
+month and state) can be combined into the distinct count of any set of days
+without revisiting the orders, and counting a customer twice never inflates
+the result.
+
+With P = 12 (4 KB per sketch) the relative standard error is
+1.04 / sqrt(4096) ~ 1.6%: about two estimates in three are within 1.6% of
+the true count and ~95% within 3.3%. Small counts use linear counting and
+are close to exact.
+
+Sketches are only comparable when built with the same P and the same hash
+function; rebuild every stored sketch after a DuckDB upgrade that changes
+`hash()`.
+"""
+
+import numpy as np
+
+
+P = 12
+M = 1 << P
+RELATIVE_ERROR = 1.04 / np.sqrt(M)
+
+
+def build(groups, hashes, n_groups):
+    """
+    Registers for `n_groups` sketches at once.
+
+    `groups[i]` is the sketch (0..n_groups-1) that 64-bit `hashes[i]` belongs
+    to. Returns an (n_groups, M) uint8 array.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    groups = np.asarray(groups, dtype=np.int64)
+    index = (hashes >> np.uint64(64 - P)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - P)) - 1)
+    # frexp's exponent is the bit length; exact while 64 - P <= 53 (P >= 11)
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    rank = ((64 - P) - bit_length + 1).astype(np.uint8)
+
+    registers = np.zeros(n_groups * M, dtype=np.uint8)
+    np.maximum.at(registers, groups * M + index, rank)
+    return registers.reshape(n_groups, M)
+
+
+def merge(registers):
+    """Union of the sketches in the rows of `registers` (empty input -> empty sketch)."""
+    registers = np.asarray(registers, dtype=np.uint8).reshape(-1, M)
+    if len(registers) == 0:
+        return np.zeros(M, dtype=np.uint8)
+    return registers.max(axis=0)
+
+
+def estimate(registers):
+    """Distinct-count estimate of one sketch, or of each row of a 2-D array."""
+    registers = np.asarray(registers, dtype=np.uint8)
+    rows = registers.reshape(-1, M)
+    alpha = 0.7213 / (1 + 1.079 / M)
+    raw = alpha * M * M / np.ldexp(1.0, -rows.astype(np.int64)).sum(axis=1)
+    zeros = np.count_nonzero(rows == 0, axis=1)
+    # linear counting is more accurate while many registers are still empty
+    small = (raw <= 2.5 * M) & (zeros > 0)
+    linear = M * np.log(M / np.maximum(zeros, 1))
+    result = np.where(small, linear, raw)
+    return float(result[0]) if registers.ndim == 1 else result
+
+
+def to_bytes(registers):
+    return np.asarray(registers, dtype=np.uint8).tobytes()
+
+
+def from_bytes(values):
+    """Stack serialized sketches (an iterable of bytes) into an (n, M) array."""
+    return np.frombuffer(b"".join(values), dtype=np.uint8).reshape(-1, M)
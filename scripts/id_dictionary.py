@@ -0,0 +1,142 @@
+"""
+Persistent surrogate-key dictionaries for Olist identifiers.
+
+Every Olist id (customer, order, product, seller) is a 32-character hex
+string, which makes joins and group-bys far more expensive than they need to
+be. Each dictionary maps a hex id (or, for `category`, a product category
+name) to a dense integer key and is stored as parquet under
+data/processed/id_dictionaries/<name>.parquet.
+
+Dictionaries are append-only: once assigned, a key never changes, and ids
+seen for the first time get keys after the current maximum. Processed tables
+keep their original column names (`customer_id`, `order_id`, ...) but carry
+the integer keys, so existing SQL runs unchanged; `decode_query` maps keys
+back to hex ids for output files.
+"""
+
+import os
+
+from warehouse import PROCESSED_DIR
+
+
+DICT_DIR = os.path.join(PROCESSED_DIR, "id_dictionaries")
+
+INT32_MAX = 2**31 - 1
+
+
+def dictionary_path(name):
+    return os.path.join(DICT_DIR, f"{name}.parquet")
+
+
+def load_dictionary(con, name):
+    """Create table dict_<name>(id, key) from disk, or empty if not built yet."""
+    path = dictionary_path(name)
+    if os.path.exists(path):
+        con.execute(f"""
+            CREATE OR REPLACE TABLE dict_{name} AS
+            SELECT id, key FROM read_parquet('{path}');
+        """)
+    else:
+        con.execute(f"""
+            CREATE OR REPLACE TABLE dict_{name} (id VARCHAR, key INTEGER);
+        """)
+
+
+def update_dictionary(con, name, sources):
+    """
+    Assign keys to ids that are not yet in dictionary `name`.
+
+    `sources` is a list of (relation, column) pairs already visible to `con`.
+    Returns the number of newly assigned ids. The dictionary is rewritten
+    atomically so a crashed run never leaves a truncated file behind.
+    """
+    load_dictionary(con, name)
+
+    candidates = " UNION ".join(
+        f"SELECT {column}::VARCHAR AS id FROM {relation}"
+        for relation, column in sources
+    )
+
+    next_key = con.execute(f"""
+        SELECT COALESCE(MAX(key), -1) + 1 FROM dict_{name};
+    """).fetchone()[0]
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE new_ids AS
+        -- UNION only dedups across sources; a single source repeats its ids
+        SELECT DISTINCT c.id
+        FROM ({candidates}) c
+        ANTI JOIN dict_{name} d
+            ON c.id = d.id
+        WHERE c.id IS NOT NULL;
+    """)
+    new_count = con.execute("SELECT COUNT(*) FROM new_ids;").fetchone()[0]
+
+    if new_count == 0:
+        return 0
+
+    # int32 keeps hash tables small; widen only if a dictionary ever outgrows it
+    key_type = "INTEGER" if next_key + new_count - 1 <= INT32_MAX else "BIGINT"
+
+    con.execute(f"""
+        CREATE OR REPLACE TABLE dict_{name} AS
+        SELECT id, key::{key_type} AS key FROM dict_{name}
+        UNION ALL
+        SELECT id, ({next_key} + ROW_NUMBER() OVER (ORDER BY id) - 1)::{key_type}
+        FROM new_ids;
+    """)
+
+    os.makedirs(DICT_DIR, exist_ok=True)
+    path = dictionary_path(name)
+    tmp_path = path + ".tmp"
+    con.execute(f"""
+        COPY (SELECT id, key FROM dict_{name} ORDER BY key)
+        TO '{tmp_path}' (FORMAT PARQUET);
+    """)
+    os.replace(tmp_path, path)
+
+    return new_count
+
+
+def encode_query(relation, columns):
+    """
+    SELECT over `relation` with each hex id column replaced by its key.
+
+    `columns` maps column name -> dictionary name; the dict_<name> tables must
+    already be loaded on the connection.
+    """
+    if not columns:
+        return f"SELECT * FROM {relation}"
+
+    replaces = []
+    joins = []
+    for i, (column, name) in enumerate(columns.items()):
+        replaces.append(f"d{i}.key AS {column}")
+        joins.append(
+            f"LEFT JOIN dict_{name} d{i} ON r.{column}::VARCHAR = d{i}.id"
+        )
+
+    return (
+        f"SELECT r.* REPLACE ({', '.join(replaces)})\n"
+        f"FROM {relation} r\n" + "\n".join(joins)
+    )
+
+
+def decode_query(query, columns):
+    """
+    Wrap `query` so the integer key columns come back as the original hex ids.
+
+    Used only at output time, after all joins and aggregations ran on ints.
+    """
+    query = query.strip().rstrip(";")
+
+    replaces = []
+    joins = []
+    for i, (column, name) in enumerate(columns.items()):
+        replaces.append(f"d{i}.id AS {column}")
+        joins.append(f"LEFT JOIN dict_{name} d{i} ON q.{column} = d{i}.key")
+
+    return (
+        f"SELECT q.* REPLACE ({', '.join(replaces)})\n"
+        f"FROM ({query}) q\n" + "\n".join(joins)
+    )
@@ -0,0 +1,161 @@
+"""
+Import-time report for the pipeline scripts and the dashboard.
+
+For each target, the module-level imports that run before its first stage
+(everything up to the first top-level statement that does work) are replayed
+in a fresh interpreter under `python -X importtime`. The report lists the
+total startup import time and the heaviest top-level imports, so a module
+moved back to the top of a script shows up immediately.
+
+    python scripts/import_report.py                      # app.py + scripts/run_*.py
+    python scripts/import_report.py --save output/import_times.json
+    python scripts/import_report.py --compare output/import_times.json
+
+With `--compare`, exits with status 1 when a target got slower than the
+baseline by more than `--tolerance` (ratio) and `--slack-ms`.
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(SCRIPTS_DIR)
+
+# top-level statements that may precede the first real work without ending the header
+HEADER_NODES = (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign, ast.FunctionDef, ast.ClassDef)
+
+
+def default_targets():
+    return [os.path.join(BASE_DIR, "app.py")] + sorted(glob.glob(os.path.join(SCRIPTS_DIR, "run_*.py")))
+
+
+def _is_docstring_or_path_setup(node):
+    if not isinstance(node, ast.Expr):
+        return False
+    if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+        return True
+    # sys.path.insert(...) / sys.path.append(...)
+    func = getattr(node.value, "func", None)
+    return isinstance(func, ast.Attribute) and ast.unparse(func.value) == "sys.path"
+
+
+def startup_imports(path):
+    """Source of the import statements a target runs before doing any work."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(ast.unparse(node))
+        elif isinstance(node, HEADER_NODES) or _is_docstring_or_path_setup(node):
+            continue
+        else:
+            break
+    return "\n".join(lines)
+
+
+def parse_importtime(stderr):
+    """(module, depth, self_us, cumulative_us) rows from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(code, repeat, startup=()):
+    """
+    Fastest of `repeat` cold-interpreter runs of `code`, as importtime rows;
+    modules in `startup` (loaded by the interpreter itself) are left out.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SCRIPTS_DIR, os.environ.get("PYTHONPATH", "")]))
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+        rows = [r for r in parse_importtime(proc.stderr) if r[0] not in startup]
+        total = sum(r[2] for r in rows)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best
+
+
+def report(targets, repeat, top):
+    startup = {r[0] for r in measure("pass", 1)[1]}
+    results = {}
+    for path in targets:
+        name = os.path.relpath(path, BASE_DIR)
+        try:
+            total_us, rows = measure(startup_imports(path), repeat, startup)
+        except RuntimeError as e:
+            print(f"{name:<48} failed: {e}")
+            continue
+        heaviest = sorted((r for r in rows if r[1] == 0), key=lambda r: r[3], reverse=True)[:top]
+        results[name] = {
+            "total_ms": round(total_us / 1000, 1),
+            "modules": len(rows),
+            "heaviest": [{"module": m, "cumulative_ms": round(c / 1000, 1)} for m, _, _, c in heaviest],
+        }
+        summary = ", ".join(f"{h['module']} {h['cumulative_ms']:.0f}" for h in results[name]["heaviest"])
+        print(f"{name:<48}{results[name]['total_ms']:>9.1f} ms{len(rows):>15}  {summary}")
+    return results
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    regressions = []
+    for name, entry in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if entry["total_ms"] > old["total_ms"] * tolerance + slack_ms:
+            regressions.append(f"{name}: {old['total_ms']:.1f} ms -> {entry['total_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup import time per script")
+    parser.add_argument("targets", nargs="*", help="scripts to measure (default: app.py and scripts/run_*.py)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per target; the fastest is kept")
+    parser.add_argument("--top", type=int, default=4, help="heaviest top-level imports to list")
+    parser.add_argument("--save", help="write the report as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    parser.add_argument("--slack-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    targets = [os.path.abspath(t) for t in args.targets] or default_targets()
+    print(f"{'target':<48}{'imports':>12}{'modules':>15}  heaviest (ms)")
+    results = report(targets, args.repeat, args.top)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.slack_ms)
+        if regressions:
+            print("\nImport-time regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo import-time regressions")
+
+
+if __name__ == "__main__":
+    main()
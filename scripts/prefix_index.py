@@ -0,0 +1,93 @@
+"""
+Constant-time range totals over a daily series.
+
+`PrefixSumIndex` keeps, for every day in the series, the running total of each
+measure up to and including that day. The total of any date range is then
+the difference of two running totals, found by binary search on the sorted
+day array: O(log n) to locate the bounds and O(1) arithmetic, independent of
+how many days the range spans. Days missing from the series count as zero.
+
+The dashboard snapshot stores the running totals (`cum_<measure>` columns
+next to `day`), so the dashboard only wraps the mapped columns:
+
+    index = PrefixSumIndex.from_frame(data["daily_revenue_index"])
+    index.totals(start, end)            # {"revenue": ..., "orders": ..., ...}
+    index.previous_period(start, end)   # same-length window just before
+
+Only additive measures belong here: sums and counts of events. Distinct
+counts (e.g. active customers) do not add across days.
+"""
+
+import numpy as np
+
+
+def _day(value):
+    return np.datetime64(value, "D")
+
+
+class PrefixSumIndex:
+    """Running totals of additive daily measures, queried by date range."""
+
+    def __init__(self, days, cumulative):
+        self.days = np.asarray(days, dtype="datetime64[D]")
+        self.cumulative = {name: np.asarray(values) for name, values in cumulative.items()}
+        self.measures = list(self.cumulative)
+
+    @classmethod
+    def from_daily(cls, df, measures, day="day"):
+        """Build from one row per day (any order) holding the raw measures."""
+        df = df.sort_values(day)
+        return cls(
+            df[day].to_numpy(dtype="datetime64[D]"),
+            {name: np.cumsum(df[name].to_numpy()) for name in measures},
+        )
+
+    @classmethod
+    def from_frame(cls, df):
+        """Wrap a frame written by `to_frame` without recomputing anything."""
+        return cls(
+            df["day"].to_numpy(dtype="datetime64[D]"),
+            {col[len("cum_"):]: df[col].to_numpy() for col in df.columns if col.startswith("cum_")},
+        )
+
+    def to_frame(self):
+        import pandas as pd
+
+        frame = pd.DataFrame({"day": self.days.astype("datetime64[ns]")})
+        for name, values in self.cumulative.items():
+            frame[f"cum_{name}"] = values
+        return frame
+
+    @property
+    def first_day(self):
+        return self.days[0].astype(object) if len(self.days) else None
+
+    @property
+    def last_day(self):
+        return self.days[-1].astype(object) if len(self.days) else None
+
+    def _running(self, name, position):
+        # running total of the first `position` days
+        return self.cumulative[name][position - 1] if position > 0 else 0
+
+    def total(self, name, start, end):
+        """Sum of measure `name` over the days start..end, both inclusive."""
+        lo = int(np.searchsorted(self.days, _day(start), side="left"))
+        hi = int(np.searchsorted(self.days, _day(end), side="right"))
+        if hi <= lo:
+            return 0
+        return self._running(name, hi) - self._running(name, lo)
+
+    def totals(self, start, end):
+        return {name: self.total(name, start, end) for name in self.measures}
+
+    def previous_period(self, start, end):
+        """Totals of the equally long window ending the day before `start`."""
+        length = _day(end) - _day(start)
+        prev_end = _day(start) - np.timedelta64(1, "D")
+        return self.totals(prev_end - length, prev_end)
+
+    @staticmethod
+    def day_count(start, end):
+        """Calendar days in start..end, for per-day averages."""
+        return int((_day(end) - _day(start)) / np.timedelta64(1, "D")) + 1
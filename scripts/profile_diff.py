@@ -0,0 +1,87 @@
+"""
+Compare two profile reports written by profiling.py.
+
+    python scripts/profile_diff.py output/profiles/OLD.json output/profiles/NEW.json
+
+Stages are matched by name and queries by (stage, position within stage), so
+two runs of the same script line up even when SQL text was edited.
+"""
+
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _delta(old, new):
+    if old is None:
+        return f"{'new':>10}"
+    if new is None:
+        return f"{'removed':>10}"
+    change = new - old
+    pct = f" ({change / old * 100:+.0f}%)" if old else ""
+    return f"{change:+10.3f}{pct}"
+
+
+def query_keys(report):
+    keys = {}
+    counts = {}
+    for q in report["queries"]:
+        n = counts.get(q["stage"], 0)
+        counts[q["stage"]] = n + 1
+        keys[(q["stage"], n)] = q
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two profile reports")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--top", type=int, default=10, help="queries to list, by absolute change")
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+
+    print(f"Run: {old['run']} ({old['started_at']}) -> {new['run']} ({new['started_at']})")
+    print(f"Total: {old['total_seconds']:.3f}s -> {new['total_seconds']:.3f}s "
+          f"{_delta(old['total_seconds'], new['total_seconds'])}")
+    print(f"Peak RSS: {old['rss_peak_mb']:.0f} MB -> {new['rss_peak_mb']:.0f} MB")
+
+    old_stages = {s["name"]: s for s in old["stages"]}
+    new_stages = {s["name"]: s for s in new["stages"]}
+    names = list(old_stages) + [n for n in new_stages if n not in old_stages]
+
+    print(f"\n{'stage':<36}{'old s':>10}{'new s':>10}{'change':>18}{'py peak MB':>14}")
+    for name in names:
+        o, n = old_stages.get(name), new_stages.get(name)
+        o_s = o["seconds"] if o else None
+        n_s = n["seconds"] if n else None
+        print(
+            f"{name[:35]:<36}"
+            f"{'-' if o_s is None else f'{o_s:.3f}':>10}"
+            f"{'-' if n_s is None else f'{n_s:.3f}':>10}"
+            f"{_delta(o_s, n_s):>18}"
+            f"{'-' if n is None else n['python_peak_mb']:>14}"
+        )
+
+    old_q, new_q = query_keys(old), query_keys(new)
+    rows = []
+    for key in set(old_q) | set(new_q):
+        o_s = old_q[key]["seconds"] if key in old_q else 0.0
+        n_s = new_q[key]["seconds"] if key in new_q else 0.0
+        sql = (new_q.get(key) or old_q[key])["sql"]
+        rows.append((abs(n_s - o_s), key, o_s, n_s, sql))
+    # by change only: stage names can be None, which tuples cannot compare
+    rows.sort(key=lambda r: r[0], reverse=True)
+
+    if rows:
+        print("\nLargest query changes:")
+        for _, (stage_name, n), o_s, n_s, sql in rows[:args.top]:
+            print(f"  [{stage_name} #{n}] {o_s:.3f}s -> {n_s:.3f}s  {sql[:90]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Memory-mapped customer profile store for the scoring service.
+
+Publishing reads churn_features_v2.csv and the fitted churn model
+(output/churn_model.npz, written by run_churn_logistic_regression_v2.py),
+scores every customer and writes one store version:
+
+    output/profile_store/<version>/ids.npy      sorted customer_unique_id, fixed-width bytes
+    output/profile_store/<version>/values.npy  float64 matrix, one row per id, in id order
+    output/profile_store/<version>/meta.json    column names, which columns are dates, row count
+    output/profile_store/CURRENT                name of the published version
+
+A version is written under a temporary name and renamed into place before
+CURRENT is replaced (also by rename), so a reader never sees a partial store.
+`ProfileStore.open` memory-maps both arrays; a lookup is a binary search on
+the id array and a row read, with nothing loaded up front beyond the pages
+touched. Servers notice a new CURRENT and reopen (serve_profiles.py). The last
+KEEP versions are kept on disk for readers still holding the previous one.
+
+    python scripts/profile_store.py     # publish a new version
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from warehouse import OUTPUT_DIR
+
+
+STORE_DIR = os.environ.get("OLIST_PROFILE_STORE", os.path.join(OUTPUT_DIR, "profile_store"))
+FEATURES_PATH = os.path.join(OUTPUT_DIR, "churn_features_v2.csv")
+MODEL_PATH = os.path.join(OUTPUT_DIR, "churn_model.npz")
+
+ID_COLUMN = "customer_unique_id"
+SCORE_COLUMN = "churn_probability"
+KEEP = 3
+
+
+def current_path(store_dir=STORE_DIR):
+    return os.path.join(store_dir, "CURRENT")
+
+
+def current_version(store_dir=STORE_DIR):
+    """Published version name, or None before the first publish."""
+    try:
+        with open(current_path(store_dir)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_model(path=MODEL_PATH):
+    with np.load(path) as params:
+        return {name: params[name] for name in params.files}
+
+
+def churn_probability(df, model):
+    """Logistic model score with the fitted median imputation and scaling."""
+    X = df[list(model["features"])].to_numpy(dtype=np.float64)
+    X = np.where(np.isnan(X), model["medians"], X)
+    z = (X - model["mean"]) / model["scale"] @ model["coef"] + model["intercept"][0]
+    return 1 / (1 + np.exp(-z))
+
+
+def publish(features_path=FEATURES_PATH, model_path=MODEL_PATH, store_dir=STORE_DIR):
+    """Build and publish a new store version; returns its name."""
+    import pandas as pd
+
+    df = pd.read_csv(features_path)
+    df[SCORE_COLUMN] = churn_probability(df, load_model(model_path))
+    df = df.sort_values(ID_COLUMN, kind="stable")
+
+    ids = df[ID_COLUMN].astype(str).str.encode("ascii").to_numpy(dtype=bytes)
+    date_columns = [c for c in df.columns if c.endswith("_date")]
+    columns = [c for c in df.columns if c != ID_COLUMN and (c in date_columns or pd.api.types.is_numeric_dtype(df[c]))]
+    values = np.empty((len(df), len(columns)), dtype=np.float64)
+    for j, column in enumerate(columns):
+        if column in date_columns:
+            # days since 1970-01-01; NaN for missing dates
+            days = pd.to_datetime(df[column]).to_numpy(dtype="datetime64[D]")
+            values[:, j] = np.where(np.isnat(days), np.nan, days.astype(np.int64))
+        else:
+            values[:, j] = df[column].to_numpy(dtype=np.float64)
+
+    # sortable by publish time, unique across processes
+    version = time.strftime("%Y%m%dT%H%M%S") + f"-{time.time_ns() % 10**9:09d}-{os.getpid()}"
+    final_dir = os.path.join(store_dir, version)
+    tmp_dir = final_dir + ".tmp"
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "ids.npy"), ids)
+    np.save(os.path.join(tmp_dir, "values.npy"), values)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({
+            "version": version,
+            "rows": len(df),
+            "columns": columns,
+            "date_columns": date_columns,
+            "published_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+    os.rename(tmp_dir, final_dir)
+
+    with open(current_path(store_dir) + ".tmp", "w") as f:
+        f.write(version + "\n")
+    os.replace(current_path(store_dir) + ".tmp", current_path(store_dir))
+
+    prune(store_dir, keep=KEEP)
+    return version
+
+
+def prune(store_dir=STORE_DIR, keep=KEEP):
+    """Remove all but the newest `keep` versions (never the published one)."""
+    current = current_version(store_dir)
+    versions = sorted(
+        name for name in os.listdir(store_dir)
+        if os.path.isdir(os.path.join(store_dir, name)) and not name.endswith(".tmp")
+    )
+    for name in versions[:-keep]:
+        if name != current:
+            # open memory maps keep the old files readable until they are closed
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+
+class ProfileStore:
+    """Read-only view of one published store version."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.version = self.meta["version"]
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        self.columns = self.meta["columns"]
+        self._dates = {self.columns.index(c) for c in self.meta["date_columns"]}
+        self._width = self.ids.dtype.itemsize
+
+    @classmethod
+    def open(cls, store_dir=STORE_DIR):
+        version = current_version(store_dir)
+        if version is None:
+            raise FileNotFoundError(f"No published profile store in {store_dir} - run scripts/profile_store.py")
+        return cls(os.path.join(store_dir, version))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, customer_ids):
+        """Row of each id, -1 where the id is unknown."""
+        encoded = [customer_id.encode("ascii", "replace") for customer_id in customer_ids]
+        if len(self.ids) == 0 or not encoded:
+            return np.full(len(encoded), -1, dtype=np.int64)
+        # ids longer than the stored width would be truncated into false matches
+        fits = np.array([len(key) <= self._width for key in encoded], dtype=bool)
+        keys = np.array(encoded, dtype=self.ids.dtype)
+        pos = np.minimum(np.searchsorted(self.ids, keys), len(self.ids) - 1)
+        return np.where(fits & (self.ids[pos] == keys), pos, -1)
+
+    def _record(self, customer_id, row):
+        record = {ID_COLUMN: customer_id}
+        for j, (column, value) in enumerate(zip(self.columns, row.tolist())):
+            if value != value:
+                record[column] = None
+            elif j in self._dates:
+                record[column] = str(np.datetime64(int(value), "D"))
+            elif value.is_integer() and column != SCORE_COLUMN:
+                record[column] = int(value)
+            else:
+                record[column] = value
+        return record
+
+    def lookup(self, customer_ids):
+        """Profiles in request order; None for unknown ids."""
+        positions = self.positions(customer_ids)
+        found = positions >= 0
+        rows = self.values[positions[found]] if found.any() else None
+        results = []
+        k = 0
+        for customer_id, ok in zip(customer_ids, found):
+            if ok:
+                results.append(self._record(customer_id, rows[k]))
+                k += 1
+            else:
+                results.append(None)
+        return results
+
+    def get(self, customer_id):
+        return self.lookup([customer_id])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a new customer profile store version")
+    parser.add_argument("--features", default=FEATURES_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.store_dir, exist_ok=True)
+    started = time.perf_counter()
+    version = publish(args.features, args.model, args.store_dir)
+    store = ProfileStore(os.path.join(args.store_dir, version))
+    print(f"Published profile store {version}: {len(store):,} customers, "
+          f"{len(store.columns)} columns in {time.perf_counter() - started:.2f}s ({args.store_dir})")
+
+
+if __name__ == "__main__":
+    main()
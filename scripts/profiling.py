@@ -0,0 +1,248 @@
+"""
+Opt-in per-stage profiling for the pipeline scripts and the dashboard.
+
+Enable with the OLIST_PROFILE environment variable:
+
+    OLIST_PROFILE=1         stage timers, peak memory, DuckDB query profiles
+    OLIST_PROFILE=cprofile  the same plus a cProfile summary per stage
+
+Scripts mark their stages with `stage(name)`, either as a context manager or
+as a plain call that runs until the next stage starts, and wrap their DuckDB
+connection with `profiled(con)`. Every statement run through a profiled
+connection is captured with DuckDB's own profiler, which records the same
+per-operator timings and cardinalities as `EXPLAIN ANALYZE` for the statement
+as it actually executed, without running it twice.
+
+At exit a JSON report is written to output/profiles/ (OLIST_PROFILE_DIR to
+override); compare two runs with `python scripts/profile_diff.py A B`. With
+profiling off every hook is a no-op, and the profiler's own modules (cProfile,
+pstats, json) are not even imported. Peak memory is process-wide: Python
+allocations via tracemalloc, plus peak RSS, which also covers DuckDB.
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from serving_metrics import peak_rss_bytes
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.environ.get("OLIST_PROFILE_DIR", os.path.join(BASE_DIR, "output", "profiles"))
+
+MODE = os.environ.get("OLIST_PROFILE", "").strip().lower()
+ENABLED = MODE not in ("", "0", "false", "off")
+USE_CPROFILE = MODE == "cprofile"
+
+CPROFILE_TOP = 15
+
+
+def _now():
+    return time.perf_counter()
+
+
+class Run:
+    """Stages and queries of one profiled run."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.started = _now()
+        self.stages = []
+        self.queries = []
+        self.current = None
+        tracemalloc.start()
+
+    def open_stage(self, name):
+        self.close_stage()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        profiler = None
+        if USE_CPROFILE:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        self.current = {"name": name, "started": _now(), "profiler": profiler}
+
+    def close_stage(self):
+        current, self.current = self.current, None
+        if current is None:
+            return
+        entry = {
+            "name": current["name"],
+            "seconds": round(_now() - current["started"], 4),
+            "python_peak_mb": round(tracemalloc.get_traced_memory()[1] / 1e6, 2),
+            "rss_peak_mb": round(peak_rss_bytes() / 1e6, 1),
+        }
+        if current["profiler"] is not None:
+            current["profiler"].disable()
+            entry["cprofile"] = _cprofile_summary(current["profiler"])
+        self.stages.append(entry)
+
+    def stage_name(self):
+        return self.current["name"] if self.current else None
+
+    def report(self):
+        self.close_stage()
+        return {
+            "run": self.name,
+            "started_at": self.started_at,
+            "total_seconds": round(_now() - self.started, 4),
+            "rss_peak_mb": round(peak_rss_bytes() / 1e6, 1),
+            "stages": self.stages,
+            "queries": self.queries,
+        }
+
+
+def _cprofile_summary(profiler):
+    """Top functions by cumulative time, as rows that diff cleanly."""
+    import io
+    import pstats
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (file_name, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(file_name)}:{line}({func})",
+            "calls": calls,
+            "tottime": round(tottime, 4),
+            "cumtime": round(cumtime, 4),
+        })
+    rows.sort(key=lambda r: r["cumtime"], reverse=True)
+    return rows[:CPROFILE_TOP]
+
+
+# runs are per thread: Streamlit serves concurrent reruns on separate threads
+_local = threading.local()
+_atexit_registered = False
+
+
+def _current():
+    return getattr(_local, "run", None)
+
+
+def begin(name=None):
+    """Start a new run, e.g. one per dashboard rerun; scripts need not call this."""
+    global _atexit_registered
+    if not ENABLED:
+        return None
+    _local.run = Run(name or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0])
+    if not _atexit_registered:
+        atexit.register(write_report)
+        _atexit_registered = True
+    return _local.run
+
+
+def _active_run():
+    return begin() if ENABLED and _current() is None else _current()
+
+
+class stage:
+    """
+    Mark the start of a pipeline stage.
+
+    Used as `with stage("fit"):` the stage ends with the block; called as
+    `stage("fit")` it runs until the next stage starts or the report is
+    written. Starting a stage always ends the previous one.
+    """
+
+    def __init__(self, name):
+        self.run = _active_run()
+        if self.run is not None:
+            self.run.open_stage(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.run is not None:
+            self.run.close_stage()
+        return False
+
+
+def _operators(node, depth=0, out=None):
+    """Flatten DuckDB's JSON profile tree into (operator, seconds, rows) rows."""
+    out = [] if out is None else out
+    for child in node.get("children", []):
+        name = child.get("operator_type") or child.get("name") or "?"
+        out.append({
+            "operator": "  " * depth + name.strip(),
+            "seconds": round(float(child.get("operator_timing", child.get("timing", 0.0)) or 0.0), 6),
+            "rows": child.get("operator_cardinality", child.get("cardinality")),
+        })
+        _operators(child, depth + 1, out)
+    return out
+
+
+class ProfiledConnection:
+    """
+    DuckDB connection proxy that records a profile of every `execute`.
+
+    Anything else (`df()`, `fetchone()`, `register`, ...) is forwarded to the
+    wrapped connection, so scripts use it exactly like the original.
+    """
+
+    def __init__(self, con):
+        import tempfile
+
+        self._con = con
+        fd, self._profile_path = tempfile.mkstemp(prefix="duckdb-profile-", suffix=".json")
+        os.close(fd)
+        con.execute("SET enable_profiling = 'json';")
+        con.execute(f"SET profiling_output = '{self._profile_path}';")
+
+    def execute(self, sql, *args, **kwargs):
+        started = _now()
+        self._con.execute(sql, *args, **kwargs)
+        seconds = _now() - started
+
+        # looked up per call: the dashboard starts a new run on every rerun
+        run = _current()
+        if run is None:
+            return self
+        entry = {
+            "stage": run.stage_name(),
+            "sql": " ".join(str(sql).split())[:500],
+            "seconds": round(seconds, 4),
+        }
+        try:
+            import json
+
+            with open(self._profile_path) as f:
+                plan = json.load(f)
+            entry["operators"] = _operators(plan)
+        except (OSError, ValueError):
+            pass
+        run.queries.append(entry)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._con, name)
+
+
+def profiled(con):
+    """Wrap a DuckDB connection for query capture; returns `con` unchanged when off."""
+    return con if _active_run() is None else ProfiledConnection(con)
+
+
+def write_report(path=None):
+    """Write the run's report (done automatically at exit) and return its path."""
+    run, _local.run = _current(), None
+    if run is None:
+        return None
+
+    import json
+
+    report = run.report()
+    if path is None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(PROFILE_DIR, f"{run.name}-{stamp}-{os.getpid()}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Profile written to {path}", file=sys.stderr)
+    return path
@@ -0,0 +1,154 @@
+"""
+Mergeable quantile sketches (DDSketch-style log buckets), in NumPy.
+
+A value x > 0 falls in bucket k = ceil(log(x) / log(GAMMA)), where
+GAMMA = (1 + ALPHA) / (1 - ALPHA). Every value in a bucket is within ALPHA
+(1%) of the bucket's representative 2 * GAMMA**k / (GAMMA + 1), so any
+quantile read from the sketch is within 1% relative error of a value whose
+rank is the requested one. Values below MIN_VALUE (including zero) are
+counted separately and read back as 0; values above MAX_VALUE share the last
+bucket.
+
+The bucket grid is fixed, so a sketch is a plain count vector: two sketches
+merge by adding counts, exactly and in any order. A sketch built from an
+incremental run or one shard of customers adds to the others without
+revisiting their rows, and a known set of rows can be subtracted again.
+Medians, quartiles and box-plot whiskers then come from the counts instead
+of the full column.
+
+`sketch_table` builds one sketch per (dimension, segment, feature) as a flat
+frame for parquet; `merge_tables` adds such frames together.
+"""
+
+import numpy as np
+
+
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+MIN_VALUE = 1e-2
+MAX_VALUE = 1e8
+
+_LOG_GAMMA = np.log(GAMMA)
+KEY_OFFSET = int(np.ceil(np.log(MIN_VALUE) / _LOG_GAMMA))
+N_BUCKETS = int(np.ceil(np.log(MAX_VALUE) / _LOG_GAMMA)) - KEY_OFFSET + 1
+
+# bucket index -> representative value
+_REPRESENTATIVES = 2 * GAMMA ** np.arange(KEY_OFFSET, KEY_OFFSET + N_BUCKETS) / (GAMMA + 1)
+
+
+class QuantileSketch:
+    """Bucket counts plus the exact count, zero count, min and max."""
+
+    def __init__(self, counts=None, zeros=0, minimum=np.inf, maximum=-np.inf):
+        self.counts = np.zeros(N_BUCKETS, dtype=np.int64) if counts is None else counts
+        self.zeros = int(zeros)
+        self.min = float(minimum)
+        self.max = float(maximum)
+
+    @classmethod
+    def from_values(cls, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return cls()
+        positive = values[values >= MIN_VALUE]
+        keys = np.ceil(np.log(positive) / _LOG_GAMMA).astype(np.int64) - KEY_OFFSET
+        counts = np.bincount(np.clip(keys, 0, N_BUCKETS - 1), minlength=N_BUCKETS)
+        return cls(counts, len(values) - len(positive), values.min(), values.max())
+
+    @property
+    def count(self):
+        return self.zeros + int(self.counts.sum())
+
+    def merge(self, other):
+        return QuantileSketch(
+            self.counts + other.counts, self.zeros + other.zeros,
+            min(self.min, other.min), max(self.max, other.max),
+        )
+
+    def subtract(self, other):
+        """Remove rows previously added as `other`; min and max are kept as bounds."""
+        counts = self.counts - other.counts
+        if counts.min() < 0 or other.zeros > self.zeros:
+            raise ValueError("subtracting a sketch that was not merged in")
+        return QuantileSketch(counts, self.zeros - other.zeros, self.min, self.max)
+
+    def quantiles(self, qs):
+        """Values at ranks q * (count - 1) for each q in `qs`, within ALPHA relative error."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        n = self.count
+        if n == 0:
+            return np.full(len(qs), np.nan)
+        ranks = qs * (n - 1)
+        cumulative = self.zeros + np.cumsum(self.counts)
+        buckets = np.searchsorted(cumulative, ranks, side="right")
+        values = _REPRESENTATIVES[np.minimum(buckets, N_BUCKETS - 1)]
+        values = np.where(ranks < self.zeros, 0.0, values)
+        # the exact extremes are known, keep estimates inside them
+        return np.clip(values, self.min, self.max)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def box(self):
+        """Quartiles and Tukey whiskers (furthest values within 1.5 IQR of the box)."""
+        q1, median, q3 = self.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        present = _REPRESENTATIVES[self.counts > 0]
+        if self.zeros:
+            present = np.concatenate([[0.0], present])
+        inside = present[(present >= q1 - 1.5 * iqr) & (present <= q3 + 1.5 * iqr)]
+        lower, upper = (inside.min(), inside.max()) if len(inside) else (q1, q3)
+        return {
+            "q1": q1, "median": median, "q3": q3,
+            "lowerfence": float(np.clip(lower, self.min, q1)),
+            "upperfence": float(np.clip(upper, q3, self.max)),
+            "count": self.count,
+        }
+
+    def to_record(self):
+        return {
+            "count": self.count, "zeros": self.zeros, "min": self.min, "max": self.max,
+            "counts": self.counts.astype(np.int64).tobytes(),
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(
+            np.frombuffer(record["counts"], dtype=np.int64).copy(),
+            record["zeros"], record["min"], record["max"],
+        )
+
+
+def sketch_table(df, features, segments):
+    """
+    One sketch per (dimension, segment, feature).
+
+    `segments` maps a dimension name to a Series aligned with `df` giving
+    each row's segment label; every dimension's segments partition the rows.
+    """
+    import pandas as pd
+
+    records = []
+    for dimension, labels in segments.items():
+        for segment, rows in df.groupby(labels.astype(str), sort=True):
+            for feature in features:
+                record = QuantileSketch.from_values(rows[feature]).to_record()
+                records.append({"dimension": dimension, "segment": segment, "feature": feature, **record})
+    return pd.DataFrame(records)
+
+
+def merge_tables(*tables):
+    """Add sketch tables built from disjoint rows (shards, incremental runs)."""
+    import pandas as pd
+
+    merged = {}
+    for table in tables:
+        for record in table.to_dict("records"):
+            key = (record["dimension"], record["segment"], record["feature"])
+            sketch = QuantileSketch.from_record(record)
+            merged[key] = merged[key].merge(sketch) if key in merged else sketch
+    return pd.DataFrame([
+        {"dimension": d, "segment": s, "feature": f, **sketch.to_record()}
+        for (d, s, f), sketch in merged.items()
+    ])
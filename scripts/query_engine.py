@@ -0,0 +1,242 @@
+"""
+Read-only, on-demand SQL over the warehouse for the dashboard query page.
+
+Views are registered for every processed table in data/processed/ (the
+integer-keyed parquet written by run_ingest.py) and for the pipeline outputs
+in output/, e.g. `churn_features`. Only single SELECT statements are
+accepted, and once the views exist the connection may only read files under
+data/processed/ and the output files behind those views, so table functions
+such as `read_csv('/some/path')`, `read_text` or `glob` cannot reach anything
+else on disk. The settings are locked, so a query cannot lift the restriction.
+
+Results are cached per (normalized query text, data version, row limit), so
+re-running a query or paging through it never touches DuckDB again until one
+of the files it reads changes; the version covers only the views the query
+names, so a refreshed `monthly_revenue` leaves cached churn queries valid. Rows are pulled in record batches and
+reading stops at the row limit, so a careless `SELECT *` over a large table
+costs at most `row_limit` rows.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import duckdb
+
+from warehouse import BASE_DIR, OUTPUT_DIR, PROCESSED_DIR, RAW_TABLES, connect, processed_parts, register_tables, table_signature
+
+
+SQL_DIR = os.path.join(BASE_DIR, "sql")
+
+# view name -> pipeline output CSV
+OUTPUT_VIEWS = {
+    "churn_features": "churn_features_v2.csv",
+    "monthly_revenue": "monthly_revenue.csv",
+    "retention_metrics": "retention_metrics.csv",
+}
+
+SAVED_QUERY_FILES = [
+    "revenue_analysis.sql",
+    "churn_statistical_analysis.sql",
+    "customer_revenue_decomposition.sql",
+    "churn_definition.sql",
+]
+
+BATCH_ROWS = 10_000
+
+
+class QueryError(Exception):
+    pass
+
+
+class QueryResult:
+    def __init__(self, table, truncated, elapsed, cached):
+        self.table = table
+        self.truncated = truncated
+        self.elapsed = elapsed
+        self.cached = cached
+
+    @property
+    def num_rows(self):
+        return self.table.num_rows
+
+    def page(self, number, page_size):
+        """Rows of page `number` (0-based) as a DataFrame."""
+        return self.table.slice(number * page_size, page_size).to_pandas()
+
+
+# quoted strings and identifiers, kept verbatim; comments, which are dropped
+SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|--[^\n]*|/\*.*?\*/""", re.S)
+
+
+def normalize_query(sql):
+    """
+    Cache-key form of `sql`: comments, trailing semicolons and redundant
+    whitespace removed outside quoted strings. Only used for the key; the
+    query itself runs as written.
+    """
+    parts = []
+    for is_literal, piece in _split_literals(sql):
+        parts.append(piece if is_literal else " ".join(piece.split()))
+    return " ".join(p for p in parts if p).rstrip("; ")
+
+
+def _split_literals(sql):
+    """(is_literal, text) pieces of `sql`, comments replaced by nothing."""
+    position = 0
+    for match in SQL_TOKENS.finditer(sql):
+        yield False, sql[position:match.start()]
+        if match.group(1):
+            yield True, match.group(1)
+        position = match.end()
+    yield False, sql[position:]
+
+
+def load_saved_queries():
+    """
+    Statements from the reference files in sql/, titled by the
+    `-- N. Title` comment preceding each one.
+    """
+    saved = {}
+    for file_name in SAVED_QUERY_FILES:
+        path = os.path.join(SQL_DIR, file_name)
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            chunks = f.read().split(";")
+
+        for i, chunk in enumerate(chunks, 1):
+            if "SELECT" not in chunk.upper():
+                continue
+            titles = re.findall(r"^--\s*\d+\.\s*(.+)$", chunk, flags=re.M)
+            title = titles[0].strip() if titles else f"Query {i}"
+            saved[f"{file_name} — {title}"] = chunk.strip() + ";"
+    return saved
+
+
+class QueryEngine:
+    def __init__(self, cache_size=64):
+        self._con = connect()
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self.sources = {}
+
+        for table in RAW_TABLES:
+            if processed_parts(table):
+                register_tables(self._con, table)
+                # processed tables are versioned by their parts, not one path
+                self.sources[table] = None
+
+        for view, file_name in OUTPUT_VIEWS.items():
+            path = os.path.join(OUTPUT_DIR, file_name)
+            if os.path.exists(path):
+                self._con.execute(
+                    f"CREATE VIEW {view} AS SELECT * FROM read_csv_auto('{path}')"
+                )
+                self.sources[view] = path
+
+        self._restrict_file_access()
+
+    def _restrict_file_access(self):
+        """Limit file reads to the registered sources; views bind their files at query time."""
+        def quoted(paths):
+            return "[" + ", ".join("'" + p.replace("'", "''") + "'" for p in paths) + "]"
+
+        output_paths = [path for path in self.sources.values() if path is not None]
+        self._con.execute(f"SET allowed_directories = {quoted([PROCESSED_DIR])}")
+        if output_paths:
+            self._con.execute(f"SET allowed_paths = {quoted(output_paths)}")
+        self._con.execute("SET enable_external_access = false")
+        self._con.execute("SET lock_configuration = true")
+
+    def referenced_sources(self, sql):
+        """Views named in `sql`; a query is only invalidated by their changes."""
+        words = set(re.findall(r"[a-z_][a-z0-9_]*", sql.lower()))
+        return sorted(name for name in self.sources if name in words)
+
+    def data_version(self, names=None):
+        h = hashlib.sha256()
+        for name in sorted(self.sources if names is None else names):
+            path = self.sources[name]
+            if path is None:
+                h.update(f"{name}:{table_signature(name)};".encode())
+                continue
+            try:
+                st = os.stat(path)
+                h.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode())
+            except FileNotFoundError:
+                h.update(f"{name}:missing;".encode())
+        return h.hexdigest()[:16]
+
+    def _validate(self, cursor, sql):
+        try:
+            statements = cursor.extract_statements(sql)
+        except duckdb.Error as e:
+            raise QueryError(str(e)) from e
+        if len(statements) != 1:
+            raise QueryError("Run exactly one statement at a time.")
+        if statements[0].type != duckdb.StatementType.SELECT:
+            raise QueryError("Only read-only SELECT queries are allowed.")
+
+    def run(self, sql, row_limit=10_000, timeout=30.0):
+        normalized = normalize_query(sql)
+        if not normalized:
+            raise QueryError("Query is empty.")
+
+        key = (
+            hashlib.sha256(normalized.encode()).hexdigest(),
+            self.data_version(self.referenced_sources(normalized)),
+            row_limit,
+        )
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                hit = self._cache[key]
+                return QueryResult(hit.table, hit.truncated, 0.0, cached=True)
+
+        # connections are not thread-safe; every query gets its own cursor
+        cursor = self._con.cursor()
+        # the text as written: normalizing is only safe for the cache key
+        statement = re.sub(r"[\s;]+$", "", sql)
+        try:
+            self._validate(cursor, statement)
+        except QueryError:
+            cursor.close()
+            raise
+
+        timer = threading.Timer(timeout, cursor.interrupt)
+        started = time.perf_counter()
+        timer.start()
+        try:
+            reader = cursor.execute(statement).fetch_record_batch(BATCH_ROWS)
+            batches = []
+            rows = 0
+            for batch in reader:
+                batches.append(batch)
+                rows += batch.num_rows
+                if rows > row_limit:
+                    break
+        except duckdb.InterruptException as e:
+            raise QueryError(f"Query cancelled after {timeout:.0f}s timeout.") from e
+        except duckdb.Error as e:
+            raise QueryError(str(e)) from e
+        finally:
+            timer.cancel()
+            cursor.close()
+        elapsed = time.perf_counter() - started
+
+        import pyarrow as pa
+
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+        truncated = table.num_rows > row_limit
+        result = QueryResult(table.slice(0, row_limit), truncated, elapsed, cached=False)
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
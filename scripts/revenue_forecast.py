@@ -0,0 +1,151 @@
+"""
+Lightweight revenue forecasting with rolling-origin backtests.
+
+Three models, each computed for every forecast origin at once rather than by
+refitting in a loop:
+
+- seasonal naive: repeat the value from one season earlier
+- ETS (Holt's additive trend): the smoothing recursion is causal, so one pass
+  over the series yields the state at every origin; (alpha, beta) is picked
+  per origin from a small grid by one-step squared error accumulated *before*
+  that origin, so the backtest never sees the future
+- linear trend + Fourier seasonality: expanding-window least squares solved
+  for all origins from cumulative X'X / X'y sums
+
+`backtest` returns point forecasts for the next `horizon` periods plus an
+empirical band from the backtest errors at each step ahead, and error
+metrics (MAE, RMSE, MAPE) per model.
+"""
+
+import numpy as np
+
+
+MODELS = ["seasonal_naive", "ets", "linear_seasonal"]
+
+ALPHAS = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+BETAS = np.array([0.0, 0.1, 0.3])
+
+BAND_QUANTILES = (0.1, 0.9)
+
+
+def seasonal_naive(y, origins, horizon, m):
+    steps = np.arange(horizon)
+    idx = origins[:, None] - m + steps[None, :] % m
+    return y[idx]
+
+
+def ets(y, origins, horizon):
+    n = len(y)
+    alpha = np.repeat(ALPHAS, len(BETAS))
+    beta = np.tile(BETAS, len(ALPHAS))
+
+    level = np.empty((n + 1, len(alpha)))
+    trend = np.empty((n + 1, len(alpha)))
+    sq_err = np.zeros((n, len(alpha)))
+
+    l = np.full(len(alpha), y[0], dtype=float)
+    b = np.zeros(len(alpha))
+    level[0], trend[0] = l, b
+    for i in range(n):
+        sq_err[i] = (y[i] - (l + b)) ** 2
+        l_new = alpha * y[i] + (1 - alpha) * (l + b)
+        b = beta * (l_new - l) + (1 - beta) * b
+        l = l_new
+        level[i + 1], trend[i + 1] = l, b
+
+    # state after consuming y[:t] is row t; choose parameters on y[:t] only
+    cum_err = np.cumsum(sq_err, axis=0)
+    best = np.argmin(cum_err[origins - 1], axis=1)
+    steps = np.arange(1, horizon + 1)
+    return level[origins, best][:, None] + trend[origins, best][:, None] * steps
+
+
+def _design(n, m, harmonics):
+    t = np.arange(n, dtype=float)
+    cols = [np.ones(n), t]
+    for k in range(1, harmonics + 1):
+        cols.append(np.sin(2 * np.pi * k * t / m))
+        cols.append(np.cos(2 * np.pi * k * t / m))
+    return np.column_stack(cols)
+
+
+def linear_seasonal(y, origins, horizon, m, harmonics=2, ridge=1e-6):
+    n = len(y)
+    X = _design(n + horizon, m, min(harmonics, m // 2))
+    k = X.shape[1]
+
+    XtX = np.cumsum(X[:n, :, None] * X[:n, None, :], axis=0)
+    Xty = np.cumsum(X[:n] * y[:, None], axis=0)
+
+    A = XtX[origins - 1] + ridge * np.trace(XtX[-1]) / k * np.eye(k)
+    coef = np.linalg.solve(A, Xty[origins - 1][..., None])[..., 0]
+
+    idx = origins[:, None] + np.arange(horizon)[None, :]
+    return np.einsum("ohk,ok->oh", X[idx], coef)
+
+
+def forecast_all(y, origins, horizon, m):
+    return {
+        "seasonal_naive": seasonal_naive(y, origins, horizon, m),
+        "ets": ets(y, origins, horizon),
+        "linear_seasonal": linear_seasonal(y, origins, horizon, m),
+    }
+
+
+def backtest(y, m, horizon, min_train=None):
+    """
+    Rolling-origin evaluation of every model on series `y`.
+
+    Returns (forecasts, metrics): forecasts maps model -> dict with
+    `point`, `lower`, `upper` arrays for the `horizon` periods after the
+    series ends; metrics maps model -> dict of MAE, RMSE, MAPE and the
+    number of backtest points.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    min_train = max(min_train or m + 1, m, 3)
+    if n <= min_train:
+        raise ValueError(f"series of length {n} is too short for min_train={min_train}")
+
+    origins = np.arange(min_train, n)
+    steps = np.arange(horizon)
+    target_idx = origins[:, None] + steps[None, :]
+    valid = target_idx < n
+    actual = np.where(valid, y[np.minimum(target_idx, n - 1)], np.nan)
+
+    backtests = forecast_all(y, origins, horizon, m)
+    future = forecast_all(y, np.array([n]), horizon, m)
+
+    forecasts = {}
+    metrics = {}
+    for model in MODELS:
+        err = actual - backtests[model]
+        flat = err[valid]
+        nonzero = valid & (np.abs(actual) > 0)
+        metrics[model] = {
+            "mae": float(np.mean(np.abs(flat))),
+            "rmse": float(np.sqrt(np.mean(flat ** 2))),
+            "mape": float(np.mean(np.abs(err[nonzero] / actual[nonzero]))) if nonzero.any() else np.nan,
+            "backtest_points": int(valid.sum()),
+        }
+
+        # per-step error quantiles; steps without backtest errors reuse the last one
+        lo_q, hi_q = np.nanquantile(err, BAND_QUANTILES, axis=0)
+        lo_q = _ffill(lo_q)
+        hi_q = _ffill(hi_q)
+        point = future[model][0]
+        forecasts[model] = {
+            "point": point,
+            "lower": point + lo_q,
+            "upper": point + hi_q,
+        }
+
+    return forecasts, metrics
+
+
+def _ffill(values):
+    values = np.array(values, dtype=float)
+    for i in range(1, len(values)):
+        if np.isnan(values[i]):
+            values[i] = values[i - 1]
+    return np.nan_to_num(values)
@@ -0,0 +1,153 @@
+"""
+Revenue and retention rollups shared by the batch scripts and run_watcher.py.
+
+`monthly_revenue_query` takes a `where` predicate so the watcher can recompute
+only the months touched by new data (a filter on the `year` / `month`
+partition columns skips every other month's files). `daily_revenue_query`
+is the daily grain behind the dashboard's date-range index (see
+prefix_index.py), and `customer_sketches` adds mergeable distinct-customer
+sketches next to it (see hll.py). `retention_metrics` derives the
+repeat-purchase summary from the churn feature table, which already holds one
+row per customer with a delivered order.
+"""
+
+import pandas as pd
+
+import hll
+
+
+def monthly_revenue_query(where="TRUE"):
+    return f"""
+SELECT
+    DATE_TRUNC('month', o.order_purchase_timestamp) AS month,
+    ROUND(SUM(p.payment_value), 2) AS revenue
+FROM orders o
+JOIN payments p
+    ON o.order_id = p.order_id
+    -- payments share their order's partition: lets a filter on o.year / o.month
+    -- prune payment files too
+    AND o.year = p.year
+    AND o.month = p.month
+WHERE o.order_status = 'delivered'
+    AND ({where})
+GROUP BY 1
+ORDER BY 1
+"""
+
+
+def daily_revenue_query(where="TRUE"):
+    """
+    Revenue, delivered orders and first-time customers per purchase day.
+
+    All three are additive over days, so any date range's totals follow from
+    cumulative sums. First orders are resolved over the full history, then
+    kept only for the days `where` selects.
+    """
+    return f"""
+WITH daily_orders AS (
+    SELECT
+        o.order_purchase_timestamp::DATE AS day,
+        COUNT(DISTINCT o.order_id) AS orders
+    FROM orders o
+    WHERE o.order_status = 'delivered'
+        AND ({where})
+    GROUP BY 1
+),
+
+daily_payments AS (
+    SELECT
+        o.order_purchase_timestamp::DATE AS day,
+        SUM(p.payment_value) AS revenue
+    FROM orders o
+    JOIN payments p
+        ON o.order_id = p.order_id
+        AND o.year = p.year
+        AND o.month = p.month
+    WHERE o.order_status = 'delivered'
+        AND ({where})
+    GROUP BY 1
+),
+
+first_orders AS (
+    SELECT
+        MIN(o.order_purchase_timestamp)::DATE AS day
+    FROM orders o
+    JOIN customers c
+        ON o.customer_id = c.customer_id
+    WHERE o.order_status = 'delivered'
+    GROUP BY c.customer_unique_id
+)
+
+SELECT
+    d.day,
+    ROUND(COALESCE(p.revenue, 0), 2) AS revenue,
+    d.orders,
+    COUNT(f.day) AS new_customers
+FROM daily_orders d
+LEFT JOIN daily_payments p
+    ON d.day = p.day
+LEFT JOIN first_orders f
+    ON d.day = f.day
+GROUP BY d.day, p.revenue, d.orders
+ORDER BY d.day
+"""
+
+
+def customer_sketches(con, where="TRUE"):
+    """
+    HyperLogLog sketches of customers with a delivered order: one per
+    purchase day, and one per purchase month and customer state.
+
+    Rows are (grain 'day' | 'month', period, customer_state, registers);
+    customer_state is empty for daily rows. Any set of days, months or
+    states merges into one distinct count without touching the orders.
+    """
+    pairs = con.execute(f"""
+        SELECT DISTINCT
+            o.order_purchase_timestamp::DATE AS day,
+            c.customer_state,
+            hash(c.customer_unique_id) AS h
+        FROM orders o
+        JOIN customers c
+            ON o.customer_id = c.customer_id
+        WHERE o.order_status = 'delivered'
+            AND ({where})
+    """).df()
+    pairs["day"] = pd.to_datetime(pairs["day"])
+    # a missing group key would get ngroup -1
+    pairs["customer_state"] = pairs["customer_state"].fillna("unknown")
+    hashes = pairs["h"].to_numpy(dtype="uint64")
+
+    day_codes, days = pd.factorize(pairs["day"], sort=True)
+    daily = hll.build(day_codes, hashes, len(days))
+
+    month = pairs["day"].dt.to_period("M").dt.to_timestamp()
+    by_state = pairs.groupby([month, pairs["customer_state"]], sort=True)
+    keys = by_state.size().index
+    monthly = hll.build(by_state.ngroup().to_numpy(), hashes, len(keys))
+
+    return pd.concat([
+        pd.DataFrame({
+            "grain": "day",
+            "period": days,
+            "customer_state": "",
+            "registers": [hll.to_bytes(r) for r in daily],
+        }),
+        pd.DataFrame({
+            "grain": "month",
+            "period": keys.get_level_values(0),
+            "customer_state": keys.get_level_values(1),
+            "registers": [hll.to_bytes(r) for r in monthly],
+        }),
+    ], ignore_index=True)
+
+
+def retention_metrics(df_churn):
+    """Same figures as the retention query in run_retention_analysis.py."""
+    total = len(df_churn)
+    repeat = int((df_churn["total_orders"] > 1).sum())
+    return pd.DataFrame({
+        "total_customers": [total],
+        "repeat_customers": [repeat],
+        "repeat_purchase_rate": [round(repeat / total, 3) if total else 0.0],
+    })
@@ -1,64 +1,80 @@
 import pandas as pd
 import numpy as np
 import os
-from scipy.stats import norm
+
+from profiling import stage
+from stage_cache import cached
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "output")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+FEATURES_PATH = os.path.join(DATA_DIR, "churn_features_v2.csv")
 
-
-df = pd.read_csv(os.path.join(DATA_DIR, "churn_features_v2.csv"))
+SEED = 42
+BASELINE_RATE = 0.03
+TREATMENT_LIFT = 0.02
 
 
-eligible = df[df["total_orders"] == 1].copy()
+def simulate_and_test(features_path, seed, baseline_rate, treatment_lift):
+    stage("load features")
+    df = pd.read_csv(features_path)
 
+    eligible = df[df["total_orders"] == 1].copy()
 
-np.random.seed(42)
-eligible["group"] = np.random.choice(
-    ["control", "treatment"],
-    size=len(eligible),
-    p=[0.5, 0.5]
-)
+    stage("simulate and test")
+    from scipy.stats import norm
 
+    np.random.seed(seed)
+    eligible["group"] = np.random.choice(
+        ["control", "treatment"],
+        size=len(eligible),
+        p=[0.5, 0.5]
+    )
 
-baseline_rate = 0.03
-treatment_lift = 0.02
+    eligible["second_purchase"] = np.where(
+        eligible["group"] == "control",
+        np.random.binomial(1, baseline_rate, len(eligible)),
+        np.random.binomial(1, baseline_rate + treatment_lift, len(eligible))
+    )
 
-eligible["second_purchase"] = np.where(
-    eligible["group"] == "control",
-    np.random.binomial(1, baseline_rate, len(eligible)),
-    np.random.binomial(1, baseline_rate + treatment_lift, len(eligible))
-)
+    summary = eligible.groupby("group")["second_purchase"].agg(
+        conversions="sum",
+        users="count"
+    ).reset_index()
 
+    summary["conversion_rate"] = summary["conversions"] / summary["users"]
 
-summary = eligible.groupby("group")["second_purchase"].agg(
-    conversions="sum",
-    users="count"
-).reset_index()
+    c = summary.loc[summary["group"] == "control"].iloc[0]
+    t = summary.loc[summary["group"] == "treatment"].iloc[0]
 
-summary["conversion_rate"] = summary["conversions"] / summary["users"]
+    p_pool = (c["conversions"] + t["conversions"]) / (c["users"] + t["users"])
+    se = np.sqrt(p_pool * (1 - p_pool) * (1 / c["users"] + 1 / t["users"]))
+    z_score = (t["conversion_rate"] - c["conversion_rate"]) / se
+    p_value = 2 * (1 - norm.cdf(abs(z_score)))
 
-print("\nA/B Test Summary:")
-print(summary)
+    summary["z_score"] = z_score
+    summary["p_value"] = p_value
+    return summary
 
 
-c = summary.loc[summary["group"] == "control"].iloc[0]
-t = summary.loc[summary["group"] == "treatment"].iloc[0]
+# the simulation is seeded, so unchanged features + parameters give the same result
+summary = cached(
+    "second purchase A/B test", simulate_and_test,
+    inputs=[FEATURES_PATH],
+    params={"seed": SEED, "baseline_rate": BASELINE_RATE, "treatment_lift": TREATMENT_LIFT},
+)
+z_score = summary["z_score"].iloc[0]
+p_value = summary["p_value"].iloc[0]
 
-p_pool = (c["conversions"] + t["conversions"]) / (c["users"] + t["users"])
-se = np.sqrt(p_pool * (1 - p_pool) * (1 / c["users"] + 1 / t["users"]))
-z_score = (t["conversion_rate"] - c["conversion_rate"]) / se
-p_value = 2 * (1 - norm.cdf(abs(z_score)))
+print("\nA/B Test Summary:")
+print(summary.drop(columns=["z_score", "p_value"]))
 
 print(f"\nZ-score: {z_score:.3f}")
 print(f"P-value: {p_value:.4f}")
 
 
-summary["z_score"] = z_score
-summary["p_value"] = p_value
-
+stage("write outputs")
 output_path = os.path.join(OUTPUT_DIR, "ab_test_second_purchase_results.csv")
 summary.to_csv(output_path, index=False)
 
@@ -1,53 +1,50 @@
-import duckdb
 import pandas as pd
 import os
 
+from warehouse import connect, register_tables
+from rollups import monthly_revenue_query, daily_revenue_query, customer_sketches
+from profiling import stage
+
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, "data", "raw")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
-con = duckdb.connect()
+con = connect()
 print("Connected to DuckDB")
 
 
-print("Loading orders table...")
-con.execute(f"""
-    CREATE TABLE orders AS
-    SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_orders_dataset.csv")}');
-""")
-
-print("Loading payments table...")
-con.execute(f"""
-    CREATE TABLE payments AS
-    SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_order_payments_dataset.csv")}');
-""")
+stage("load tables")
+print("Loading orders, payments and customers tables...")
+register_tables(con, "orders", "payments", "customers")
 
 print("Tables loaded successfully")
 
 
-revenue_query = """
-SELECT
-    DATE_TRUNC('month', o.order_purchase_timestamp) AS month,
-    ROUND(SUM(p.payment_value), 2) AS revenue
-FROM orders o
-JOIN payments p
-    ON o.order_id = p.order_id
-WHERE o.order_status = 'delivered'
-GROUP BY 1
-ORDER BY 1;
-"""
-
-df_revenue = con.execute(revenue_query).df()
+stage("monthly revenue query")
+df_revenue = con.execute(monthly_revenue_query()).df()
 
 print("\nMonthly Revenue (Top 5 Rows):")
 print(df_revenue.head())
 
 
+stage("daily revenue query")
+# daily grain for the dashboard's date-range index
+df_daily = con.execute(daily_revenue_query()).df()
+
+
+stage("customer sketches")
+# distinct active customers for any date range or state, merged on the dashboard
+df_sketches = customer_sketches(con)
+
+
+stage("write outputs")
 output_path = os.path.join(OUTPUT_DIR, "monthly_revenue.csv")
 df_revenue.to_csv(output_path, index=False)
+df_daily.to_csv(os.path.join(OUTPUT_DIR, "daily_revenue.csv"), index=False)
+df_sketches.to_parquet(os.path.join(OUTPUT_DIR, "customer_sketches.parquet"), index=False)
 
 print(f"\nRevenue output saved at: {output_path}")
+print(f"Daily revenue: {len(df_daily):,} days, {len(df_sketches):,} customer sketches")
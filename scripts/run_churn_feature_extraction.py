@@ -1,35 +1,24 @@
-import duckdb
 import pandas as pd
 import os
 
+from warehouse import connect, register_tables
+from id_dictionary import load_dictionary, decode_query
+from profiling import stage
+
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, "data", "raw")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-con = duckdb.connect()
+con = connect(ordered=False)
 print("Connected to DuckDB")
 
 
-print("Loading orders...")
-con.execute(f"""
-    CREATE TABLE orders AS
-    SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_orders_dataset.csv")}');
-""")
-
-print("Loading customers...")
-con.execute(f"""
-    CREATE TABLE customers AS
-    SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_customers_dataset.csv")}');
-""")
-
-print("Loading payments...")
-con.execute(f"""
-    CREATE TABLE payments AS
-    SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_order_payments_dataset.csv")}');
-""")
+stage("load tables")
+print("Loading orders, customers and payments...")
+register_tables(con, "orders", "customers", "payments")
+load_dictionary(con, "customer_unique")
 
 print("Tables loaded successfully")
 
@@ -89,12 +78,17 @@ LEFT JOIN churn_labels cl
     ON co.customer_unique_id = cl.customer_unique_id;
 """
 
-df_churn = con.execute(churn_query).df()
+stage("churn feature query")
+# joins run on integer keys; hex ids are restored only for the output file
+df_churn = con.execute(
+    decode_query(churn_query, {"customer_unique_id": "customer_unique"})
+).df()
 
 print("\nChurn Feature Table Preview:")
 print(df_churn.head())
 
 
+stage("write outputs")
 output_path = os.path.join(OUTPUT_DIR, "churn_features.csv")
 df_churn.to_csv(output_path, index=False)
 
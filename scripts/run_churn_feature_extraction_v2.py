@@ -1,97 +1,212 @@
-import duckdb
-import pandas as pd
-import os
-
-
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, "data", "raw")
-OUTPUT_DIR = os.path.join(BASE_DIR, "output")
-
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-
-con = duckdb.connect()
-print("Connected to DuckDB")
-
-
-con.execute(f"""
-CREATE TABLE orders AS
-SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_orders_dataset.csv")}');
-""")
-
-con.execute(f"""
-CREATE TABLE customers AS
-SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_customers_dataset.csv")}');
-""")
+"""
+Customer-level churn features (see churn_features.py for the queries).
 
-con.execute(f"""
-CREATE TABLE payments AS
-SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_order_payments_dataset.csv")}');
-""")
+By default one process computes every customer. With `--shards N` customers
+are split by `customer_unique_id % N` (the dense integer surrogate key, so
+shards are even and the split is the same on every machine); each shard
+computes its customers' features (and their distribution sketches) from the
+shared warehouse on its own and writes
+output/churn_shards/part-IIII-of-NNNN.{features,sketches}.parquet; the
+feature parts are concatenated and the sketches added. A customer's orders, payments, items and reviews all land in
+its shard, so no shard needs another's rows.
 
-print("Tables loaded")
+    # all shards locally, 4 at a time
+    python scripts/run_churn_feature_extraction_v2.py --shards 16 --workers 4
 
+    # one shard per machine against shared storage, then merge anywhere
+    python scripts/run_churn_feature_extraction_v2.py --shards 16 --shard-index 3 --end-date 2018-10-17
+    python scripts/run_churn_feature_extraction_v2.py --shards 16 --merge
 
-dataset_end_date = con.execute("""
-SELECT MAX(order_purchase_timestamp)::DATE FROM orders;
-""").fetchone()[0]
+    # check that a sharded run matches the single-process run
+    python scripts/run_churn_feature_extraction_v2.py --shards 4 --workers 4 --verify
 
-print(f"Dataset end date: {dataset_end_date}")
+Every shard must see the same dataset end date; pass `--end-date` to
+shards started separately.
+"""
 
+import argparse
+import datetime
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-churn_query = f"""
-WITH customer_orders AS (
-    SELECT
-        c.customer_unique_id,
-        COUNT(DISTINCT o.order_id) AS total_orders,
-        MIN(o.order_purchase_timestamp)::DATE AS first_order_date,
-        MAX(o.order_purchase_timestamp)::DATE AS last_order_date
-    FROM orders o
-    JOIN customers c
-        ON o.customer_id = c.customer_id
-    WHERE o.order_status = 'delivered'
-    GROUP BY c.customer_unique_id
-),
+import pandas as pd
 
-customer_revenue AS (
-    SELECT
-        c.customer_unique_id,
-        SUM(p.payment_value) AS total_revenue,
-        AVG(p.payment_value) AS avg_order_value 
-    FROM orders o
-    JOIN customers c
-        ON o.customer_id = c.customer_id
-    JOIN payments p
-        ON o.order_id = p.order_id
-    WHERE o.order_status = 'delivered'
-    GROUP BY c.customer_unique_id
+from warehouse import (
+    CONNECTION_ENV, OUTPUT_DIR, add_connection_args, apply_connection_args, connect, register_tables,
 )
-
-SELECT
-    co.customer_unique_id,
-    co.total_orders,
-    cr.total_revenue,
-    cr.avg_order_value,
-    co.first_order_date,
-    co.last_order_date,
-    DATE '{dataset_end_date}' - co.last_order_date AS days_since_last_order,
-    CASE
-        WHEN DATE '{dataset_end_date}' - co.last_order_date > 90 THEN 1
-        ELSE 0
-    END AS is_churned
-FROM customer_orders co
-LEFT JOIN customer_revenue cr
-    ON co.customer_unique_id = cr.customer_unique_id;
-"""
-
-df_churn = con.execute(churn_query).df()
-print("\nChurn Feature Table Preview:")
-print(df_churn.head())
+from id_dictionary import load_dictionary, decode_query
+from profiling import stage
+from churn_features import (
+    base_features_query, delivery_review_query, dataset_end_date, FEATURES_QUERY,
+    SKETCH_FEATURES, sketch_segments,
+)
+from quantile_sketch import sketch_table, merge_tables
 
 
-output_path = os.path.join(OUTPUT_DIR, "churn_features_v2.csv")
-df_churn.to_csv(output_path, index=False)
+SHARD_DIR = os.path.join(OUTPUT_DIR, "churn_shards")
 
-print(f"\nChurn features v2 saved at: {output_path}")
 
+def shard_predicate(shards, index):
+    return "TRUE" if shards == 1 else f"c.customer_unique_id % {shards} = {index}"
+
+
+def shard_path(shards, index, kind="features"):
+    return os.path.join(SHARD_DIR, f"part-{index:04d}-of-{shards:04d}.{kind}.parquet")
+
+
+def open_warehouse():
+    # customer rows come out in hash order either way; no need to preserve it
+    con = connect(ordered=False)
+    register_tables(con, "orders", "customers", "payments", "order_items", "reviews")
+    load_dictionary(con, "customer_unique")
+    return con
+
+
+def extract(con, end_date, where="TRUE", log=print):
+    """Decoded feature rows for the customers matching `where`."""
+    stage("base features query")
+    started = time.perf_counter()
+    con.execute(f"CREATE OR REPLACE TEMP TABLE base_features AS {base_features_query(end_date, where)}")
+    base_seconds = time.perf_counter() - started
+
+    stage("delivery/review features query")
+    started = time.perf_counter()
+    con.execute(f"CREATE OR REPLACE TEMP TABLE delivery_features AS {delivery_review_query(where)}")
+    extra_seconds = time.perf_counter() - started
+
+    log(f"\nBase features: {base_seconds:.2f}s")
+    log(f"Delivery/review features: {extra_seconds:.2f}s "
+        f"(+{extra_seconds / max(base_seconds, 1e-9) * 100:.0f}% over base extraction)")
+
+    stage("decode features")
+    return con.execute(decode_query(
+        FEATURES_QUERY, {"customer_unique_id": "customer_unique"}
+    )).df()
+
+
+def run_shard(shards, index, end_date):
+    """Compute and write one shard's features and distribution sketches."""
+    con = open_warehouse()
+    df = extract(con, end_date, shard_predicate(shards, index), log=lambda message: None)
+    con.close()
+
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    for kind, frame in [
+        ("features", df),
+        ("sketches", sketch_table(df, SKETCH_FEATURES, sketch_segments(df))),
+    ]:
+        path = shard_path(shards, index, kind)
+        frame.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+    return index, len(df)
+
+
+def merge_shards(shards):
+    """Concatenate the features and add the sketches of all `shards` parts."""
+    missing = [i for i in range(shards) if not os.path.exists(shard_path(shards, i, "sketches"))]
+    if missing:
+        raise SystemExit(f"Missing shard(s) {missing} of {shards} in {SHARD_DIR}")
+    df = pd.concat(
+        [pd.read_parquet(shard_path(shards, i)) for i in range(shards)], ignore_index=True
+    )
+    # sketches of disjoint customer sets add up exactly
+    sketches = merge_tables(*[pd.read_parquet(shard_path(shards, i, "sketches")) for i in range(shards)])
+    return df, sketches
+
+
+def run_sharded(shards, workers, end_date):
+    # split the cores between workers instead of giving each one all of them
+    os.environ.setdefault(CONNECTION_ENV["threads"], str(max(1, (os.cpu_count() or 1) // workers)))
+    print(f"Extracting {shards} shards across {workers} worker processes...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for index, rows in pool.map(run_shard, [shards] * shards, range(shards), [end_date] * shards):
+            print(f"  shard {index + 1}/{shards}: {rows:,} customers")
+
+
+def verify(df, end_date):
+    """Compare `df` against a single-process extraction; exit non-zero on a mismatch."""
+    stage("verify against single process")
+    con = open_warehouse()
+    expected = extract(con, end_date, log=lambda message: None)
+    con.close()
+
+    def canonical(frame):
+        return frame.sort_values("customer_unique_id").reset_index(drop=True)[expected.columns]
+
+    try:
+        pd.testing.assert_frame_equal(canonical(df), canonical(expected), check_dtype=False, rtol=1e-9)
+    except AssertionError as e:
+        raise SystemExit(f"\nVERIFY FAILED: sharded output differs from the single-process run\n{e}")
+    print(f"\nVerified: sharded output matches the single-process run ({len(df):,} customers)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract customer-level churn features")
+    parser.add_argument("--shards", type=int, default=1, help="split customers into this many shards")
+    parser.add_argument("--workers", type=int, default=1, help="local processes running shards")
+    parser.add_argument("--shard-index", type=int,
+                        help="compute only this shard and write its part file (for running shards separately)")
+    parser.add_argument("--merge", action="store_true", help="only merge existing shard part files")
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat,
+                        help="dataset end date (default: latest purchase date in orders)")
+    parser.add_argument("--verify", action="store_true",
+                        help="also run single-process and check the outputs are identical")
+    add_connection_args(parser)
+    args = parser.parse_args()
+    apply_connection_args(args)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    stage("load tables")
+    con = open_warehouse()
+    print("Tables loaded")
+
+    end_date = args.end_date or dataset_end_date(con)
+    print(f"Dataset end date: {end_date}")
+
+    if args.shard_index is not None:
+        con.close()
+        index, rows = run_shard(args.shards, args.shard_index, end_date)
+        print(f"Shard {index + 1}/{args.shards}: {rows:,} customers written to {SHARD_DIR}")
+        return
+
+    if args.shards > 1 or args.merge:
+        con.close()
+        if not args.merge:
+            # stale parts of an earlier run with the same shard count must not be merged
+            for path in glob.glob(os.path.join(SHARD_DIR, f"part-*-of-{args.shards:04d}.*.parquet")):
+                os.remove(path)
+            stage("extract shards")
+            run_sharded(args.shards, max(1, args.workers), end_date)
+        stage("merge shards")
+        df_churn, sketches = merge_shards(args.shards)
+    else:
+        df_churn = extract(con, end_date)
+        con.close()
+        sketches = None
+
+    print("\nChurn Feature Table Preview:")
+    print(df_churn.head())
+
+    stage("write outputs")
+    output_path = os.path.join(OUTPUT_DIR, "churn_features_v2.csv")
+    df_churn.to_csv(output_path, index=False)
+
+    print(f"\nChurn features v2 saved at: {output_path}")
+
+    stage("distribution sketches")
+    # per-segment quantile sketches: medians and box plots without the full columns
+    if sketches is None:
+        sketches = sketch_table(df_churn, SKETCH_FEATURES, sketch_segments(df_churn))
+    sketches.to_parquet(os.path.join(OUTPUT_DIR, "churn_sketches.parquet"), index=False)
+
+    print(f"Distribution sketches: {len(sketches):,} (segment, feature) pairs")
+
+    if args.verify:
+        verify(df_churn, end_date)
+
+
+if __name__ == "__main__":
+    main()
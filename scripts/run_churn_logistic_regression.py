@@ -8,11 +8,14 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
 from sklearn.impute import SimpleImputer
 
+from profiling import stage
+
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "output")
 
 
+stage("load features")
 df = pd.read_csv(os.path.join(DATA_DIR, "churn_features_v2.csv"))
 
 features = [
@@ -26,6 +29,7 @@ X = df[features]
 y = df["is_churned"]
 
 
+stage("preprocess")
 imputer = SimpleImputer(strategy="median")
 X_imputed = imputer.fit_transform(X)
 
@@ -39,10 +43,12 @@ scaler = StandardScaler()
 X_train_scaled = scaler.fit_transform(X_train)
 X_test_scaled = scaler.transform(X_test)
 
+stage("fit")
 model = LogisticRegression(max_iter=1000)
 model.fit(X_train_scaled, y_train)
 
 
+stage("evaluate")
 y_pred = model.predict(X_test_scaled)
 y_prob = model.predict_proba(X_test_scaled)[:, 1]
 
@@ -56,6 +62,7 @@ roc_auc = roc_auc_score(y_test, y_prob)
 print(f"\nROC-AUC Score: {roc_auc:.3f}")
 
 
+stage("write outputs")
 coef_df = pd.DataFrame({
     "feature": features,
     "coefficient": model.coef_[0]
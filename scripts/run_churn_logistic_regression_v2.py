@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import os
 
@@ -7,10 +8,14 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
 from sklearn.impute import SimpleImputer
 
+from profiling import stage
+from threshold_curves import save_scores
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "output")
 
 
+stage("load features")
 df = pd.read_csv(os.path.join(DATA_DIR, "churn_features_v2.csv"))
 
 
@@ -24,6 +29,7 @@ X = df[features]
 y = df["is_churned"]
 
 
+stage("preprocess")
 imputer = SimpleImputer(strategy="median")
 X_imputed = imputer.fit_transform(X)
 
@@ -42,10 +48,12 @@ X_train_scaled = scaler.fit_transform(X_train)
 X_test_scaled = scaler.transform(X_test)
 
 
+stage("fit")
 model = LogisticRegression(max_iter=1000)
 model.fit(X_train_scaled, y_train)
 
 
+stage("evaluate")
 y_pred = model.predict(X_test_scaled)
 y_prob = model.predict_proba(X_test_scaled)[:, 1]
 
@@ -59,6 +67,18 @@ roc_auc = roc_auc_score(y_test, y_prob)
 print(f"\nROC-AUC Score: {roc_auc:.3f}")
 
 
+# held-out scores, for threshold and profit curves (threshold_curves.py)
+scores_df = pd.DataFrame({
+    "model": "logistic_regression",
+    "customer_unique_id": df.loc[y_test.index, "customer_unique_id"].to_numpy(),
+    "is_churned": y_test.to_numpy(),
+    "churn_score": y_prob,
+    "total_revenue": df.loc[y_test.index, "total_revenue"].to_numpy(),
+})
+save_scores(scores_df)
+
+
+stage("write outputs")
 coef_df = pd.DataFrame({
     "feature": features,
     "coefficient": model.coef_[0]
@@ -74,3 +94,20 @@ coef_df.to_csv(
 )
 
 print("\nLeakage-free model coefficients saved.")
+
+
+# fitted imputer, scaler and coefficients, so profile_store.py can score without sklearn
+model_path = os.path.join(DATA_DIR, "churn_model.npz")
+with open(model_path + ".tmp", "wb") as f:
+    np.savez(
+        f,
+        features=np.array(features),
+        medians=imputer.statistics_,
+        mean=scaler.mean_,
+        scale=scaler.scale_,
+        coef=model.coef_[0],
+        intercept=model.intercept_,
+    )
+os.replace(model_path + ".tmp", model_path)
+
+print(f"Model parameters saved at: {model_path}")
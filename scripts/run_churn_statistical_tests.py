@@ -2,46 +2,61 @@
 import pandas as pd
 import numpy as np
 import os
-from scipy.stats import ttest_ind, mannwhitneyu
+
+from profiling import stage
+from stage_cache import cached
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "output")
+FEATURES_PATH = os.path.join(DATA_DIR, "churn_features_v2.csv")
 
 
-df = pd.read_csv(os.path.join(DATA_DIR, "churn_features_v2.csv"))
+features = ["total_orders", "total_revenue", "avg_order_value"]
 
 
-churned = df[df["is_churned"] == 1]
-active = df[df["is_churned"] == 0]
+def run_tests(features_path, features):
+    stage("load features")
+    df = pd.read_csv(features_path)
 
-features = ["total_orders", "total_revenue", "avg_order_value"]
+    churned = df[df["is_churned"] == 1]
+    active = df[df["is_churned"] == 0]
+
+    stage("statistical tests")
+    from scipy.stats import ttest_ind, mannwhitneyu
+
+    results = []
 
-results = []
+    for feature in features:
+        x1 = churned[feature].dropna()
+        x0 = active[feature].dropna()
 
+        t_stat, t_p = ttest_ind(x1, x0, equal_var=False)
 
-for feature in features:
-    x1 = churned[feature].dropna()
-    x0 = active[feature].dropna()
+        u_stat, u_p = mannwhitneyu(x1, x0, alternative="two-sided")
 
-    t_stat, t_p = ttest_ind(x1, x0, equal_var=False)
+        results.append({
+            "feature": feature,
+            "churned_mean": x1.mean(),
+            "active_mean": x0.mean(),
+            "t_test_p_value": t_p,
+            "mannwhitney_p_value": u_p
+        })
 
-    u_stat, u_p = mannwhitneyu(x1, x0, alternative="two-sided")
+    return pd.DataFrame(results)
 
-    results.append({
-        "feature": feature,
-        "churned_mean": x1.mean(),
-        "active_mean": x0.mean(),
-        "t_test_p_value": t_p,
-        "mannwhitney_p_value": u_p
-    })
 
-results_df = pd.DataFrame(results)
+# skipped entirely while churn_features_v2.csv and this stage are unchanged
+results_df = cached(
+    "churn statistical tests", run_tests,
+    inputs=[FEATURES_PATH], params={"features": features},
+)
 
 print("\nStatistical Test Results:")
 print(results_df)
 
 
+stage("write outputs")
 output_path = os.path.join(DATA_DIR, "churn_statistical_tests.csv")
 results_df.to_csv(output_path, index=False)
 
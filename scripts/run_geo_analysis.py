@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import os
+
+from warehouse import connect, register_tables, processed_path, PROCESSED_DIR
+from geo_index import ZipIndex
+from profiling import stage
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+INDEX_PATH = os.path.join(PROCESSED_DIR, "zip_centroids.npz")
+
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+
+con = connect(ordered=False)
+print("Connected to DuckDB")
+
+
+stage("load tables")
+print("Loading geolocation, customers, sellers, orders, items and payments...")
+register_tables(con, "geolocation", "customers", "sellers", "orders", "order_items", "payments")
+
+print("Tables loaded successfully")
+
+
+stage("zip centroid index")
+# The raw geolocation table is scanned exactly once, here.
+geo = con.execute("""
+    SELECT
+        geolocation_zip_code_prefix::INTEGER AS zip,
+        geolocation_lat::DOUBLE AS lat,
+        geolocation_lng::DOUBLE AS lng
+    FROM geolocation;
+""").fetchnumpy()
+
+index = ZipIndex.from_geolocation(geo["zip"], geo["lat"], geo["lng"])
+index.save(INDEX_PATH)
+
+print(f"\nCollapsed {len(geo['zip']):,} geolocation rows to {len(index):,} zip centroids")
+print(f"Zip index saved at: {INDEX_PATH}")
+
+
+# Revenue and customers by customer location, every grain in one pass
+location_query = """
+WITH order_revenue AS (
+    SELECT
+        order_id,
+        SUM(payment_value) AS revenue
+    FROM payments
+    GROUP BY order_id
+)
+
+SELECT
+    c.customer_state,
+    c.customer_city,
+    c.customer_zip_code_prefix::INTEGER AS zip,
+    GROUPING(c.customer_city, c.customer_zip_code_prefix) AS grain,
+    COUNT(DISTINCT c.customer_unique_id) AS customers,
+    COUNT(DISTINCT o.order_id) AS orders,
+    ROUND(SUM(r.revenue), 2) AS revenue
+FROM orders o
+JOIN customers c
+    ON o.customer_id = c.customer_id
+LEFT JOIN order_revenue r
+    ON o.order_id = r.order_id
+WHERE o.order_status = 'delivered'
+GROUP BY GROUPING SETS (
+    (c.customer_state),
+    (c.customer_state, c.customer_city),
+    (c.customer_state, c.customer_city, c.customer_zip_code_prefix)
+);
+"""
+
+stage("location grouping sets query")
+df_loc = con.execute(location_query).df()
+
+# GROUPING() bitmask: 3 = state only, 1 = state + city, 0 = zip
+df_state = df_loc[df_loc["grain"] == 3].drop(columns=["customer_city", "zip", "grain"])
+df_state = df_state.sort_values("revenue", ascending=False)
+
+df_zip = df_loc[df_loc["grain"] == 0].copy()
+df_zip["lat"], df_zip["lng"] = index.lookup(df_zip["zip"].to_numpy())
+df_zip = df_zip.dropna(subset=["lat"])
+
+# City centroid for map views: revenue-weighted mean of its zip centroids
+w = df_zip["revenue"].fillna(0).to_numpy() + 1e-9
+df_zip["w"], df_zip["wlat"], df_zip["wlng"] = w, df_zip["lat"] * w, df_zip["lng"] * w
+centroids = df_zip.groupby(["customer_state", "customer_city"])[["w", "wlat", "wlng"]].sum()
+centroids["lat"] = centroids["wlat"] / centroids["w"]
+centroids["lng"] = centroids["wlng"] / centroids["w"]
+
+df_city = df_loc[df_loc["grain"] == 1].drop(columns=["zip", "grain"])
+df_city = df_city.join(centroids[["lat", "lng"]], on=["customer_state", "customer_city"])
+df_city = df_city.sort_values("revenue", ascending=False)
+
+print("\nRevenue by State (Top 5 Rows):")
+print(df_state.head())
+
+
+stage("item distances")
+# Seller -> customer distance per order item, from the index (no geo rescan)
+items = con.execute("""
+    SELECT
+        i.order_id,
+        i.order_item_id,
+        s.seller_zip_code_prefix::INTEGER AS seller_zip,
+        c.customer_zip_code_prefix::INTEGER AS customer_zip
+    FROM order_items i
+    JOIN orders o
+        ON i.order_id = o.order_id
+    JOIN customers c
+        ON o.customer_id = c.customer_id
+    JOIN sellers s
+        ON i.seller_id = s.seller_id;
+""").fetchnumpy()
+
+distance = index.distance_km(items["seller_zip"], items["customer_zip"]).astype(np.float32)
+df_distance = pd.DataFrame({
+    "order_id": items["order_id"],
+    "order_item_id": items["order_item_id"],
+    "distance_km": distance,
+})
+
+os.makedirs(processed_path("order_item_distance"), exist_ok=True)
+distance_path = os.path.join(processed_path("order_item_distance"), "order_item_distance.parquet")
+con.register("df_distance", df_distance)
+con.execute(f"COPY df_distance TO '{distance_path}' (FORMAT PARQUET);")
+
+print(f"\nMedian seller-to-customer distance: {np.nanmedian(distance):,.0f} km")
+
+
+stage("write outputs")
+state_path = os.path.join(OUTPUT_DIR, "geo_state_summary.csv")
+df_state.to_csv(state_path, index=False)
+
+city_path = os.path.join(OUTPUT_DIR, "geo_city_summary.csv")
+df_city.to_csv(city_path, index=False)
+
+print(f"\nState summary saved at: {state_path}")
+print(f"City summary saved at: {city_path}")
+print(f"Item distances saved at: {distance_path}")
@@ -0,0 +1,277 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+
+from warehouse import (
+    RAW_TABLES, RAW_DIR, PROCESSED_DIR, PARTITIONED_TABLES,
+    processed_path, processed_parts, table_scan, connect, add_connection_args, apply_connection_args,
+)
+from id_dictionary import update_dictionary, encode_query
+from profiling import stage
+
+
+MANIFEST_PATH = os.path.join(PROCESSED_DIR, "ingest_manifest.json")
+
+
+def raw_files(table):
+    """
+    Raw CSVs feeding `table`: the original Olist export plus any later
+    drops named <export stem>_<suffix>.csv (e.g. olist_orders_dataset_2018_09.csv).
+    """
+    stem = os.path.splitext(RAW_TABLES[table][0])[0]
+    return sorted(
+        glob.glob(os.path.join(RAW_DIR, f"{stem}.csv"))
+        + glob.glob(os.path.join(RAW_DIR, f"{stem}_*.csv"))
+    )
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def part_stem(raw_file):
+    return os.path.splitext(os.path.basename(raw_file))[0]
+
+
+def part_files(table, raw_file):
+    """Processed parquet files currently holding the rows of one raw file."""
+    stem = part_stem(raw_file)
+    if table in PARTITIONED_TABLES:
+        return sorted(glob.glob(os.path.join(processed_path(table), "*", "*", f"{stem}.part*.parquet")))
+    path = os.path.join(processed_path(table), f"{stem}.parquet")
+    return [path] if os.path.exists(path) else []
+
+
+def load_manifest():
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def partition_query(con, table, encoded):
+    """Add the year/month partition columns to the encoded rows of `table`."""
+    if table == "orders":
+        # sorted so each file's row groups cover narrow time ranges
+        return f"""
+            SELECT
+                *,
+                year(order_purchase_timestamp) AS year,
+                month(order_purchase_timestamp) AS month
+            FROM ({encoded})
+            ORDER BY order_purchase_timestamp
+        """
+    # payments follow the purchase month of their order; payments whose
+    # order is not ingested yet wait in year=0/month=0 (see rehome_payments)
+    if not processed_parts("orders"):
+        return f"SELECT *, 0 AS year, 0 AS month FROM ({encoded})"
+    return f"""
+        SELECT
+            e.*,
+            COALESCE(o.year, 0) AS year,
+            COALESCE(o.month, 0) AS month
+        FROM ({encoded}) e
+        LEFT JOIN (
+            SELECT order_id, ANY_VALUE(year) AS year, ANY_VALUE(month) AS month
+            FROM {table_scan("orders")}
+            GROUP BY order_id
+        ) o
+            ON e.order_id = o.order_id
+    """
+
+
+def write_partitioned(con, table, query, stem, replaces):
+    """
+    Write `query` as one file per touched partition, then drop `replaces`.
+
+    New files get fresh names, so readers never see a half-written file;
+    only the partitions the rows fall into are written.
+    """
+    tmp_dir = os.path.join(processed_path(table), f".tmp-{stem}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    con.execute(f"""
+        COPY ({query})
+        TO '{tmp_dir}' (FORMAT PARQUET, PARTITION_BY (year, month), FILENAME_PATTERN '{stem}.part{{uuid}}');
+    """)
+    for path in glob.glob(os.path.join(tmp_dir, "*", "*", "*.parquet")):
+        target = os.path.join(processed_path(table), os.path.relpath(path, tmp_dir))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    remove_files(replaces)
+
+
+def remove_files(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+        # drop partition directories left empty
+        parent = os.path.dirname(path)
+        while os.path.basename(parent).count("=") == 1 and not os.listdir(parent):
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+
+
+def write_part(con, table, relation, raw_file):
+    """Encode `relation` with integer keys and replace the parts of `raw_file`."""
+    os.makedirs(processed_path(table), exist_ok=True)
+    encoded = encode_query(relation, RAW_TABLES[table][1])
+    old_files = part_files(table, raw_file)
+
+    if table in PARTITIONED_TABLES:
+        write_partitioned(con, table, partition_query(con, table, encoded), part_stem(raw_file), old_files)
+        return
+
+    path = os.path.join(processed_path(table), f"{part_stem(raw_file)}.parquet")
+    tmp_path = path + ".tmp"
+    con.execute(f"""
+        COPY ({encoded})
+        TO '{tmp_path}' (FORMAT PARQUET);
+    """)
+    os.replace(tmp_path, path)
+
+
+def rehome_payments(con, log=print):
+    """
+    Move payment rows whose partition no longer matches their order's
+    purchase month (orders arrived late or were corrected). Only the files
+    holding such rows are rewritten.
+    """
+    if not processed_parts("payments") or not processed_parts("orders"):
+        return
+    stale = con.execute(f"""
+        SELECT DISTINCT p.filename
+        FROM read_parquet('{processed_path("payments")}/**/*.parquet',
+                          hive_partitioning = true, filename = true) p
+        LEFT JOIN (
+            SELECT order_id, ANY_VALUE(year) AS year, ANY_VALUE(month) AS month
+            FROM {table_scan("orders")}
+            GROUP BY order_id
+        ) o
+            ON p.order_id = o.order_id
+        WHERE COALESCE(o.year, 0) <> p.year OR COALESCE(o.month, 0) <> p.month;
+    """).fetchall()
+
+    for (path,) in stale:
+        stem = os.path.basename(path).split(".part")[0]
+        # partition columns are not stored in the file itself
+        encoded = f"SELECT * FROM read_parquet('{path}', hive_partitioning = false)"
+        write_partitioned(con, "payments", partition_query(con, "payments", encoded), stem, [path])
+    if stale:
+        log(f"Re-partitioned {len(stale)} payments file(s) after order changes")
+
+
+def scan_changes(force=False):
+    """
+    Compare data/raw against the manifest of the last ingest.
+
+    Returns (pending, removed): pending maps table -> raw files that are new
+    or changed; removed maps the name of every raw file that disappeared to
+    its table.
+    """
+    manifest = load_manifest()
+    pending = {}
+    seen = set()
+    for table in RAW_TABLES:
+        for path in raw_files(table):
+            key = os.path.basename(path)
+            seen.add(key)
+            entry = manifest.get(key)
+            if force or entry is None or entry["signature"] != file_signature(path):
+                pending.setdefault(table, []).append(path)
+
+    removed = {key: manifest[key]["table"] for key in sorted(set(manifest) - seen)}
+    return pending, removed
+
+
+def ingest(con, pending, removed, log=print, save=True):
+    """
+    Ingest the raw files found by `scan_changes`.
+
+    Only those files are read; their ids extend the dictionaries and each is
+    written to its own part under data/processed/<table>/ (one part per
+    touched month for partitioned tables), replacing the parts of an earlier
+    version of the same file. Parts of removed files are deleted.
+
+    Returns the updated manifest. With `save=False` the caller saves it once
+    its downstream steps succeed; until then the files count as unprocessed
+    and are ingested again (idempotently) on the next scan.
+    """
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    manifest = load_manifest()
+
+    for key, table in removed.items():
+        manifest.pop(key, None)
+        remove_files(part_files(table, key))
+        log(f"Removed {table} parts for deleted file {key}")
+
+    relations = {}
+    for table, paths in pending.items():
+        for path in paths:
+            relation = f"raw_{len(relations)}"
+            # signature taken before reading, so a write racing the read is seen next scan
+            signature = file_signature(path)
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE {relation} AS
+                SELECT * FROM read_csv_auto('{path}');
+            """)
+            relations[path] = (table, relation, signature)
+            log(f"Loaded {os.path.basename(path)}")
+
+    # dictionary name -> every (raw relation, column) that carries that id
+    sources = {}
+    for table, relation, _ in relations.values():
+        for column, name in RAW_TABLES[table][1].items():
+            sources.setdefault(name, []).append((relation, column))
+
+    for name, columns in sources.items():
+        new_ids = update_dictionary(con, name, columns)
+        total = con.execute(f"SELECT COUNT(*) FROM dict_{name};").fetchone()[0]
+        log(f"Dictionary '{name}': {new_ids:,} new ids, {total:,} total")
+
+    # RAW_TABLES order puts orders before payments, so new payments find their month
+    for path, (table, relation, signature) in relations.items():
+        write_part(con, table, relation, path)
+        manifest[os.path.basename(path)] = {"table": table, "signature": signature}
+        log(f"Wrote {table} parts for {os.path.basename(path)}")
+
+    if "orders" in pending or "orders" in removed.values():
+        rehome_payments(con, log=log)
+
+    if save:
+        save_manifest(manifest)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest raw Olist CSVs into integer-keyed parquet")
+    parser.add_argument("--force", action="store_true", help="re-ingest every raw file")
+    add_connection_args(parser)
+    args = parser.parse_args()
+    apply_connection_args(args)
+
+    # parts are written unordered; nothing downstream relies on raw row order
+    con = connect(ordered=False)
+    print("Connected to DuckDB")
+
+    stage("scan raw files")
+    pending, removed = scan_changes(force=args.force)
+    if not pending and not removed:
+        print("No new or changed raw files")
+    stage("ingest")
+    ingest(con, pending, removed)
+    print("\nIngest complete")
+
+
+if __name__ == "__main__":
+    main()
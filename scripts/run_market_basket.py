@@ -0,0 +1,214 @@
+"""
+Product and category co-purchase associations (market basket).
+
+Delivered orders form a sparse binary order x item matrix X (item = product
+or category), and item-item co-occurrence is XᵀX. X is never built whole:
+item support and order counts come from grouped counts in DuckDB, and the
+baskets are streamed one range of order keys at a time (`--chunk-orders`
+multi-item orders per range), each range becoming a slice of X whose
+sliceᵀslice is added to the running co-occurrence matrix. Only one slice and
+that matrix are in memory at once; orders with a single distinct item add
+nothing off the diagonal and only count toward support. For each pair seen
+together in at least `--min-orders` orders:
+
+    confidence(a -> b) = orders with a and b / orders with a
+    lift(a, b)         = confidence(a -> b) / share of orders with b
+
+and the `--top-k` partners of every item by lift are kept with a partial sort
+(argpartition) per row rather than sorting each full row.
+
+    python scripts/run_market_basket.py [--top-k 10] [--chunk-orders 50000]
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from warehouse import OUTPUT_DIR, add_connection_args, apply_connection_args, connect, register_tables
+from id_dictionary import load_dictionary
+from profiling import stage
+
+
+# item key per delivered order, one row per distinct (order, item)
+BASKET_QUERIES = {
+    "product": """
+        SELECT DISTINCT i.order_id, i.product_id AS item
+        FROM order_items i
+        JOIN orders o
+            ON i.order_id = o.order_id
+        WHERE o.order_status = 'delivered'
+    """,
+    "category": """
+        SELECT DISTINCT i.order_id, p.product_category_name AS item
+        FROM order_items i
+        JOIN orders o
+            ON i.order_id = o.order_id
+        JOIN products p
+            ON i.product_id = p.product_id
+        WHERE o.order_status = 'delivered'
+            AND p.product_category_name IS NOT NULL
+    """,
+}
+
+# item key -> display name
+NAME_QUERIES = {
+    "product": """
+        SELECT
+            d.key AS item,
+            d.id AS product_id,
+            COALESCE(t.product_category_name_english, c.id, 'unknown') AS category
+        FROM dict_product d
+        LEFT JOIN products p
+            ON d.key = p.product_id
+        LEFT JOIN dict_category c
+            ON p.product_category_name = c.key
+        LEFT JOIN category_translation t
+            ON p.product_category_name = t.product_category_name
+    """,
+    "category": """
+        SELECT
+            d.key AS item,
+            COALESCE(t.product_category_name_english, d.id) AS category
+        FROM dict_category d
+        LEFT JOIN category_translation t
+            ON d.key = t.product_category_name
+    """,
+}
+
+
+def order_ranges(con, view, chunk_orders):
+    """(first, last) order key of consecutive ranges holding `chunk_orders` multi-item orders each."""
+    return con.execute(f"""
+        SELECT MIN(order_id) AS lo, MAX(order_id) AS hi
+        FROM (
+            SELECT order_id, (ROW_NUMBER() OVER (ORDER BY order_id) - 1) // {int(chunk_orders)} AS slice
+            FROM {view}
+            GROUP BY order_id
+            HAVING COUNT(*) > 1
+        )
+        GROUP BY slice
+        ORDER BY slice
+    """).fetchall()
+
+
+def basket_slice(baskets, items):
+    """Sparse binary matrix of one range of orders, columns aligned with `items`."""
+    from scipy import sparse
+
+    order_index, orders = pd.factorize(baskets["order_id"])
+    item_index = np.searchsorted(items, baskets["item"].to_numpy())
+    return sparse.csr_matrix(
+        (np.ones(len(baskets), dtype=np.int32), (order_index, item_index)),
+        shape=(len(orders), len(items)),
+    )
+
+
+def co_occurrence(con, view, items, chunk_orders):
+    """XᵀX over multi-item orders, streamed one range of order keys at a time."""
+    from scipy import sparse
+
+    counts = sparse.csr_matrix((len(items), len(items)), dtype=np.int64)
+    for lo, hi in order_ranges(con, view, chunk_orders):
+        chunk = basket_slice(
+            con.execute(f"SELECT order_id, item FROM {view} WHERE order_id BETWEEN {lo} AND {hi}").df(),
+            items,
+        )
+        # single-item orders in the range only touch the diagonal, cleared below
+        counts = counts + (chunk.T @ chunk).astype(np.int64)
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+    return counts.tocsr()
+
+
+def top_associations(counts, support, n_orders, top_k, min_orders):
+    """Best `top_k` partners by lift per item, as (item, partner, co_orders, confidence, lift) rows."""
+    rows = []
+    for a in range(counts.shape[0]):
+        lo, hi = counts.indptr[a], counts.indptr[a + 1]
+        partners = counts.indices[lo:hi]
+        co_orders = counts.data[lo:hi]
+        keep = co_orders >= min_orders
+        partners, co_orders = partners[keep], co_orders[keep]
+        if len(partners) == 0:
+            continue
+
+        lift = co_orders * n_orders / (support[a] * support[partners])
+        if len(partners) > top_k:
+            # O(n) selection of the k best, then sort only those k
+            best = np.argpartition(-lift, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(partners))
+        best = best[np.argsort(-lift[best], kind="stable")]
+
+        for rank, j in enumerate(best, 1):
+            rows.append((a, partners[j], co_orders[j], co_orders[j] / support[a], lift[j], rank))
+    return pd.DataFrame(rows, columns=["item", "partner", "co_orders", "confidence", "lift", "rank"])
+
+
+def associations(con, level, top_k, min_orders, chunk_orders):
+    stage(f"{level} support")
+    view = f"baskets_{level}"
+    con.execute(f"CREATE OR REPLACE TEMP VIEW {view} AS {BASKET_QUERIES[level]}")
+    item_counts = con.execute(f"SELECT item, COUNT(*) AS orders FROM {view} GROUP BY item ORDER BY item").df()
+    items = item_counts["item"].to_numpy()
+    support = item_counts["orders"].to_numpy(dtype=np.int64)
+    n_orders = con.execute(f"SELECT COUNT(DISTINCT order_id) FROM {view}").fetchone()[0]
+
+    stage(f"{level} co-occurrence")
+    counts = co_occurrence(con, view, items, chunk_orders)
+    print(f"{level}: {n_orders:,} orders x {len(items):,} items, "
+          f"{support.sum():,} basket entries, {counts.nnz // 2:,} co-purchased pairs")
+
+    stage(f"{level} top-k")
+    df = top_associations(counts, support, n_orders, top_k, min_orders)
+
+    # positions -> item keys -> display names
+    names = con.execute(NAME_QUERIES[level]).df().set_index("item")
+    name_column = "product_id" if level == "product" else "category"
+    for side in ("item", "partner"):
+        positions = df[side].to_numpy(dtype=np.int64)
+        keys = items[positions]
+        df[f"{side}_support"] = support[positions]
+        df[side] = keys
+        df[f"{side}_name"] = names[name_column].reindex(keys).to_numpy()
+        if level == "product":
+            df[f"{side}_category"] = names["category"].reindex(keys).to_numpy()
+
+    df["confidence"] = df["confidence"].round(4)
+    df["lift"] = df["lift"].round(3)
+    return df.drop(columns=["item", "partner"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-purchase associations between products and categories")
+    parser.add_argument("--top-k", type=int, default=10, help="partners kept per item")
+    parser.add_argument("--min-orders", type=int, default=2,
+                        help="orders a pair must share to be reported")
+    parser.add_argument("--chunk-orders", type=int, default=50_000,
+                        help="multi-item orders streamed per slice of the basket matrix")
+    parser.add_argument("--levels", nargs="+", default=["category", "product"], choices=list(BASKET_QUERIES))
+    add_connection_args(parser)
+    args = parser.parse_args()
+    apply_connection_args(args)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    con = connect(ordered=False)
+    stage("load tables")
+    register_tables(con, "orders", "order_items", "products", "category_translation")
+    load_dictionary(con, "product")
+    load_dictionary(con, "category")
+
+    for level in args.levels:
+        df = associations(con, level, args.top_k, args.min_orders, args.chunk_orders)
+        stage(f"write {level} outputs")
+        output_path = os.path.join(OUTPUT_DIR, f"co_purchase_{level}.csv")
+        df.to_csv(output_path, index=False)
+        print(f"{level}: {df['item_name'].nunique():,} items with associations saved at {output_path}")
+
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
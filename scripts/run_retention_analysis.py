@@ -1,30 +1,23 @@
-import duckdb
 import pandas as pd
 import os
 
+from warehouse import connect, register_tables
+from profiling import stage
+
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, "data", "raw")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
-con = duckdb.connect()
+con = connect()
 print("Connected to DuckDB")
 
 
-print("Loading orders...")
-con.execute(f"""
-    CREATE TABLE orders AS
-    SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_orders_dataset.csv")}');
-""")
-
-print("Loading customers...")
-con.execute(f"""
-    CREATE TABLE customers AS
-    SELECT * FROM read_csv_auto('{os.path.join(DATA_DIR, "olist_customers_dataset.csv")}');
-""")
+stage("load tables")
+print("Loading orders and customers...")
+register_tables(con, "orders", "customers")
 
 print("Tables loaded successfully")
 
@@ -52,12 +45,14 @@ SELECT
 FROM customer_orders;
 """
 
+stage("retention query")
 df_retention = con.execute(retention_query).df()
 
 print("\nRetention Metrics (Corrected):")
 print(df_retention)
 
 
+stage("write outputs")
 output_path = os.path.join(OUTPUT_DIR, "retention_metrics.csv")
 df_retention.to_csv(output_path, index=False)
 
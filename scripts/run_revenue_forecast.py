@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import json
+import pandas as pd
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from warehouse import add_connection_args, apply_connection_args, connect, register_tables
+from revenue_forecast import backtest, MODELS
+from profiling import stage
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+CACHE_PATH = os.path.join(OUTPUT_DIR, ".forecast_cache.json")
+
+# freq -> (DATE_TRUNC unit, pandas period frequency, season length)
+FREQUENCIES = {
+    "monthly": ("month", "MS", 12),
+    "daily": ("day", "D", 7),
+}
+
+# breakdown -> SQL expression naming the series
+BREAKDOWNS = {
+    "total": "'total'",
+    "state": "c.customer_state",
+    "category": "COALESCE(t.product_category_name_english, 'unknown')",
+}
+
+
+def load_series(freq, by):
+    """Revenue per (series, period) on a dense period grid, zero-filled."""
+    unit, pd_freq, _ = FREQUENCIES[freq]
+
+    con = connect(ordered=False)
+    register_tables(con, "orders", "payments", "customers", "order_items", "products", "category_translation")
+
+    if by == "category":
+        # category revenue is item price; payments cannot be split by item
+        query = f"""
+        SELECT
+            {BREAKDOWNS[by]} AS series,
+            DATE_TRUNC('{unit}', o.order_purchase_timestamp) AS period,
+            SUM(i.price) AS revenue
+        FROM order_items i
+        JOIN orders o
+            ON i.order_id = o.order_id
+        LEFT JOIN products p
+            ON i.product_id = p.product_id
+        LEFT JOIN category_translation t
+            ON p.product_category_name = t.product_category_name
+        WHERE o.order_status = 'delivered'
+        GROUP BY 1, 2;
+        """
+    else:
+        query = f"""
+        SELECT
+            {BREAKDOWNS[by]} AS series,
+            DATE_TRUNC('{unit}', o.order_purchase_timestamp) AS period,
+            SUM(p.payment_value) AS revenue
+        FROM orders o
+        JOIN payments p
+            ON o.order_id = p.order_id
+        JOIN customers c
+            ON o.customer_id = c.customer_id
+        WHERE o.order_status = 'delivered'
+        GROUP BY 1, 2;
+        """
+
+    df = con.execute(query).df()
+    df["period"] = pd.to_datetime(df["period"])
+    grid = pd.date_range(df["period"].min(), df["period"].max(), freq=pd_freq)
+    return (
+        df.pivot_table(index="period", columns="series", values="revenue", aggfunc="sum")
+        .reindex(grid)
+        .fillna(0.0)
+    )
+
+
+def forecast_series(name, values, periods, freq, horizon):
+    _, pd_freq, m = FREQUENCIES[freq]
+    try:
+        forecasts, metrics = backtest(values, m, horizon)
+    except ValueError:
+        return [], []
+
+    future = pd.date_range(periods[-1], periods=horizon + 1, freq=pd_freq)[1:]
+    best = min(MODELS, key=lambda model: metrics[model]["mae"])
+
+    rows = []
+    for model, fc in forecasts.items():
+        for period, point, lower, upper in zip(future, fc["point"], fc["lower"], fc["upper"]):
+            rows.append({
+                "series": name,
+                "period": period,
+                "model": model,
+                "forecast": round(float(point), 2),
+                "lower": round(float(lower), 2),
+                "upper": round(float(upper), 2),
+                "is_best": model == best,
+            })
+
+    metric_rows = [
+        {"series": name, "model": model, **values_, "is_best": model == best}
+        for model, values_ in metrics.items()
+    ]
+    return rows, metric_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtested revenue forecasts")
+    parser.add_argument("--freq", choices=list(FREQUENCIES), default="monthly")
+    parser.add_argument("--by", choices=list(BREAKDOWNS), default="total")
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true", help="ignore cached results")
+    add_connection_args(parser)
+    args = parser.parse_args()
+    apply_connection_args(args)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    stage("load series")
+    series = load_series(args.freq, args.by)
+    print(f"Loaded {series.shape[1]} series x {series.shape[0]} {args.freq} periods")
+
+    digest = hashlib.sha256(
+        pd.util.hash_pandas_object(series, index=True).values.tobytes()
+        + json.dumps({**vars(args), "workers": None, "force": None}, sort_keys=True).encode()
+    ).hexdigest()
+
+    suffix = "" if (args.freq, args.by) == ("monthly", "total") else f"_{args.freq}_{args.by}"
+    forecast_path = os.path.join(OUTPUT_DIR, f"revenue_forecast{suffix}.csv")
+    metrics_path = os.path.join(OUTPUT_DIR, f"forecast_metrics{suffix}.csv")
+
+    cache = {}
+    if os.path.exists(CACHE_PATH):
+        with open(CACHE_PATH) as f:
+            cache = json.load(f)
+    if (
+        not args.force
+        and cache.get(os.path.basename(forecast_path)) == digest
+        and os.path.exists(forecast_path)
+        and os.path.exists(metrics_path)
+    ):
+        print(f"Inputs unchanged, cached forecasts kept at: {forecast_path}")
+        return
+
+    stage("backtest and forecast")
+    periods = series.index
+    names = list(series.columns)
+    columns = [series[name].to_numpy() for name in names]
+
+    if len(names) > 1 and args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(
+                forecast_series, names, columns,
+                [periods] * len(names), [args.freq] * len(names), [args.horizon] * len(names),
+            ))
+    else:
+        results = [
+            forecast_series(name, values, periods, args.freq, args.horizon)
+            for name, values in zip(names, columns)
+        ]
+
+    stage("write outputs")
+    df_forecast = pd.DataFrame([row for rows, _ in results for row in rows])
+    df_metrics = pd.DataFrame([row for _, rows in results for row in rows])
+    if df_metrics.empty:
+        print("No series long enough to backtest")
+        return
+
+    print("\nBacktest Error Metrics (best model per series):")
+    print(df_metrics[df_metrics["is_best"]].head(10))
+
+    df_forecast.to_csv(forecast_path, index=False)
+    df_metrics.to_csv(metrics_path, index=False)
+
+    cache[os.path.basename(forecast_path)] = digest
+    with open(CACHE_PATH, "w") as f:
+        json.dump(cache, f, indent=2)
+
+    print(f"\nForecasts saved at: {forecast_path}")
+    print(f"Error metrics saved at: {metrics_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import pandas as pd
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from warehouse import CONNECTION_ENV, add_connection_args, apply_connection_args, connect, register_tables
+from id_dictionary import load_dictionary, decode_query
+from profiling import stage
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+
+
+# One grouped pass per partition: items are collapsed to (seller, order)
+# so order-level measures (delay, review, cancellation) count each order once,
+# then rolled up to one row per seller.
+SCORECARD_QUERY = """
+WITH order_reviews AS (
+    SELECT
+        order_id,
+        AVG(review_score) AS review_score
+    FROM reviews
+    GROUP BY order_id
+),
+
+seller_orders AS (
+    SELECT
+        i.seller_id,
+        i.order_id,
+        SUM(i.price) AS item_value,
+        ANY_VALUE(o.order_status IN ('canceled', 'unavailable')) AS is_canceled,
+        ANY_VALUE(
+            DATE_DIFF('day', o.order_estimated_delivery_date, o.order_delivered_customer_date)
+        ) AS delivery_delay_days,
+        ANY_VALUE(r.review_score) AS review_score
+    FROM order_items i
+    JOIN orders o
+        ON i.order_id = o.order_id
+    LEFT JOIN order_reviews r
+        ON i.order_id = r.order_id
+    WHERE hash(i.seller_id) % {partitions} = {partition}
+    GROUP BY i.seller_id, i.order_id
+)
+
+SELECT
+    seller_id,
+    ROUND(SUM(item_value) FILTER (WHERE NOT is_canceled), 2) AS gmv,
+    COUNT(*) AS total_orders,
+    ROUND(AVG(delivery_delay_days), 2) AS avg_delivery_delay_days,
+    ROUND(AVG(review_score), 3) AS avg_review_score,
+    ROUND(AVG(is_canceled::INT), 4) AS cancellation_rate
+FROM seller_orders
+GROUP BY seller_id
+"""
+
+
+def score_partition(partition, partitions):
+    """Scorecards for sellers whose id hashes to `partition`."""
+    con = connect(ordered=False)
+    register_tables(con, "orders", "order_items", "reviews")
+    return con.execute(
+        SCORECARD_QUERY.format(partition=partition, partitions=partitions)
+    ).df()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build seller performance scorecards")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="partition sellers by hash across this many worker processes",
+    )
+    add_connection_args(parser)
+    args = parser.parse_args()
+    apply_connection_args(args)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    stage("score sellers")
+    if args.workers > 1:
+        # split the cores between workers instead of giving each one all of them
+        os.environ.setdefault(CONNECTION_ENV["threads"], str(max(1, (os.cpu_count() or 1) // args.workers)))
+        print(f"Scoring sellers across {args.workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            parts = list(pool.map(
+                score_partition,
+                range(args.workers),
+                [args.workers] * args.workers,
+            ))
+    else:
+        print("Scoring sellers...")
+        parts = [score_partition(0, 1)]
+
+    stage("decode and join sellers")
+    con = connect(ordered=False)
+    register_tables(con, "sellers")
+    load_dictionary(con, "seller")
+
+    scores = pd.concat(parts, ignore_index=True)
+    con.register("scores", scores)
+
+    df_scores = con.execute(decode_query("""
+        SELECT
+            s.seller_id,
+            sl.seller_state,
+            sl.seller_city,
+            s.gmv::DOUBLE AS gmv,
+            s.total_orders::INTEGER AS total_orders,
+            s.avg_delivery_delay_days::DOUBLE AS avg_delivery_delay_days,
+            s.avg_review_score::DOUBLE AS avg_review_score,
+            s.cancellation_rate::DOUBLE AS cancellation_rate
+        FROM scores s
+        LEFT JOIN sellers sl
+            ON s.seller_id = sl.seller_id
+    """, {"seller_id": "seller"})).df()
+    df_scores = df_scores.sort_values("gmv", ascending=False)
+
+    print("\nTop Sellers by GMV:")
+    print(df_scores.head())
+
+    stage("write outputs")
+    output_path = os.path.join(OUTPUT_DIR, "seller_scorecards.csv")
+    df_scores.to_csv(output_path, index=False)
+
+    print(f"\nSeller scorecards saved at: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
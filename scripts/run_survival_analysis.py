@@ -0,0 +1,216 @@
+"""
+Time to second purchase: Kaplan-Meier curves and hazard rates.
+
+Each customer's delivered orders are numbered in one window pass sorted by
+purchase time (`LAG` gives the gap to the previous order). A customer whose
+second order exists had the event after that gap; everyone else is censored
+at the days between their first purchase and the dataset end, since they may
+still come back. The curves (see survival.py) are computed overall and per
+stratum of the customer's first order:
+
+    first_category   category of the first order's highest-priced item
+    customer_state   delivery state of the first order
+    payment_type     payment type carrying most of the first order's value
+
+Strata with fewer than `--min-customers` customers are pooled into "other".
+Each dimension is fitted in its own worker process.
+
+    python scripts/run_survival_analysis.py [--workers 4] [--hazard-days 30] [--max-days 365]
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from warehouse import OUTPUT_DIR, add_connection_args, apply_connection_args, connect, register_tables
+from id_dictionary import load_dictionary
+from profiling import stage
+from churn_features import dataset_end_date
+from survival import kaplan_meier, binned_hazard, summarize
+
+
+STRATA = ["overall", "first_category", "customer_state", "payment_type"]
+
+HORIZONS = [30, 90, 180, 365]
+RESTRICT_TO = 365
+
+
+def journeys_query(end_date):
+    """One row per customer: strata of the first order, days observed, whether a second order followed."""
+    return f"""
+WITH customer_orders AS (
+    SELECT
+        c.customer_unique_id,
+        c.customer_state,
+        o.order_id,
+        o.order_purchase_timestamp,
+        LAG(o.order_purchase_timestamp) OVER w AS previous_purchase,
+        ROW_NUMBER() OVER w AS order_number
+    FROM orders o
+    JOIN customers c
+        ON o.customer_id = c.customer_id
+    WHERE o.order_status = 'delivered'
+    WINDOW w AS (
+        PARTITION BY c.customer_unique_id
+        ORDER BY o.order_purchase_timestamp, o.order_id
+    )
+),
+
+journeys AS (
+    SELECT
+        customer_unique_id,
+        ANY_VALUE(order_id) FILTER (WHERE order_number = 1) AS first_order_id,
+        ANY_VALUE(customer_state) FILTER (WHERE order_number = 1) AS customer_state,
+        MIN(order_purchase_timestamp) AS first_purchase,
+        ANY_VALUE(DATE_DIFF('day', previous_purchase, order_purchase_timestamp))
+            FILTER (WHERE order_number = 2) AS gap_days
+    FROM customer_orders
+    WHERE order_number <= 2
+    GROUP BY customer_unique_id
+),
+
+first_items AS (
+    SELECT
+        i.order_id,
+        ARG_MAX(p.product_category_name, i.price) AS product_category_name
+    FROM order_items i
+    JOIN products p
+        ON i.product_id = p.product_id
+    WHERE i.order_id IN (SELECT first_order_id FROM journeys)
+    GROUP BY i.order_id
+),
+
+first_payments AS (
+    SELECT
+        order_id,
+        ARG_MAX(payment_type, payment_value) AS payment_type
+    FROM payments
+    WHERE order_id IN (SELECT first_order_id FROM journeys)
+    GROUP BY order_id
+)
+
+SELECT
+    COALESCE(j.gap_days, DATE_DIFF('day', j.first_purchase, DATE '{end_date}'))::INTEGER AS duration_days,
+    j.gap_days IS NOT NULL AS repeated,
+    COALESCE(t.product_category_name_english, d.id, 'unknown') AS first_category,
+    COALESCE(j.customer_state, 'unknown') AS customer_state,
+    COALESCE(fp.payment_type, 'unknown') AS payment_type
+FROM journeys j
+LEFT JOIN first_items fi
+    ON j.first_order_id = fi.order_id
+LEFT JOIN dict_category d
+    ON fi.product_category_name = d.key
+LEFT JOIN category_translation t
+    ON fi.product_category_name = t.product_category_name
+LEFT JOIN first_payments fp
+    ON j.first_order_id = fp.order_id
+"""
+
+
+def strata_labels(labels, min_customers):
+    """Labels with strata smaller than `min_customers` pooled into "other"."""
+    sizes = labels.value_counts()
+    return labels.where(labels.map(sizes) >= min_customers, "other")
+
+
+def fit_dimension(dimension, labels, durations, events, max_days, hazard_days):
+    """Curve, hazard and summary frames for every stratum of one dimension."""
+    codes, names = pd.factorize(labels, sort=True)
+    curves = kaplan_meier(codes, durations, events, len(names), max_days)
+
+    # curve rows only where something happened (plus day 0), enough to draw the steps
+    active = curves["events"] + curves["censored"] > 0
+    active[:, 0] = True
+    stratum, day = np.nonzero(active)
+    df_curves = pd.DataFrame({
+        "dimension": dimension,
+        "stratum": names[stratum],
+        "day": day,
+        **{name: curves[name][stratum, day] for name in ("at_risk", "events", "censored")},
+        **{name: curves[name][stratum, day].round(6) for name in ("survival", "ci_lower", "ci_upper")},
+    })
+
+    starts, events_binned, person_days, hazard = binned_hazard(curves, hazard_days)
+    df_hazard = pd.DataFrame({
+        "dimension": dimension,
+        "stratum": np.repeat(names, len(starts)),
+        "period_start_day": np.tile(starts, len(names)),
+        "events": events_binned.ravel(),
+        "person_days": person_days.ravel().round(1),
+        f"hazard_per_{hazard_days}d": hazard.ravel().round(6),
+    })
+
+    at, median, rmst = summarize(curves, HORIZONS, RESTRICT_TO)
+    df_summary = pd.DataFrame({
+        "dimension": dimension,
+        "stratum": names,
+        "customers": np.bincount(codes, minlength=len(names)),
+        "repeaters": np.bincount(codes[events], minlength=len(names)),
+        **{f"repeat_by_day_{h}": (1 - at[h]).round(6) for h in HORIZONS},
+        "median_days": median,
+        f"mean_days_without_repeat_{RESTRICT_TO}": rmst.round(2),
+    })
+    return df_curves, df_hazard, df_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kaplan-Meier analysis of time to second purchase")
+    parser.add_argument("--workers", type=int, default=1, help="fit strata dimensions in this many processes")
+    parser.add_argument("--min-customers", type=int, default=200,
+                        help="strata smaller than this are pooled into 'other'")
+    parser.add_argument("--hazard-days", type=int, default=30, help="width of the hazard rate periods")
+    parser.add_argument("--max-days", type=int, help="truncate follow-up at this many days (default: all)")
+    add_connection_args(parser)
+    args = parser.parse_args()
+    apply_connection_args(args)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    stage("load tables")
+    con = connect(ordered=False)
+    register_tables(con, "orders", "customers", "order_items", "products", "payments", "category_translation")
+    load_dictionary(con, "category")
+
+    stage("customer journeys")
+    end_date = dataset_end_date(con)
+    journeys = con.execute(journeys_query(end_date)).df()
+    con.close()
+
+    durations = journeys["duration_days"].to_numpy()
+    max_days = args.max_days if args.max_days is not None else int(durations.max())
+    # a second purchase after the follow-up window is censored at its end
+    events = journeys["repeated"].to_numpy(dtype=bool) & (durations <= max_days)
+    print(f"{len(journeys):,} customers, {events.sum():,} with a second purchase "
+          f"(dataset end {end_date}, follow-up up to {max_days} days)")
+
+    stage("kaplan-meier by stratum")
+    labels = [
+        pd.Series("all", index=journeys.index) if dimension == "overall"
+        else strata_labels(journeys[dimension], args.min_customers)
+        for dimension in STRATA
+    ]
+    n = len(STRATA)
+    fit_args = (STRATA, labels, [durations] * n, [events] * n, [max_days] * n, [args.hazard_days] * n)
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, n)) as pool:
+            results = list(pool.map(fit_dimension, *fit_args))
+    else:
+        results = list(map(fit_dimension, *fit_args))
+
+    df_curves, df_hazard, df_summary = (pd.concat(parts, ignore_index=True) for parts in zip(*results))
+
+    print("\nTime to Second Purchase (overall):")
+    print(df_summary[df_summary["dimension"] == "overall"].T)
+
+    stage("write outputs")
+    for name, df in [("survival_curves", df_curves), ("survival_hazard", df_hazard), ("survival_summary", df_summary)]:
+        output_path = os.path.join(OUTPUT_DIR, f"{name}.csv")
+        df.to_csv(output_path, index=False)
+        print(f"{name}: {len(df):,} rows saved at {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,277 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from profiling import stage
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 FIG_DIR = os.path.join(OUTPUT_DIR, "figures")
+MANIFEST_PATH = os.path.join(FIG_DIR, ".render_manifest.json")
+
+FORMATS = ["png", "svg", "webp"]
+
+# figure name -> input CSVs whose contents decide whether it must be redrawn
+FIGURE_INPUTS = {
+    "01_monthly_revenue": ["monthly_revenue.csv"],
+    "02_order_frequency": ["churn_features_v2.csv"],
+    "03_retention_breakdown": ["retention_metrics.csv"],
+    "04_churn_feature_comparison": ["churn_features_v2.csv"],
+    "05_logistic_coefficients": ["logistic_regression_coefficients_v2.csv"],
+    "06_ab_test_conversion": ["ab_test_second_purchase_results.csv"],
+}
+
+BOX_FEATURES = ["total_orders", "total_revenue", "avg_order_value"]
+
+
+# ----------------------------------------------------------------------------
+# Data preparation (main process): reduce each input to what the plot needs
+# ----------------------------------------------------------------------------
+def box_stats(values, label):
+    """Tukey box-plot statistics in the format matplotlib's `bxp` expects."""
+    values = np.sort(values[~np.isnan(values)])
+    if len(values) == 0:
+        # e.g. no churned customers yet: an empty box (bxp draws nothing) instead of an IndexError
+        return {"label": label, "q1": np.nan, "med": np.nan, "q3": np.nan,
+                "whislo": np.nan, "whishi": np.nan, "fliers": values}
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    lo = values[np.searchsorted(values, q1 - 1.5 * iqr, side="left")]
+    hi = values[np.searchsorted(values, q3 + 1.5 * iqr, side="right") - 1]
+    fliers = values[(values < lo) | (values > hi)]
+    return {
+        "label": label,
+        "q1": q1,
+        "med": med,
+        "q3": q3,
+        "whislo": lo,
+        "whishi": hi,
+        "fliers": fliers,
+    }
+
+
+def monthly_revenue_payload(read):
+    rev = read("monthly_revenue.csv")
+    return {
+        "month": rev["month"].tolist(),
+        "revenue": rev["revenue"].to_numpy(),
+    }
+
+
+def order_frequency_payload(read):
+    orders = read("churn_features_v2.csv")["total_orders"].to_numpy(dtype=np.int64)
+    counts = np.bincount(orders)
+    present = np.nonzero(counts)[0]
+    return {
+        "orders": present,
+        "customers": counts[present],
+    }
+
+
+def retention_breakdown_payload(read):
+    ret = read("retention_metrics.csv")
+    return {
+        "repeat_rate": float(ret["repeat_purchase_rate"].iloc[0]),
+    }
+
+
+def churn_feature_comparison_payload(read):
+    churn = read("churn_features_v2.csv")
+    churned = churn["is_churned"].to_numpy() == 1
+    return {
+        "stats": {
+            f: [
+                box_stats(churn[f].to_numpy(dtype=float)[~churned], "0"),
+                box_stats(churn[f].to_numpy(dtype=float)[churned], "1"),
+            ]
+            for f in BOX_FEATURES
+        },
+    }
+
+
+def logistic_coefficients_payload(read):
+    coef = read("logistic_regression_coefficients_v2.csv")
+    return {
+        "feature": coef["feature"].tolist(),
+        "coefficient": coef["coefficient"].to_numpy(),
+    }
+
+
+def ab_test_conversion_payload(read):
+    ab = read("ab_test_second_purchase_results.csv")
+    return {
+        "group": ab["group"].tolist(),
+        "conversion_rate": ab["conversion_rate"].to_numpy(),
+    }
+
+
+PAYLOADS = {
+    "01_monthly_revenue": monthly_revenue_payload,
+    "02_order_frequency": order_frequency_payload,
+    "03_retention_breakdown": retention_breakdown_payload,
+    "04_churn_feature_comparison": churn_feature_comparison_payload,
+    "05_logistic_coefficients": logistic_coefficients_payload,
+    "06_ab_test_conversion": ab_test_conversion_payload,
+}
+
+
+def prepare_payloads(names):
+    """Payloads of the figures in `names`; each input CSV is read at most once."""
+    frames = {}
+
+    def read(name):
+        if name not in frames:
+            frames[name] = pd.read_csv(os.path.join(OUTPUT_DIR, name))
+        return frames[name]
+
+    return {name: PAYLOADS[name](read) for name in names}
+
+
+def input_hash(name, fmt, dpi):
+    h = hashlib.sha256(f"{name}|{fmt}|{dpi}".encode())
+    for csv_name in FIGURE_INPUTS[name]:
+        with open(os.path.join(OUTPUT_DIR, csv_name), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+# ----------------------------------------------------------------------------
+# Rendering (worker processes)
+# ----------------------------------------------------------------------------
+def plot_monthly_revenue(plt, sns, p):
+    plt.figure(figsize=(10, 5))
+    plt.plot(p["month"], p["revenue"], marker="o")
+    plt.title("Monthly Revenue Trend")
+    plt.xlabel("Month")
+    plt.ylabel("Revenue")
+    plt.xticks(rotation=45)
+
+
+def plot_order_frequency(plt, sns, p):
+    plt.figure(figsize=(8, 5))
+    sns.barplot(x=p["orders"], y=p["customers"], color=sns.color_palette()[0])
+    plt.title("Order Frequency Distribution")
+    plt.xlabel("Number of Orders")
+    plt.ylabel("Number of Customers")
+    plt.yscale("log")
+
+
+def plot_retention_breakdown(plt, sns, p):
+    repeat_rate = p["repeat_rate"]
+    labels = ["One-time Customers", "Repeat Customers"]
+    values = [(1 - repeat_rate) * 100, repeat_rate * 100]
+
+    plt.figure(figsize=(7, 5))
+    sns.barplot(x=labels, y=values)
+    plt.title("Customer Retention Breakdown")
+    plt.ylabel("Percentage of Customers (%)")
+    plt.ylim(0, 100)
+
+    for i, v in enumerate(values):
+        plt.text(i, v + 1, f"{v:.1f}%", ha="center")
+
+
+def plot_churn_feature_comparison(plt, sns, p):
+    palette = sns.color_palette()
+    fig, axes = plt.subplots(1, len(p["stats"]), figsize=(12, 4))
+    for ax, (feature, stats) in zip(axes, p["stats"].items()):
+        boxes = ax.bxp(stats, patch_artist=True, flierprops={"marker": "d", "markersize": 3})
+        for patch, color in zip(boxes["boxes"], palette):
+            patch.set_facecolor(color)
+        ax.set_xlabel("is_churned")
+        ax.set_title(feature)
+
+
+def plot_logistic_coefficients(plt, sns, p):
+    plt.figure(figsize=(8, 5))
+    sns.barplot(x=p["coefficient"], y=p["feature"])
+    plt.title("Logistic Regression Coefficients")
+
+
+def plot_ab_test_conversion(plt, sns, p):
+    plt.figure(figsize=(6, 5))
+    sns.barplot(x=p["group"], y=p["conversion_rate"])
+    plt.title("A/B Test: Second Purchase Conversion")
+    plt.ylabel("Conversion Rate")
+
+
+RENDERERS = {
+    "01_monthly_revenue": plot_monthly_revenue,
+    "02_order_frequency": plot_order_frequency,
+    "03_retention_breakdown": plot_retention_breakdown,
+    "04_churn_feature_comparison": plot_churn_feature_comparison,
+    "05_logistic_coefficients": plot_logistic_coefficients,
+    "06_ab_test_conversion": plot_ab_test_conversion,
+}
+
+
+def render(name, payload, path, dpi):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set(style="whitegrid")
+    RENDERERS[name](plt, sns, payload)
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi)
+    plt.close("all")
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render pipeline figures")
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true", help="redraw even if inputs are unchanged")
+    args = parser.parse_args()
+
+    os.makedirs(FIG_DIR, exist_ok=True)
+
+    manifest = {}
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+
+    stage("hash inputs")
+    todo = {}
+    for name in RENDERERS:
+        path = os.path.join(FIG_DIR, f"{name}.{args.format}")
+        digest = input_hash(name, args.format, args.dpi)
+        if not args.force and manifest.get(os.path.basename(path)) == digest and os.path.exists(path):
+            print(f"Unchanged, skipping {os.path.basename(path)}")
+            continue
+        todo[name] = (path, digest)
+
+    if todo:
+        stage("prepare payloads")
+        payloads = prepare_payloads(todo)
+        stage("render")
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(todo))) as pool:
+            futures = [
+                pool.submit(render, name, payloads[name], path, args.dpi)
+                for name, (path, _) in todo.items()
+            ]
+            for future in futures:
+                name = future.result()
+                path, digest = todo[name]
+                manifest[os.path.basename(path)] = digest
+                print(f"Rendered {os.path.basename(path)}")
+
+        with open(MANIFEST_PATH + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(MANIFEST_PATH + ".tmp", MANIFEST_PATH)
+
+    print(f"All visualizations generated in output/figures/ ({args.format}, {args.dpi} dpi)")
+
 
-os.makedirs(FIG_DIR, exist_ok=True)
-sns.set(style="whitegrid")
-
-
-rev = pd.read_csv(os.path.join(OUTPUT_DIR, "monthly_revenue.csv"))
-plt.figure(figsize=(10, 5))
-plt.plot(rev["month"], rev["revenue"], marker="o")
-plt.title("Monthly Revenue Trend")
-plt.xlabel("Month")
-plt.ylabel("Revenue")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.savefig(os.path.join(FIG_DIR, "01_monthly_revenue.png"))
-plt.close()
-
-
-churn = pd.read_csv(os.path.join(OUTPUT_DIR, "churn_features_v2.csv"))
-plt.figure(figsize=(8, 5))
-sns.countplot(x="total_orders", data=churn)
-plt.title("Order Frequency Distribution")
-plt.xlabel("Number of Orders")
-plt.ylabel("Number of Customers")
-plt.yscale("log")
-plt.tight_layout()
-plt.savefig(os.path.join(FIG_DIR, "02_order_frequency.png"))
-plt.close()
-
-
-ret = pd.read_csv(os.path.join(OUTPUT_DIR, "retention_metrics.csv"))
-repeat_rate = ret["repeat_purchase_rate"].iloc[0]
-one_time_rate = 1 - repeat_rate
-
-labels = ["One-time Customers", "Repeat Customers"]
-values = [one_time_rate * 100, repeat_rate * 100]
-
-plt.figure(figsize=(7, 5))
-sns.barplot(x=labels, y=values)
-plt.title("Customer Retention Breakdown")
-plt.ylabel("Percentage of Customers (%)")
-plt.ylim(0, 100)
-
-for i, v in enumerate(values):
-    plt.text(i, v + 1, f"{v:.1f}%", ha="center")
-
-plt.tight_layout()
-plt.savefig(os.path.join(FIG_DIR, "03_retention_breakdown.png"))
-plt.close()
-
-
-features = ["total_orders", "total_revenue", "avg_order_value"]
-plt.figure(figsize=(12, 4))
-for i, f in enumerate(features, 1):
-    plt.subplot(1, 3, i)
-    sns.boxplot(x="is_churned", y=f, data=churn)
-    plt.title(f)
-plt.tight_layout()
-plt.savefig(os.path.join(FIG_DIR, "04_churn_feature_comparison.png"))
-plt.close()
-
-
-coef = pd.read_csv(os.path.join(OUTPUT_DIR, "logistic_regression_coefficients_v2.csv"))
-plt.figure(figsize=(8, 5))
-sns.barplot(x="coefficient", y="feature", data=coef)
-plt.title("Logistic Regression Coefficients")
-plt.tight_layout()
-plt.savefig(os.path.join(FIG_DIR, "05_logistic_coefficients.png"))
-plt.close()
-
-
-ab = pd.read_csv(os.path.join(OUTPUT_DIR, "ab_test_second_purchase_results.csv"))
-plt.figure(figsize=(6, 5))
-sns.barplot(x="group", y="conversion_rate", data=ab)
-plt.title("A/B Test: Second Purchase Conversion")
-plt.ylabel("Conversion Rate")
-plt.tight_layout()
-plt.savefig(os.path.join(FIG_DIR, "06_ab_test_conversion.png"))
-plt.close()
-
-print("All visualizations generated in output/figures/")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Long-running watcher that keeps output/ fresh as raw files land in data/raw.
+
+A poller thread compares data/raw against the ingest manifest every
+--interval seconds. A batch is only handed on once every changed file has
+kept the same size and mtime for --debounce seconds, so a CSV still being
+copied in is never read half-written. Batches go through a bounded queue to a
+single worker; when the worker falls behind, the poller blocks instead of
+piling up work, and further changes are picked up by its next scan.
+
+For each batch the worker:
+
+1. ingests only the new or changed raw files (run_ingest.ingest)
+2. collects the orders and customers those files touch, both before and after
+   the ingest, so rows that moved or disappeared are covered too
+3. recomputes monthly revenue for the touched months and churn features for
+   the touched customers, merging them into the existing CSVs; retention is
+   re-derived from the churn table
+4. refreshes the dashboard snapshot, which rebuilds only the tables whose
+   CSVs changed; running dashboards see the new per-source stamps and
+   reconvert only those tables
+
+Usage:
+
+    python scripts/run_watcher.py [--interval 5] [--debounce 10] [--once]
+"""
+
+import argparse
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from warehouse import OUTPUT_DIR, add_connection_args, apply_connection_args, connect, processed_parts, register_tables
+from id_dictionary import load_dictionary, decode_query
+from run_ingest import scan_changes, ingest, part_files, file_signature, save_manifest
+from churn_features import (
+    base_features_query, delivery_review_query, dataset_end_date, FEATURES_QUERY,
+    SKETCH_FEATURES, sketch_segments,
+)
+from quantile_sketch import sketch_table
+from rollups import monthly_revenue_query, daily_revenue_query, customer_sketches, retention_metrics
+from dashboard_snapshot import load_snapshot
+from profiling import begin, stage, write_report
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+REVENUE_PATH = os.path.join(OUTPUT_DIR, "monthly_revenue.csv")
+DAILY_REVENUE_PATH = os.path.join(OUTPUT_DIR, "daily_revenue.csv")
+SKETCHES_PATH = os.path.join(OUTPUT_DIR, "customer_sketches.parquet")
+RETENTION_PATH = os.path.join(OUTPUT_DIR, "retention_metrics.csv")
+CHURN_PATH = os.path.join(OUTPUT_DIR, "churn_features_v2.csv")
+CHURN_SKETCHES_PATH = os.path.join(OUTPUT_DIR, "churn_sketches.parquet")
+
+# tables the incremental outputs read, and the key that locates a change in them
+DELTA_KEYS = {
+    "orders": "order_id",
+    "payments": "order_id",
+    "order_items": "order_id",
+    "reviews": "order_id",
+    "customers": "customer_id",
+}
+
+# stages without an incremental path -> inputs that make them stale;
+# "churn_features" stands for churn_features_v2.csv
+FULL_STAGES = {
+    "run_category_analytics.py": {"orders", "order_items", "products", "category_translation"},
+    "run_seller_scorecards.py": {"orders", "order_items", "reviews", "sellers"},
+    "run_market_basket.py": {"orders", "order_items", "products", "category_translation"},
+    "run_survival_analysis.py": {"orders", "customers", "order_items", "products", "payments", "category_translation"},
+    "run_geo_analysis.py": {"geolocation", "customers", "sellers", "orders", "order_items", "payments"},
+    "run_revenue_forecast.py": {"orders", "payments"},
+    "run_churn_statistical_tests.py": {"churn_features"},
+    "run_ab_test_retention.py": {"churn_features"},
+    "run_churn_logistic_regression_v2.py": {"churn_features"},
+    "run_churn_gradient_boosting.py": {"churn_features", "customers", "order_items", "products", "category_translation"},
+    # after the regression, so they use the refitted model
+    "profile_store.py": {"churn_features"},
+    "threshold_curves.py": {"churn_features"},
+}
+
+
+def log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+def write_csv(df, path):
+    """Atomic replace, so the dashboard never reads a half-written CSV."""
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def write_parquet(df, path):
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------------------------
+# Polling
+# ----------------------------------------------------------------------------
+class Poller(threading.Thread):
+    """Emits (pending, removed) batches once data/raw has been quiet long enough."""
+
+    def __init__(self, batches, interval, debounce, stop):
+        super().__init__(daemon=True)
+        self.batches = batches
+        self.interval = interval
+        self.debounce = debounce
+        self.stop = stop
+        self._seen = {}      # path -> (signature, monotonic time it was first seen)
+        self._emitted = {}   # path -> signature already queued (None for removals)
+        self._lock = threading.Lock()
+
+    def forget(self, pending, removed):
+        """Called once a batch is done; a failed batch is then picked up again."""
+        with self._lock:
+            for paths in pending.values():
+                for path in paths:
+                    self._emitted.pop(path, None)
+            for key in removed:
+                self._emitted.pop(key, None)
+
+    def poll(self):
+        pending, removed = scan_changes()
+        now = time.monotonic()
+
+        changes = {}
+        for paths in pending.values():
+            for path in paths:
+                changes[path] = file_signature(path)
+        for key in removed:
+            changes[key] = None
+
+        with self._lock:
+            changes = {p: sig for p, sig in changes.items() if self._emitted.get(p, False) != sig}
+        self._seen = {
+            p: self._seen[p] if p in self._seen and self._seen[p][0] == sig else (sig, now)
+            for p, sig in changes.items()
+        }
+        if not changes:
+            return None
+        if any(now - since < self.debounce for _, since in self._seen.values()):
+            return None
+
+        batch_pending = {
+            table: [p for p in paths if p in changes]
+            for table, paths in pending.items()
+        }
+        batch_pending = {table: paths for table, paths in batch_pending.items() if paths}
+        batch_removed = {key: table for key, table in removed.items() if key in changes}
+        with self._lock:
+            self._emitted.update(changes)
+        self._seen = {}
+        return batch_pending, batch_removed
+
+    def run(self):
+        while not self.stop.is_set():
+            try:
+                batch = self.poll()
+            except OSError as e:
+                # a file vanished mid-scan; the next scan sees a consistent state
+                log(f"Scan skipped: {e}")
+                batch = None
+            if batch is not None:
+                # blocks while the queue is full: back-pressure on a slow worker
+                self.batches.put(batch)
+            self.stop.wait(self.interval)
+
+
+# ----------------------------------------------------------------------------
+# Incremental refresh
+# ----------------------------------------------------------------------------
+def delta_parts(pending, removed):
+    """
+    table -> processed parts currently holding the batch's raw files. Taken
+    before ingest it lists the parts being replaced or deleted, after ingest
+    the parts just written.
+    """
+    parts = {}
+    for table, paths in pending.items():
+        for path in paths:
+            parts.setdefault(table, []).extend(part_files(table, path))
+    for key, table in removed.items():
+        parts.setdefault(table, []).extend(part_files(table, key))
+    return parts
+
+
+def collect_touched(con, parts):
+    """Add the keys found in the existing `parts` to touched_orders / touched_customers."""
+    for table, paths in parts.items():
+        if table not in DELTA_KEYS or not paths:
+            continue
+        target = "touched_customers" if table == "customers" else "touched_orders"
+        con.execute(f"""
+            INSERT INTO {target}
+            SELECT DISTINCT {DELTA_KEYS[table]} FROM read_parquet({paths!r}, hive_partitioning = false);
+        """)
+
+
+def collect_affected(con):
+    """Resolve touched keys to months and customers through the current tables."""
+    con.execute("""
+        INSERT INTO affected_months
+        SELECT DISTINCT DATE_TRUNC('month', order_purchase_timestamp)
+        FROM orders
+        WHERE order_id IN (SELECT order_id FROM touched_orders);
+    """)
+    con.execute("""
+        INSERT INTO affected_customers
+        SELECT c.customer_unique_id
+        FROM orders o
+        JOIN customers c
+            ON o.customer_id = c.customer_id
+        WHERE o.order_id IN (SELECT order_id FROM touched_orders)
+        UNION
+        SELECT customer_unique_id
+        FROM customers
+        WHERE customer_id IN (SELECT customer_id FROM touched_customers);
+    """)
+    # a changed customer row (e.g. state) changes the sketches of its orders' months
+    con.execute("""
+        INSERT INTO affected_months
+        SELECT DISTINCT DATE_TRUNC('month', order_purchase_timestamp)
+        FROM orders
+        WHERE customer_id IN (SELECT customer_id FROM touched_customers);
+    """)
+    # a customer's first order may move to another month; both months'
+    # new-customer counts in the daily rollup change
+    con.execute("""
+        INSERT INTO affected_months
+        SELECT DISTINCT DATE_TRUNC('month', MIN(o.order_purchase_timestamp))
+        FROM orders o
+        JOIN customers c
+            ON o.customer_id = c.customer_id
+        WHERE o.order_status = 'delivered'
+            AND c.customer_unique_id IN (SELECT customer_unique_id FROM affected_customers)
+        GROUP BY c.customer_unique_id;
+    """)
+
+
+def refresh_revenue(con, full):
+    if full:
+        df = con.execute(monthly_revenue_query()).df()
+        daily = con.execute(daily_revenue_query()).df()
+        sketches = customer_sketches(con)
+    else:
+        months = con.execute("SELECT DISTINCT month FROM affected_months;").df()["month"]
+        if months.empty:
+            return False
+        # literal partition values, so only the affected month directories are read
+        where = " OR ".join(f"(o.year = {m.year} AND o.month = {m.month})" for m in months)
+        fresh = con.execute(monthly_revenue_query(where)).df()
+        old = pd.read_csv(REVENUE_PATH, parse_dates=["month"])
+        old = old[~old["month"].isin(months)]
+        df = pd.concat([old, fresh], ignore_index=True).sort_values("month")
+
+        fresh_daily = con.execute(daily_revenue_query(where)).df()
+        old_daily = pd.read_csv(DAILY_REVENUE_PATH, parse_dates=["day"])
+        old_daily = old_daily[~old_daily["day"].dt.to_period("M").dt.to_timestamp().isin(months)]
+        daily = pd.concat([old_daily, fresh_daily], ignore_index=True).sort_values("day")
+
+        # sketches cannot forget a customer, so affected months are rebuilt, not merged
+        fresh_sketches = customer_sketches(con, where)
+        old_sketches = pd.read_parquet(SKETCHES_PATH)
+        old_sketches = old_sketches[~old_sketches["period"].dt.to_period("M").dt.to_timestamp().isin(months)]
+        sketches = pd.concat([old_sketches, fresh_sketches], ignore_index=True).sort_values(["grain", "period"])
+        log(f"Monthly and daily revenue: recomputed {len(months)} month(s)")
+
+    write_csv(df, REVENUE_PATH)
+    write_csv(daily, DAILY_REVENUE_PATH)
+    write_parquet(sketches, SKETCHES_PATH)
+    return True
+
+
+def refresh_churn(con, full):
+    end_date = dataset_end_date(con)
+    where = "TRUE" if full else (
+        "c.customer_unique_id IN (SELECT customer_unique_id FROM affected_customers)"
+    )
+    if not full:
+        affected = con.execute(decode_query(
+            "SELECT DISTINCT customer_unique_id FROM affected_customers",
+            {"customer_unique_id": "customer_unique"},
+        )).df()["customer_unique_id"]
+        if affected.empty:
+            return False
+
+    con.execute(f"CREATE OR REPLACE TEMP TABLE base_features AS {base_features_query(end_date, where)}")
+    con.execute(f"CREATE OR REPLACE TEMP TABLE delivery_features AS {delivery_review_query(where)}")
+    fresh = con.execute(decode_query(
+        FEATURES_QUERY, {"customer_unique_id": "customer_unique"}
+    )).df()
+
+    if full:
+        df = fresh
+    else:
+        old = pd.read_csv(CHURN_PATH, parse_dates=["first_order_date", "last_order_date"])
+        old = old[~old["customer_unique_id"].isin(affected)]
+        # the end date moves with new orders; recency of untouched customers
+        # follows from last_order_date without rescanning their orders
+        old["days_since_last_order"] = (pd.Timestamp(end_date) - old["last_order_date"]).dt.days
+        old["is_churned"] = (old["days_since_last_order"] > 90).astype(int)
+        df = pd.concat([old, fresh], ignore_index=True)
+        log(f"Churn features: recomputed {len(affected):,} customer(s), end date {end_date}")
+
+    write_csv(df, CHURN_PATH)
+    write_csv(retention_metrics(df), RETENTION_PATH)
+    # rebuilt from the merged table: a moving end date can flip any
+    # customer's churn status, so old segment sketches cannot be reused
+    write_parquet(sketch_table(df, SKETCH_FEATURES, sketch_segments(df)), CHURN_SKETCHES_PATH)
+    return True
+
+
+def process_batch(pending, removed, full_stages=False):
+    # one profile report per batch when OLIST_PROFILE is set
+    begin("run_watcher")
+    con = connect(ordered=False)
+    names = [os.path.basename(p) for paths in pending.values() for p in paths] + list(removed)
+    log(f"Batch: {', '.join(names)}")
+
+    parts = delta_parts(pending, removed)
+    changed_tables = set(pending) | set(removed.values())
+    # first run, or an output was deleted: fall back to a full recompute
+    full = (
+        not all(processed_parts(t) for t in DELTA_KEYS)
+        or not os.path.exists(REVENUE_PATH)
+        or not os.path.exists(DAILY_REVENUE_PATH)
+        or not os.path.exists(SKETCHES_PATH)
+        or not os.path.exists(CHURN_PATH)
+    )
+
+    con.execute("CREATE TEMP TABLE touched_orders (order_id BIGINT);")
+    con.execute("CREATE TEMP TABLE touched_customers (customer_id BIGINT);")
+    con.execute("CREATE TEMP TABLE affected_months (month TIMESTAMP);")
+    con.execute("CREATE TEMP TABLE affected_customers (customer_unique_id BIGINT);")
+
+    if not full:
+        stage("collect touched (before ingest)")
+        register_tables(con, *DELTA_KEYS)
+        collect_touched(con, parts)
+        collect_affected(con)
+
+    stage("ingest")
+    # the manifest is saved last, so a batch whose outputs fail is retried
+    manifest = ingest(con, pending, removed, log=log, save=False)
+
+    refreshed = set()
+    if not all(processed_parts(t) for t in DELTA_KEYS):
+        log(f"Waiting for raw files of: {', '.join(t for t in DELTA_KEYS if not processed_parts(t))}")
+    elif changed_tables & set(DELTA_KEYS):
+        register_tables(con, *DELTA_KEYS)
+        load_dictionary(con, "customer_unique")
+        if not full:
+            stage("collect touched (after ingest)")
+            con.execute("DELETE FROM touched_orders;")
+            con.execute("DELETE FROM touched_customers;")
+            collect_touched(con, delta_parts(pending, removed))
+            collect_affected(con)
+
+        stage("refresh monthly revenue")
+        if refresh_revenue(con, full):
+            refreshed.update({"monthly_revenue", "daily_revenue", "customer_sketches"})
+        stage("refresh churn features")
+        if refresh_churn(con, full):
+            refreshed.update({"churn_features", "retention_metrics", "churn_sketches"})
+
+    stale = [
+        script for script, inputs in FULL_STAGES.items()
+        if inputs & (changed_tables | refreshed)
+    ]
+    stage("full stages")
+    for script in stale:
+        if not full_stages:
+            log(f"Stale: {script} (pass --full-stages to rerun it)")
+            continue
+        log(f"Running {script}")
+        subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, script)], check=True)
+
+    if refreshed or (full_stages and stale):
+        stage("dashboard snapshot")
+        load_snapshot()
+        log(f"Dashboard snapshot refreshed: {', '.join(sorted(refreshed)) or 'full stages'}")
+    save_manifest(manifest)
+    con.close()
+    write_report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep pipeline outputs fresh as raw files land")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between scans of data/raw")
+    parser.add_argument("--debounce", type=float, default=10.0,
+                        help="seconds a changed file must stay unchanged before it is ingested")
+    parser.add_argument("--queue-size", type=int, default=4, help="batches waiting before the poller blocks")
+    parser.add_argument("--full-stages", action="store_true",
+                        help="also rerun stages without an incremental path when their inputs change")
+    parser.add_argument("--once", action="store_true", help="process current changes and exit")
+    add_connection_args(parser)
+    args = parser.parse_args()
+    apply_connection_args(args)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    if args.once:
+        pending, removed = scan_changes()
+        if pending or removed:
+            process_batch(pending, removed, args.full_stages)
+        else:
+            log("No new or changed raw files")
+        return
+
+    batches = queue.Queue(maxsize=args.queue_size)
+    stop = threading.Event()
+    poller = Poller(batches, args.interval, args.debounce, stop)
+    poller.start()
+    log(f"Watching for raw file changes every {args.interval:g}s (debounce {args.debounce:g}s)")
+
+    try:
+        while True:
+            try:
+                pending, removed = batches.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                process_batch(pending, removed, args.full_stages)
+            except Exception as e:
+                # keep watching; the files stay out of the manifest and are retried
+                log(f"Batch failed: {e}")
+            finally:
+                poller.forget(pending, removed)
+                batches.task_done()
+    except KeyboardInterrupt:
+        stop.set()
+        log("Watcher stopped")
+
+
+if __name__ == "__main__":
+    main()
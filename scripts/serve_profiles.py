@@ -0,0 +1,261 @@
+"""
+Churn score and customer profile lookups over HTTP, for the CRM.
+
+A small asyncio HTTP/1.1 server (standard library only) in front of the
+memory-mapped profile store (profile_store.py). Connections are kept alive,
+so a client pays the TCP handshake once; a lookup is then a binary search in
+the mapped id array and a row read, well under a millisecond.
+
+    python scripts/profile_store.py      # publish a store version first
+    python scripts/serve_profiles.py [--host 127.0.0.1] [--port 8765]
+
+    GET  /customers/<customer_unique_id>   one profile (404 if unknown)
+    POST /customers                        {"ids": [...]} -> {"profiles": [...], "missing": [...]}
+    GET  /health                           published version and customer count
+    GET  /metrics                          request latency histograms per endpoint
+
+Profiles hold every feature of churn_features_v2.csv plus `churn_probability`
+from the fitted logistic model. The server checks the store's CURRENT pointer
+every `--reload-interval` seconds and switches to a newly published version
+between requests; requests in flight finish on the version they started with.
+Latency is measured from a parsed request to its response being queued, so it
+excludes the network. Unparseable requests get a 400 (431 for a header line
+over 64 KiB) and failures inside a handler a 500; both are counted under
+`error` in /metrics. It binds to localhost unless --host says otherwise.
+
+    python scripts/bench_profile_service.py   # end-to-end check on localhost
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from urllib.parse import unquote
+
+from profile_store import STORE_DIR, ProfileStore, current_version
+from serving_metrics import LatencyHistogram
+
+
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH = 10_000
+
+ENDPOINTS = ["profile", "batch", "health", "metrics", "error"]
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+def log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+class ProfileServer:
+    def __init__(self, store_dir=STORE_DIR, reload_interval=1.0, max_batch=MAX_BATCH):
+        self.store_dir = store_dir
+        self.store = ProfileStore.open(store_dir)
+        self.reload_interval = reload_interval
+        self.max_batch = max_batch
+        self.histograms = {name: LatencyHistogram() for name in ENDPOINTS}
+        self.reloads = 0
+        self.started_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Store reload
+    # ------------------------------------------------------------------
+    def reload(self):
+        """Switch to the published version if it changed; True when switched."""
+        version = current_version(self.store_dir)
+        if version is None or version == self.store.version:
+            return False
+        try:
+            store = ProfileStore(os.path.join(self.store_dir, version))
+        except (OSError, ValueError) as e:
+            # pruned or half-visible version: keep serving the current one
+            log(f"Could not open store {version}: {e}")
+            return False
+        self.store = store
+        self.reloads += 1
+        log(f"Reloaded profile store {version} ({len(store):,} customers)")
+        return True
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            self.reload()
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+    def route(self, method, path, body):
+        """(endpoint, status, payload) for one request."""
+        store = self.store
+        if path.startswith("/customers/"):
+            if method != "GET":
+                return "error", 405, {"error": "use GET"}
+            customer_id = unquote(path[len("/customers/"):])
+            profile = store.get(customer_id)
+            if profile is None:
+                return "profile", 404, {"error": "unknown customer_unique_id", "customer_unique_id": customer_id}
+            return "profile", 200, profile
+
+        if path == "/customers":
+            if method != "POST":
+                return "error", 405, {"error": "use POST with {\"ids\": [...]}"}
+            try:
+                ids = json.loads(body)["ids"]
+            except (ValueError, KeyError, TypeError):
+                return "error", 400, {"error": "body must be JSON {\"ids\": [...]}"}
+            if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+                return "error", 400, {"error": "ids must be a list of strings"}
+            if len(ids) > self.max_batch:
+                return "error", 413, {"error": f"at most {self.max_batch} ids per request"}
+            profiles = store.lookup(ids)
+            return "batch", 200, {
+                "version": store.version,
+                "profiles": [p for p in profiles if p is not None],
+                "missing": [i for i, p in zip(ids, profiles) if p is None],
+            }
+
+        if path in ("/health", "/metrics") and method != "GET":
+            return "error", 405, {"error": "use GET"}
+
+        if path == "/health":
+            return "health", 200, {
+                "version": store.version,
+                "customers": len(store),
+                "reloads": self.reloads,
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+            }
+
+        if path == "/metrics":
+            return "metrics", 200, {
+                "version": store.version,
+                "latency": {name: h.summary() for name, h in self.histograms.items() if h.count},
+            }
+
+        return "error", 404, {"error": f"no route for {path}"}
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:
+                    # longer than the stream limit (64 KiB)
+                    await self.reject(writer, 400, "request line too long")
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.reject(writer, 400, "malformed request line")
+                    break
+
+                headers = {}
+                try:
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                except ValueError:
+                    await self.reject(writer, 431, "header line too long")
+                    break
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    await self.reject(writer, 413 if length > MAX_BODY_BYTES else 400, "bad or oversized body")
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                started = time.perf_counter()
+                try:
+                    endpoint, status, payload = self.route(method, target.split("?", 1)[0], body)
+                except Exception as e:
+                    log(f"{method} {target} failed: {e!r}")
+                    endpoint, status, payload = "error", 500, {"error": "internal error"}
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+                self.respond(writer, status, payload, keep_alive)
+                self.histograms[endpoint].record(time.perf_counter() - started)
+
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def reject(self, writer, status, message):
+        """Answer a request that cannot be parsed, then close the connection."""
+        started = time.perf_counter()
+        self.respond(writer, status, {"error": message}, keep_alive=False)
+        self.histograms["error"].record(time.perf_counter() - started)
+        await writer.drain()
+
+    @staticmethod
+    def respond(writer, status, payload, keep_alive=True):
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+        )
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Listening server plus the reload watcher; port 0 picks a free port."""
+        server = await asyncio.start_server(self.handle, host, port)
+        self._watcher = asyncio.ensure_future(self.watch())
+        return server
+
+    async def stop(self, server):
+        self._watcher.cancel()
+        server.close()
+        await server.wait_closed()
+
+
+async def serve(args):
+    app = ProfileServer(args.store_dir, args.reload_interval, args.max_batch)
+    server = await app.start(args.host, args.port)
+    host, port = server.sockets[0].getsockname()[:2]
+    log(f"Serving {len(app.store):,} customer profiles (store {app.store.version}) on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve churn scores and customer profiles over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--reload-interval", type=float, default=1.0,
+                        help="seconds between checks for a newly published store")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="ids accepted per batch request")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
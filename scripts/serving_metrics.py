@@ -0,0 +1,167 @@
+"""
+Process-wide memory and latency counters for the Streamlit dashboard.
+
+A single ServingMetrics instance is shared by every session (app.py keeps it
+in `st.cache_resource`). Each rerun records its wall time against the session
+that triggered it, along with the process resident set size afterwards, so a
+host can be sized from observed per-session latency and memory growth.
+
+Set OLIST_METRICS_LOG to a file path to also append one JSON line per rerun.
+
+`LatencyHistogram` is the fixed-bucket counterpart for request servers
+(serve_profiles.py): constant memory however many requests it has seen.
+"""
+
+import os
+import resource
+import sys
+import threading
+import time
+from collections import deque
+
+
+ACTIVE_WINDOW_SECONDS = 300
+
+
+def current_rss_bytes():
+    """Resident set size of this process (Linux /proc, else peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class SessionStats:
+    def __init__(self, window):
+        self.reruns = 0
+        self.latencies = deque(maxlen=window)
+        self.last_seen = 0.0
+        self.rss_delta = 0
+
+
+class ServingMetrics:
+    def __init__(self, window=200, log_path=None):
+        self._lock = threading.Lock()
+        self._window = window
+        self._log_path = log_path or os.environ.get("OLIST_METRICS_LOG")
+        self.sessions = {}
+        self.started_at = time.time()
+
+    def record(self, session_id, seconds, rss_before):
+        rss_after = current_rss_bytes()
+        now = time.time()
+        with self._lock:
+            stats = self.sessions.setdefault(session_id, SessionStats(self._window))
+            stats.reruns += 1
+            stats.latencies.append(seconds)
+            stats.last_seen = now
+            stats.rss_delta += rss_after - rss_before
+
+        if self._log_path:
+            import json
+
+            line = json.dumps({
+                "ts": now,
+                "session": session_id,
+                "seconds": round(seconds, 6),
+                "rss_bytes": rss_after,
+            })
+            with open(self._log_path, "a") as f:
+                f.write(line + "\n")
+
+    def session_summary(self, session_id):
+        stats = self.sessions.get(session_id)
+        if stats is None:
+            return None
+        latencies = list(stats.latencies)
+        return {
+            "reruns": stats.reruns,
+            "p50_ms": _percentile(latencies, 0.5) * 1000,
+            "p95_ms": _percentile(latencies, 0.95) * 1000,
+            "rss_delta_bytes": stats.rss_delta,
+        }
+
+    def summary(self):
+        now = time.time()
+        with self._lock:
+            sessions = list(self.sessions.values())
+        latencies = [x for s in sessions for x in s.latencies]
+        return {
+            "sessions_total": len(sessions),
+            "sessions_active": sum(
+                1 for s in sessions if now - s.last_seen < ACTIVE_WINDOW_SECONDS
+            ),
+            "reruns": sum(s.reruns for s in sessions),
+            "p50_ms": _percentile(latencies, 0.5) * 1000,
+            "p95_ms": _percentile(latencies, 0.95) * 1000,
+            "rss_bytes": current_rss_bytes(),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+
+# upper bounds of the latency buckets, seconds: 10us .. ~10s in steps of ~1.8x
+LATENCY_BUCKETS = tuple(round(10 ** (e / 4), 9) for e in range(-20, 5))
+
+
+class LatencyHistogram:
+    """Request counts per latency bucket, plus count and total time."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        import bisect
+
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf past the last bound)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            # cumulative, Prometheus style: requests at or under each bound
+            "buckets": [
+                {"le_ms": bound * 1000 if bound != float("inf") else "+Inf", "count": seen}
+                for bound, seen in zip(self.bounds + (float("inf"),), _running_sum(self.counts))
+            ],
+        }
+
+
+def _running_sum(values):
+    total = 0
+    for value in values:
+        total += value
+        yield total
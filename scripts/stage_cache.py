@@ -0,0 +1,173 @@
+"""
+Content-addressed disk cache for pipeline stage results.
+
+A stage's result is stored under a key hashing everything it depends on:
+
+    - the contents of its input files (not their paths or mtimes, so a
+      rewritten but byte-identical churn_features_v2.csv still hits)
+    - the source code of the stage function (editing the stage invalidates it)
+    - its parameters, as sorted JSON
+
+    from stage_cache import cached
+
+    results_df = cached(
+        "statistical tests", run_tests,
+        inputs=[features_path], params={"features": features},
+    )
+
+`cached` calls `run_tests(features_path, features=features)` on a miss (input
+paths positionally, then the parameters) and pickles the result; on a hit it
+unpickles the stored result without calling it, so the stage does not even
+read its inputs. Entries live in
+output/.stage_cache/ (OLIST_STAGE_CACHE_DIR to override). Each is written to
+a temporary file and renamed into place, so concurrent runs never see a
+partial entry; two runs computing the same key just both write it. When the
+directory grows past OLIST_STAGE_CACHE_MB (default 256) the least recently
+used entries are removed; a hit refreshes an entry's mtime, which is what
+"recently used" means here.
+
+Set OLIST_STAGE_CACHE=0 to bypass the cache. Hits, misses and evictions are
+printed when the run exits.
+"""
+
+import atexit
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get("OLIST_STAGE_CACHE_DIR", os.path.join(BASE_DIR, "output", ".stage_cache"))
+MAX_BYTES = int(float(os.environ.get("OLIST_STAGE_CACHE_MB", "256")) * 1e6)
+ENABLED = os.environ.get("OLIST_STAGE_CACHE", "1").strip().lower() not in ("0", "false", "off")
+
+SUFFIX = ".pkl"
+
+_stats = {"hits": 0, "misses": 0, "evicted": 0}
+# (path, size, mtime_ns) -> content digest, so a file is hashed once per run
+_file_digests = {}
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _file_digests:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _file_digests[memo_key] = h.hexdigest()
+    return _file_digests[memo_key]
+
+
+def code_version(fn):
+    """Hash of the function's source; falls back to its bytecode when the source is unavailable."""
+    try:
+        source = inspect.getsource(fn).encode()
+    except (OSError, TypeError):
+        source = fn.__code__.co_code
+    return hashlib.sha256(source).hexdigest()
+
+
+def cache_key(name, fn, inputs=(), params=None):
+    h = hashlib.sha256()
+    h.update(name.encode())
+    h.update(code_version(fn).encode())
+    for path in inputs:
+        h.update(file_digest(path).encode())
+    h.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key + SUFFIX)
+
+
+def _load(path):
+    try:
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        # evicted by a concurrent run, or an unreadable entry: recompute
+        return None, False
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return value, True
+
+
+def _store(path, value):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def evict(max_bytes=MAX_BYTES, keep=()):
+    """Remove least recently used entries until the cache fits in `max_bytes`."""
+    entries = []
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith(SUFFIX):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        else:
+            _stats["evicted"] += 1
+        total -= size
+
+
+def cached(name, fn, inputs=(), params=None):
+    """`fn(*inputs, **params)`, or its stored result when inputs, code and params are unchanged."""
+    params = params or {}
+    if not ENABLED:
+        return fn(*inputs, **params)
+
+    path = _entry_path(cache_key(name, fn, inputs, params))
+    value, hit = _load(path)
+    if hit:
+        _stats["hits"] += 1
+        print(f"[stage cache] hit: {name}")
+        return value
+
+    _stats["misses"] += 1
+    value = fn(*inputs, **params)
+    _store(path, value)
+    evict(keep={path})
+    return value
+
+
+def _report():
+    if _stats["hits"] or _stats["misses"]:
+        print(
+            f"\n[stage cache] {_stats['hits']} hit(s), {_stats['misses']} miss(es), "
+            f"{_stats['evicted']} evicted ({CACHE_DIR})"
+        )
+
+
+atexit.register(_report)
@@ -0,0 +1,195 @@
+"""
+Stress run: churn feature extraction under a DuckDB memory cap smaller than
+its input.
+
+Builds a scaled copy of the tables the extraction reads (orders, customers,
+payments, order_items, reviews) plus the customer_unique dictionary in a
+scratch warehouse. Copy k shifts every integer key by k * (largest key + 1),
+so copies never join with each other and the result is `--scale` times the
+real customer base. run_churn_feature_extraction_v2.py then runs against it
+in a subprocess with OLIST_DUCKDB_MEMORY_LIMIT set to `--cap-ratio` times the
+uncompressed size of its input, so its joins and aggregations must spill to
+disk to finish.
+
+DuckDB needs a fixed working set regardless of input size (about 100 MB for
+this extraction on one thread), so the cap never goes below MIN_CAP_MB per
+thread, and the run refuses to start when that floor is not smaller than the
+input: raise `--scale` instead. The extraction connects with
+preserve_insertion_order off. One thread is the default because each extra
+thread holds its own hash table partitions; at 32x, two threads still ran out
+of memory at 256 MB where one thread finished at 128 MB.
+
+The run passes when the script exits cleanly and writes one row per customer
+with a delivered order.
+
+    python scripts/stress_memory_cap.py --scale 32 --cap-ratio 0.3 --threads 1
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+from warehouse import BASE_DIR, CONNECTION_ENV, PARTITIONED_TABLES, RAW_TABLES, connect, table_scan
+from id_dictionary import dictionary_path
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLES = ["orders", "customers", "payments", "order_items", "reviews"]
+DICTIONARIES = ["customer", "customer_unique", "order", "product", "seller"]
+MIN_CAP_MB = 128
+
+
+def dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def uncompressed_bytes(path):
+    """Uncompressed column data of every parquet file under `path`."""
+    import pyarrow.parquet as pq
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.endswith(".parquet"):
+                meta = pq.ParquetFile(os.path.join(root, name)).metadata
+                total += sum(meta.row_group(i).total_byte_size for i in range(meta.num_row_groups))
+    return total
+
+
+def build_scaled_warehouse(work_dir, scale):
+    con = connect(ordered=False)
+    offsets = {
+        name: con.execute(
+            f"SELECT MAX(key) + 1 FROM read_parquet('{dictionary_path(name)}');"
+        ).fetchone()[0]
+        for name in DICTIONARIES
+    }
+
+    for table in TABLES:
+        replace = ", ".join(
+            f"{column}::BIGINT + r.k * {offsets[name]} AS {column}"
+            for column, name in RAW_TABLES[table][1].items()
+        )
+        out_dir = os.path.join(work_dir, "processed", table)
+        os.makedirs(out_dir, exist_ok=True)
+        if table in PARTITIONED_TABLES:
+            target, options = out_dir, ", PARTITION_BY (year, month), OVERWRITE_OR_IGNORE"
+        else:
+            target, options = os.path.join(out_dir, f"{table}.parquet"), ""
+        con.execute(f"""
+            COPY (
+                SELECT * EXCLUDE (k) REPLACE ({replace})
+                FROM {table_scan(table)}, range({scale}) r(k)
+            ) TO '{target}' (FORMAT PARQUET{options});
+        """)
+
+    dict_dir = os.path.join(work_dir, "processed", "id_dictionaries")
+    os.makedirs(dict_dir, exist_ok=True)
+    con.execute(f"""
+        COPY (
+            SELECT d.id || '-' || r.k AS id, d.key::BIGINT + r.k * {offsets["customer_unique"]} AS key
+            FROM read_parquet('{dictionary_path("customer_unique")}') d, range({scale}) r(k)
+        ) TO '{os.path.join(dict_dir, "customer_unique.parquet")}' (FORMAT PARQUET);
+    """)
+
+    expected = con.execute(f"""
+        SELECT COUNT(DISTINCT c.customer_unique_id)
+        FROM read_parquet('{work_dir}/processed/orders/**/*.parquet') o
+        JOIN read_parquet('{work_dir}/processed/customers/**/*.parquet') c
+            ON o.customer_id = c.customer_id
+        WHERE o.order_status = 'delivered';
+    """).fetchone()[0]
+    con.close()
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Churn extraction under a memory cap")
+    parser.add_argument("--scale", type=int, default=32, help="copies of the customer base")
+    parser.add_argument("--cap-ratio", type=float, default=0.3,
+                        help="memory limit as a fraction of the uncompressed input size")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--work-dir", default=os.path.join(BASE_DIR, "data", "stress"))
+    parser.add_argument("--keep", action="store_true", help="keep the scaled warehouse afterwards")
+    args = parser.parse_args()
+
+    shutil.rmtree(args.work_dir, ignore_errors=True)
+    print(f"Building {args.scale}x scaled warehouse in {args.work_dir} ...")
+    expected = build_scaled_warehouse(args.work_dir, args.scale)
+
+    processed_dir = os.path.join(args.work_dir, "processed")
+    input_bytes = uncompressed_bytes(processed_dir)
+    cap_mb = max(MIN_CAP_MB * args.threads, int(input_bytes * args.cap_ratio / 2**20))
+    if cap_mb * 2**20 >= input_bytes:
+        if not args.keep:
+            shutil.rmtree(args.work_dir, ignore_errors=True)
+        raise SystemExit(
+            f"A {cap_mb} MB cap is not smaller than the {input_bytes / 2**20:,.0f} MB input; raise --scale"
+        )
+    spill_dir = os.path.join(args.work_dir, "spill")
+    output_dir = os.path.join(args.work_dir, "output")
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Input: {input_bytes / 2**20:,.0f} MB uncompressed, {dir_bytes(processed_dir) / 2**20:,.0f} MB on disk")
+    print(f"Memory limit: {cap_mb:,} MB ({cap_mb * 2**20 / input_bytes:.0%} of input), {args.threads} threads")
+
+    env = dict(os.environ)
+    env.update({
+        "OLIST_PROCESSED_DIR": processed_dir,
+        "OLIST_OUTPUT_DIR": output_dir,
+        CONNECTION_ENV["memory_limit"]: f"{cap_mb}MB",
+        CONNECTION_ENV["threads"]: str(args.threads),
+        CONNECTION_ENV["temp_directory"]: spill_dir,
+    })
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "run_churn_feature_extraction_v2.py")],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    spill_peak = 0
+    while proc.poll() is None:
+        spill_peak = max(spill_peak, dir_bytes(spill_dir))
+        time.sleep(0.2)
+    stderr = proc.stderr.read()
+    elapsed = time.perf_counter() - started
+
+    peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    peak_rss = peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+    output_path = os.path.join(output_dir, "churn_features_v2.csv")
+    rows = 0
+    if proc.returncode == 0 and os.path.exists(output_path):
+        with open(output_path) as f:
+            rows = sum(1 for _ in f) - 1
+
+    print(f"\nExit code: {proc.returncode} after {elapsed:.1f}s")
+    print(f"Peak RSS: {peak_rss / 2**20:,.0f} MB, peak spill: {spill_peak / 2**20:,.0f} MB")
+    print(f"Rows: {rows:,} (expected {expected:,})")
+
+    if not args.keep:
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+
+    if proc.returncode != 0 or rows != expected:
+        print("\nFAILED")
+        print(stderr[-2000:])
+        sys.exit(1)
+    if spill_peak == 0:
+        print("\nFAILED: nothing was spilled, so the cap did not constrain the run; lower --cap-ratio")
+        sys.exit(1)
+    print("\nPASSED: extraction completed under a memory cap smaller than its input")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Decision-threshold, gain and profit curves for a churn score, from one sort.
+
+Contacting every customer scored at or above a threshold is the same as
+contacting the k highest-scored customers, so after sorting the scores once
+(descending) cumulative sums give the outcome of every threshold at once:
+
+    tp(k)        = churners among the top k         = cumsum(label)[k - 1]
+    precision(k) = tp(k) / k
+    recall(k)    = tp(k) / churners  (the cumulative gain curve)
+    lift(k)      = precision(k) / churn rate
+    profit(k)    = save_rate * cumsum(label * clv)[k - 1] - offer_cost * k
+
+i.e. an offer costs `offer_cost` per contacted customer and keeps a
+contacted churner with probability `save_rate`, which is then worth their
+CLV (a constant or one value per customer). A threshold cannot split tied
+scores, so cutoffs are taken only at the end of each run of equal scores,
+plus "contact nobody".
+
+Counts and amounts are multiplied by `scale` (customers in the population /
+customers scored), so a held-out test set stands in for the whole customer
+base. `optimize` picks the most profitable cutoff whose spend and number of
+contacts fit the campaign budget.
+
+Each model script writes its held-out scores with `save_scores`, which keeps
+the other models' rows, so the curves can be compared per model.
+
+    python scripts/threshold_curves.py --offer-cost 10 --save-rate 0.1 --budget 20000
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from warehouse import OUTPUT_DIR
+
+
+SCORES_PATH = "churn_test_scores.csv"
+DEFAULT_MODEL = "logistic_regression"
+
+
+def save_scores(scores, path=None):
+    """Write one model's held-out scores, replacing only that model's earlier rows."""
+    import pandas as pd
+
+    path = path or os.path.join(OUTPUT_DIR, SCORES_PATH)
+    if os.path.exists(path):
+        others = pd.read_csv(path)
+        if "model" in others:
+            scores = pd.concat([others[~others["model"].isin(scores["model"].unique())], scores], ignore_index=True)
+    scores.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+
+def threshold_curves(scores, labels, offer_cost, clv, save_rate, scale=1.0):
+    """One row per distinct threshold, from contacting nobody to everyone."""
+    import pandas as pd
+
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    clv = np.broadcast_to(np.asarray(clv, dtype=np.float64), scores.shape)
+
+    order = np.argsort(-scores, kind="stable")
+    scores, labels, clv = scores[order], labels[order], clv[order]
+    # last position of each run of equal scores
+    ends = np.flatnonzero(np.r_[scores[1:] != scores[:-1], True])
+
+    contacted = np.r_[0, ends + 1]
+    tp = np.r_[0, np.cumsum(labels)[ends]]
+    value_at_risk = np.r_[0.0, np.cumsum(np.where(labels, clv, 0.0))[ends]]
+    churners = labels.sum()
+    churn_rate = churners / max(len(labels), 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(contacted > 0, tp / contacted, np.nan)
+        recall = tp / churners if churners else np.zeros(len(tp))
+        lift = precision / churn_rate if churn_rate else np.full(len(tp), np.nan)
+
+    cost = offer_cost * contacted * scale
+    saved = save_rate * value_at_risk * scale
+    return pd.DataFrame({
+        "threshold": np.r_[np.inf, scores[ends]],
+        "contacted": contacted * scale,
+        "share_contacted": contacted / max(len(labels), 1),
+        "churners_reached": tp * scale,
+        "false_positives": (contacted - tp) * scale,
+        "precision": precision,
+        "recall": recall,
+        "lift": lift,
+        "cost": cost,
+        "expected_saved_value": saved,
+        "profit": saved - cost,
+    })
+
+
+def optimize(curves, budget=None, max_contacts=None):
+    """Most profitable row whose cost and contacts fit the limits (None = unlimited)."""
+    feasible = np.ones(len(curves), dtype=bool)
+    if budget is not None:
+        feasible &= curves["cost"].to_numpy() <= budget
+    if max_contacts is not None:
+        feasible &= curves["contacted"].to_numpy() <= max_contacts
+    # contacting nobody is always feasible, so there is always an answer
+    profit = np.where(feasible, curves["profit"].to_numpy(), -np.inf)
+    return curves.iloc[int(np.argmax(profit))]
+
+
+def at_threshold(curves, threshold):
+    """Row for contacting everyone scored at or above `threshold`."""
+    position = int(np.searchsorted(-curves["threshold"].to_numpy(), -threshold, side="right")) - 1
+    return curves.iloc[max(position, 0)]
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Threshold, gain and profit curves for the churn model")
+    parser.add_argument("--offer-cost", type=float, default=10.0, help="cost of one retention offer")
+    parser.add_argument("--save-rate", type=float, default=0.1,
+                        help="probability an offer keeps a customer who would have churned")
+    parser.add_argument("--clv", type=float,
+                        help="value of a kept customer (default: each customer's total revenue so far)")
+    parser.add_argument("--budget", type=float, help="maximum campaign spend")
+    parser.add_argument("--max-contacts", type=float, help="maximum customers contacted")
+    parser.add_argument("--model", default=DEFAULT_MODEL,
+                        help=f"model whose scores to use when the file holds several (default: {DEFAULT_MODEL})")
+    args = parser.parse_args()
+
+    scores = pd.read_csv(os.path.join(OUTPUT_DIR, SCORES_PATH))
+    if "model" in scores:
+        scores = scores[scores["model"] == args.model]
+        if scores.empty:
+            raise SystemExit(f"No held-out scores for model {args.model!r} in {SCORES_PATH}")
+    population = len(pd.read_csv(os.path.join(OUTPUT_DIR, "churn_features_v2.csv"), usecols=["customer_unique_id"]))
+    scale = population / len(scores)
+
+    clv = args.clv if args.clv is not None else scores["total_revenue"].fillna(0).to_numpy()
+    curves = threshold_curves(
+        scores["churn_score"], scores["is_churned"], args.offer_cost, clv, args.save_rate, scale
+    )
+    best = optimize(curves, args.budget, args.max_contacts)
+    default = at_threshold(curves, 0.5)
+
+    columns = ["threshold", "contacted", "precision", "recall", "lift", "cost", "profit"]
+    print(f"{len(scores):,} held-out customers scaled to {population:,} (x{scale:.2f}); "
+          f"{len(curves) - 1:,} distinct thresholds")
+    print("\nAt the default 0.5 threshold:")
+    print(default[columns].to_string())
+    print("\nMost profitable threshold" + (" within budget" if args.budget or args.max_contacts else "") + ":")
+    print(best[columns].to_string())
+
+    output_path = os.path.join(OUTPUT_DIR, "threshold_curves.csv")
+    curves.to_csv(output_path, index=False)
+    print(f"\nThreshold curves saved at: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
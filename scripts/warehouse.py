@@ -0,0 +1,168 @@
+"""
+Shared locations and table registration for the analysis pipeline.
+
+`run_ingest.py` converts the raw Olist CSVs into parquet tables under
+data/processed/<table>/ in which every hex identifier has been replaced by a
+dense integer key (see id_dictionary.py). Each raw file becomes one parquet
+part, so a new drop only adds a part. Downstream scripts register those tables
+as DuckDB views with `register_tables` instead of re-reading the raw CSVs.
+
+Orders and payments are additionally hive-partitioned by purchase month
+(<table>/year=YYYY/month=M/), payments following the month of their order.
+Filters on `year`/`month` then read only the matching partitions.
+"""
+
+import glob
+import os
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_DIR = os.path.join(BASE_DIR, "data", "raw")
+# overridable so stress runs can point a script at a scratch warehouse
+PROCESSED_DIR = os.environ.get("OLIST_PROCESSED_DIR", os.path.join(BASE_DIR, "data", "processed"))
+OUTPUT_DIR = os.environ.get("OLIST_OUTPUT_DIR", os.path.join(BASE_DIR, "output"))
+SPILL_DIR = os.path.join(BASE_DIR, "data", "spill")
+
+# DuckDB resource settings read by `connect`; unset means DuckDB's default
+# (all cores, 80% of RAM). Environment variables so worker processes inherit them.
+CONNECTION_ENV = {
+    "threads": "OLIST_DUCKDB_THREADS",
+    "memory_limit": "OLIST_DUCKDB_MEMORY_LIMIT",
+    "temp_directory": "OLIST_DUCKDB_TEMP_DIR",
+}
+
+
+# table name -> (raw csv file, {id column: id dictionary name})
+RAW_TABLES = {
+    "customers": (
+        "olist_customers_dataset.csv",
+        {"customer_id": "customer", "customer_unique_id": "customer_unique"},
+    ),
+    "orders": (
+        "olist_orders_dataset.csv",
+        {"order_id": "order", "customer_id": "customer"},
+    ),
+    "order_items": (
+        "olist_order_items_dataset.csv",
+        {"order_id": "order", "product_id": "product", "seller_id": "seller"},
+    ),
+    "payments": (
+        "olist_order_payments_dataset.csv",
+        {"order_id": "order"},
+    ),
+    "reviews": (
+        "olist_order_reviews_dataset.csv",
+        {"order_id": "order"},
+    ),
+    "products": (
+        "olist_products_dataset.csv",
+        {"product_id": "product", "product_category_name": "category"},
+    ),
+    "sellers": (
+        "olist_sellers_dataset.csv",
+        {"seller_id": "seller"},
+    ),
+    "geolocation": (
+        "olist_geolocation_dataset.csv",
+        {},
+    ),
+    "category_translation": (
+        "product_category_name_translation.csv",
+        {"product_category_name": "category"},
+    ),
+}
+
+
+# tables stored as <table>/year=YYYY/month=M/<raw file stem>.part<uuid>.parquet
+PARTITIONED_TABLES = ("orders", "payments")
+
+
+def raw_path(table):
+    """Path of the raw CSV backing `table`."""
+    return os.path.join(RAW_DIR, RAW_TABLES[table][0])
+
+
+def processed_path(table):
+    """Directory holding the integer-keyed parquet parts for `table`."""
+    return os.path.join(PROCESSED_DIR, table)
+
+
+def processed_parts(table):
+    return sorted(glob.glob(os.path.join(processed_path(table), "**", "*.parquet"), recursive=True))
+
+
+def table_scan(table):
+    """DuckDB table function reading every part of `table`."""
+    hive = ", hive_partitioning = true" if table in PARTITIONED_TABLES else ""
+    return f"read_parquet('{processed_path(table)}/**/*.parquet'{hive})"
+
+
+def table_signature(table):
+    """(file, size, mtime_ns) of every part; changes whenever the table does."""
+    signature = []
+    for path in processed_parts(table):
+        st = os.stat(path)
+        signature.append((os.path.relpath(path, processed_path(table)), st.st_size, st.st_mtime_ns))
+    return signature
+
+
+def register_tables(con, *tables):
+    """Expose processed tables as views named after the Olist tables."""
+    for table in tables:
+        if not processed_parts(table):
+            raise FileNotFoundError(
+                f"{processed_path(table)} has no parquet parts - run scripts/run_ingest.py first"
+            )
+        # the glob is expanded per query, so parts added later are picked up
+        con.execute(f"""
+            CREATE OR REPLACE VIEW {table} AS
+            SELECT * FROM {table_scan(table)};
+        """)
+
+
+def connect(ordered=True, threads=None, memory_limit=None, temp_directory=None):
+    """
+    DuckDB connection with the pipeline's resource settings.
+
+    `threads`, `memory_limit` (e.g. "2GB") and `temp_directory` fall back to
+    OLIST_DUCKDB_THREADS, OLIST_DUCKDB_MEMORY_LIMIT and OLIST_DUCKDB_TEMP_DIR.
+    Operators that outgrow the memory limit (the big hash joins and
+    aggregations) spill to the temp directory, data/spill/ by default, instead
+    of failing. Pass `ordered=False` when the row order of results without an
+    ORDER BY does not matter: DuckDB then skips buffering to keep insertion
+    order, which lowers memory use on large scans and writes.
+
+    The connection is wrapped for query capture when OLIST_PROFILE is set.
+    """
+    import duckdb
+    from profiling import profiled
+
+    threads = threads or os.environ.get(CONNECTION_ENV["threads"])
+    memory_limit = memory_limit or os.environ.get(CONNECTION_ENV["memory_limit"])
+    temp_directory = temp_directory or os.environ.get(CONNECTION_ENV["temp_directory"]) or SPILL_DIR
+    os.makedirs(temp_directory, exist_ok=True)
+
+    config = {"temp_directory": temp_directory}
+    if threads:
+        config["threads"] = int(threads)
+    if memory_limit:
+        config["memory_limit"] = memory_limit
+    if not ordered:
+        config["preserve_insertion_order"] = False
+    return profiled(duckdb.connect(config=config))
+
+
+def add_connection_args(parser):
+    """--threads / --memory-limit / --temp-directory for scripts with a CLI."""
+    group = parser.add_argument_group("DuckDB resources")
+    group.add_argument("--threads", type=int, help=f"worker threads per connection (${CONNECTION_ENV['threads']})")
+    group.add_argument("--memory-limit", help=f"e.g. 4GB; larger operators spill (${CONNECTION_ENV['memory_limit']})")
+    group.add_argument("--temp-directory", help=f"spill location (${CONNECTION_ENV['temp_directory']})")
+
+
+def apply_connection_args(args):
+    """Export the CLI settings so `connect` here and in worker processes sees them."""
+    for key, env in CONNECTION_ENV.items():
+        value = getattr(args, key, None)
+        if value:
+            os.environ[env] = str(value)